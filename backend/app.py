@@ -1,14 +1,12 @@
 
 
-from flask import Flask, render_template, send_from_directory, request
+from flask import Flask, render_template, send_from_directory, request, jsonify
 from flask_cors import CORS
 import os
-import requests
 import threading
-import time
 from twilio.twiml.messaging_response import MessagingResponse
 from twilio.rest import Client
-from twilio.base.exceptions import TwilioRestException
+from twilio.http.http_client import TwilioHttpClient
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -20,14 +18,29 @@ app = Flask(__name__, static_folder="static", template_folder="templates")
 CORS(app)
 
 # Import blueprints
-from backend.routes.diagnosis import diagnosis_bp
+from backend.routes.diagnosis import diagnosis_bp, treatment_index
 from backend.routes.weather import weather_bp
+from backend.ml_models.weather_predictor import get_forecast_stats
+from backend.ml_models.forecast_trainer import forecast_trainer
 from backend.routes.advisory import advisory_bp
+from backend.routes.health import health_bp
+from backend.ml_models.disease_model import get_inference_stats, model_manager
+from backend.utils.weather_api import weather_cache, geocode_cache, onecall_cache
+from backend.utils.weather_store import weather_store
+from backend.utils.weather_prefetcher import weather_prefetcher
+from backend.utils.http_client import http, HTTP_MAX_RETRIES
+from backend.utils.job_queue import JobQueue, JobQueueFull
+from backend.utils.advisory_pipeline import run_advisory_pipeline
+from backend.utils.ai_advisor import advice_cache, llm_gateway, prewarm_advice_cache
+from backend.utils.advisory_rules import rule_engine
+from backend.utils.twilio_dispatcher import OutboundDispatcher
+from backend.utils.message_splitter import split_message, TWILIO_MAX_LEN, MAX_PARTS
 
 # Register blueprints
 app.register_blueprint(diagnosis_bp)
 app.register_blueprint(weather_bp)
 app.register_blueprint(advisory_bp)
+app.register_blueprint(health_bp)
 
 # -----------------------------
 # TWILIO CONFIG
@@ -39,231 +52,303 @@ TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN2")
 TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER")
 # same sandbox number used by both sandboxes normally
 
-client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+# Keep-alive connection pool + retries for the Twilio REST API as well
+client = Client(
+    TWILIO_ACCOUNT_SID,
+    TWILIO_AUTH_TOKEN,
+    http_client=TwilioHttpClient(pool_connections=True, max_retries=HTTP_MAX_RETRIES),
+)
+
+
+# -----------------------------
+# OUTBOUND DISPATCHER (rate-limited, non-blocking)
+# -----------------------------
+# Tune to the Twilio account's limits (messages per second).
+TWILIO_GLOBAL_RATE = float(os.getenv("TWILIO_GLOBAL_RATE", 10))
+TWILIO_GLOBAL_BURST = int(os.getenv("TWILIO_GLOBAL_BURST", 2))
+TWILIO_RECIPIENT_RATE = float(os.getenv("TWILIO_RECIPIENT_RATE", 1.25))  # ~0.8s between parts
+TWILIO_RECIPIENT_BURST = int(os.getenv("TWILIO_RECIPIENT_BURST", 1))
+TWILIO_SEND_WORKERS = int(os.getenv("TWILIO_SEND_WORKERS", 4))
+
+dispatcher = OutboundDispatcher(
+    client,
+    TWILIO_WHATSAPP_NUMBER,
+    global_rate=TWILIO_GLOBAL_RATE,
+    global_burst=TWILIO_GLOBAL_BURST,
+    recipient_rate=TWILIO_RECIPIENT_RATE,
+    recipient_burst=TWILIO_RECIPIENT_BURST,
+    send_workers=TWILIO_SEND_WORKERS,
+)
 
 
 # -----------------------------
 # HELPER — Split & Send Long Messages Safely (robust)
 # -----------------------------
-def send_long_message(sender, message):
+def send_long_message(sender, message, on_failure=None, step=None):
     """
-    Safely send a WhatsApp message by splitting into parts and handling Twilio errors.
-    - Respects Twilio's ~1600 char per-message limit.
+    Split a WhatsApp message into parts and hand them to the outbound dispatcher.
+    - Parts are cut on paragraph/sentence/word boundaries and measured by their
+      real encoded length (UCS-2 for emoji), label included, so Twilio never
+      rejects them for length.
     - Limits parts to MAX_PARTS to avoid flooding.
-    - Retries with smaller chunk sizes if Twilio complains about length.
-    - Sleeps between parts to reduce chance of 429 rate limits.
+    - Returns immediately; pacing and 429 retries happen in the dispatcher.
+    on_failure(sender, reason) is called if the message is eventually abandoned.
+    With a step name, inside a WhatsApp job, the message is queued at most
+    once per job (a retry of the job skips it).
     """
-    # Initial parameters
-    INITIAL_MAX_LEN = 1600   # Twilio's documented limit (~1600 chars)
-    MIN_CHUNK = 400          # Don't go below this when retrying
-    MAX_PARTS = 5            # Prevent sending excessive parts
-    SLEEP_BETWEEN_PARTS = 0.8  # seconds; prevents hitting rate-limits
-
-    def _split_into_parts(text, chunk_size):
-        return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
-
-    # Try progressive strategy: start with INITIAL_MAX_LEN, if Twilio complains,
-    # retry with smaller chunk sizes down to MIN_CHUNK.
-    chunk_size = INITIAL_MAX_LEN
-
-    while chunk_size >= MIN_CHUNK:
-        parts = _split_into_parts(message, chunk_size)
-
-        # If too many parts, truncate message to MAX_PARTS * chunk_size
-        if len(parts) > MAX_PARTS:
-            truncated = message[:chunk_size * MAX_PARTS - 3] + "..."
-            parts = _split_into_parts(truncated, chunk_size)
-
-        # Prepare labeled parts if multipart
-        labeled_parts = []
-        for idx, part in enumerate(parts):
-            if len(parts) > 1:
-                labeled = f"(Part {idx + 1}/{len(parts)})\n{part}"
-            else:
-                labeled = part
-            labeled_parts.append(labeled)
-
-        # Try sending the labeled parts sequentially
-        all_sent = True
-        for idx, part in enumerate(labeled_parts):
-            try:
-                client.messages.create(
-                    from_=TWILIO_WHATSAPP_NUMBER,
-                    to=sender,
-                    body=part
-                )
-                print(f"[Twilio] Sent part {idx + 1}/{len(labeled_parts)} ({len(part)} chars)")
-                # avoid bursting
-                time.sleep(SLEEP_BETWEEN_PARTS)
-
-            except TwilioRestException as tre:
-                # If Twilio complains about concatenated message body >1600,
-                # reduce chunk size and retry the whole message with smaller chunks.
-                msg = str(tre)
-                print(f"[Twilio][Error] TwilioRestException while sending part {idx + 1}: {msg}")
-
-                if "concatenated message body exceeds the 1600" in msg or "exceeds the 1600" in msg:
-                    print(f"[Twilio] Detected 1600-limit error. Reducing chunk size from {chunk_size} and retrying.")
-                    all_sent = False
-                    break  # break out of sending loop and retry with smaller chunk_size
-
-                # If it's a 429 or rate-limit-ish, wait and retry current part a few times
-                if tre.status == 429:
-                    retry_wait = 2.0
-                    retries = 3
-                    sent = False
-                    for attempt in range(retries):
-                        print(f"[Twilio] 429 received — retrying in {retry_wait}s (attempt {attempt+1}/{retries})")
-                        time.sleep(retry_wait)
-                        try:
-                            client.messages.create(from_=TWILIO_WHATSAPP_NUMBER, to=sender, body=part)
-                            print("[Twilio] Retry successful.")
-                            sent = True
-                            break
-                        except TwilioRestException as tre2:
-                            print(f"[Twilio] Retry failed: {tre2}")
-                            retry_wait *= 2
-                    if not sent:
-                        print("[Twilio] Could not send part after retries. Aborting this send_long_message call.")
-                        return False
-                else:
-                    # For other Twilio errors, log and try to send an error notice (short)
-                    print(f"[Twilio] Unexpected Twilio error: {tre}. Aborting send_long_message.")
-                    return False
-
-            except Exception as e:
-                # network or other errors
-                print(f"[Twilio][Exception] Network/other error while sending part: {e}")
-                # don't raise, return failure so caller can handle or log
-                return False
-
-        if all_sent:
-            # all parts were successfully sent
+    job_id = whatsapp_jobs.current_job_id() if step else None
+    if job_id is not None:
+        if step in whatsapp_jobs.checkpoints(job_id):
+            print(f"[send_long_message] '{step}' already sent to {sender} for job #{job_id}")
             return True
-        else:
-            # we need to retry with a smaller chunk size
-            # reduce chunk size (e.g., decrease by 25%)
-            new_chunk = int(chunk_size * 0.75)
-            if new_chunk >= MIN_CHUNK and new_chunk < chunk_size:
-                chunk_size = new_chunk
-                print(f"[send_long_message] Retrying with smaller chunk size: {chunk_size}")
-                continue
-            else:
-                # cannot reduce further
-                print("[send_long_message] Cannot reduce chunk size further. Aborting.")
-                return False
-
-    # If we exit loop without sending anything
-    print("[send_long_message] Reached minimum chunk size and still couldn't send.")
-    return False
+        whatsapp_jobs.checkpoint(job_id, step)
+    parts = split_message(message, max_len=TWILIO_MAX_LEN, max_parts=MAX_PARTS)
+    dispatcher.send(sender, parts, on_failure=on_failure)
+    print(f"[send_long_message] Queued {len(parts)} part(s) for {sender}")
+    return True
 
 
 # -----------------------------
 # BACKGROUND PROCESS FUNCTION
 # -----------------------------
+# A job is only complete once Twilio accepted its reply
+REPLY_SEND_TIMEOUT_SECONDS = float(os.getenv("REPLY_SEND_TIMEOUT_SECONDS", 120))
+
+
+class ReplyNotDelivered(Exception):
+    """Twilio accepted no part of a reply: the job queue retries the job."""
+
+
+def deliver_long_message(sender, message, timeout=REPLY_SEND_TIMEOUT_SECONDS, step=None):
+    """
+    Like send_long_message(), but waits up to timeout for Twilio to accept
+    the parts. Returns "delivered", "queued", "partial" or "failed" (see
+    OutboundDispatcher.deliver). With a step name, inside a WhatsApp job,
+    every accepted part is checkpointed on the job and a retry of the job
+    only sends the parts that were not accepted yet.
+    """
+    parts = split_message(message, max_len=TWILIO_MAX_LEN, max_parts=MAX_PARTS)
+    job_id = whatsapp_jobs.current_job_id() if step else None
+    if job_id is None:
+        return dispatcher.deliver(sender, parts, timeout=timeout)
+
+    done = whatsapp_jobs.checkpoints(job_id)
+    todo = [i for i in range(len(parts)) if f"{step}:{i}" not in done]
+    if not todo:
+        print(f"[deliver_long_message] '{step}' already delivered to {sender} for job #{job_id}")
+        return "delivered"
+    outcome = dispatcher.deliver(
+        sender, [parts[i] for i in todo], timeout=timeout,
+        on_sent=lambda n: whatsapp_jobs.checkpoint(job_id, f"{step}:{todo[n]}"),
+    )
+    if outcome == "failed" and len(todo) < len(parts):
+        return "partial"
+    return outcome
+
+
+def _reply(sender, message, step):
+    """Deliver a reply; raise (so the job is retried) only if Twilio accepted none of it."""
+    if deliver_long_message(sender, message, step=step) == "failed":
+        raise ReplyNotDelivered(f"reply to {sender} was not accepted by Twilio")
+
+
 def process_in_background(sender, message_body, image_url):
+    """
+    Handle one WhatsApp job. Bad input is answered and the job completes;
+    real failures (pipeline errors, replies Twilio accepted nothing of)
+    propagate so the job queue retries the job and finally reports it
+    failed. Messages are checkpointed per job, so a retry never sends the
+    progress note or an accepted reply part twice.
+    """
+    print(f"[Thread] Processing message from {sender}")
+
+    # --- Immediate feedback (progress note only: not waited on) ---
+    send_long_message(sender, "🔄 Analyzing your crop image... please wait a few seconds.", step="progress")
+
+    if not image_url:
+        _reply(sender, "🌱 Please send a *crop leaf image* along with your city name (e.g., 'Bamenda').",
+               step="no_image")
+        return
+
+    city = message_body or "Unknown"
+
+    # --- Download image securely ---
     try:
-        print(f"[Thread] Processing message from {sender}")
+        img_response = http.get(image_url, auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN), timeout=30)
+    except Exception as e:
+        print(f"[process_in_background] Failed to download image: {e}")
+        _reply(sender, "⚠️ Couldn't download the image. Please resend a clear photo.", step="download_failed")
+        return
+
+    if img_response.status_code != 200:
+        print(f"[process_in_background] Image download status: {img_response.status_code}")
+        _reply(sender, "⚠️ Couldn't download the image. Please resend a clear photo.", step="download_failed")
+        return
+
+    image_bytes = img_response.content
+
+    # --- Validate image ---
+    if len(image_bytes) < 1024:
+        _reply(sender, "⚠️ The image seems empty or unreadable. Please resend a clear photo.", step="empty_image")
+        return
+
+    # --- Run the advisory pipeline in-process (no loopback HTTP) ---
+    if not model_manager.wait_until_ready(timeout=MODEL_READY_WAIT_SECONDS):
+        print(f"[process_in_background] Disease model not ready: {model_manager.status()}")
+        _reply(sender, "⚠️ Sorry, the Agro Advisor is starting up. Please resend your photo in a minute.",
+               step="not_ready")
+        return
+
+    # Pipeline errors propagate: the job is retried, then reported by _whatsapp_job_failed
+    result = run_advisory_pipeline(image_bytes, city)
+
+    print(f"✅ Advisor result ready ({result['timings'].get('total_ms')} ms).")
+
+    crop = result.get("crop", "Unknown crop")
+    disease = result.get("disease", {}).get("predicted_label", "Unknown disease")
+    advice_list = result.get("advice", ["No advice available."])
+    if result.get("advisor") == "rules":
+        # Rule-based fallback is a list of short tips
+        advice_text = "\n".join(f"• {tip}" for tip in advice_list)
+    else:
+        advice_text = advice_list[0] if advice_list else "No advice available."
 
-        # --- Immediate feedback ---
-        send_long_message(sender, "🔄 Analyzing your crop image... please wait a few seconds.")
+    # --- Construct reply message ---
+    reply_msg = (
+        f"🌾 *Smart Agro Advisor*\n\n"
+        f"📍 City: {city}\n"
+        f"🌱 Crop: {crop}\n"
+        f"🦠 Disease: {disease}\n\n"
+        f"💡 *Advice:*\n{advice_text}"
+    )
+
+    # --- Send message safely (split if needed) ---
+    outcome = deliver_long_message(sender, reply_msg, step="reply")
+    if outcome == "delivered":
+        print(f"[Thread] Reply delivered to {sender}.")
+        return
+    if outcome == "queued":
+        # Still going out: resending it (or a summary) would duplicate it
+        print(f"[Thread] Reply to {sender} still being sent after {REPLY_SEND_TIMEOUT_SECONDS:.0f}s")
+        return
+
+    # final fallback: send a short summary so user still receives something
+    fallback = (
+        f"🌾 Smart Agro Advisor\n\n"
+        f"📍 {city}\n"
+        f"🌱 {crop}\n"
+        f"🦠 {disease}\n\n"
+        "💡 Advice: (reply with 'more' to get details)"
+    )
+    print(f"[Thread] Full reply to {sender} was not delivered ({outcome}), sending fallback summary")
+    if outcome == "partial":
+        # Part of the reply reached the farmer: the job is done either way
+        deliver_long_message(sender, fallback, step="fallback")
+    else:
+        _reply(sender, fallback, step="fallback")
 
-        if not image_url:
-            send_long_message(sender, "🌱 Please send a *crop leaf image* along with your city name (e.g., 'Bamenda').")
-            return
 
-        city = message_body or "Unknown"
+# -----------------------------
+# WHATSAPP JOB QUEUE (durable, bounded worker pool)
+# -----------------------------
+JOB_DB_PATH = os.getenv("WHATSAPP_JOB_DB", "data/whatsapp_jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("WHATSAPP_JOB_WORKERS", 4))
+JOB_MAX_IN_FLIGHT = int(os.getenv("WHATSAPP_JOB_MAX_IN_FLIGHT", 20))   # above this: "busy, queued as #N"
+JOB_MAX_QUEUED = int(os.getenv("WHATSAPP_JOB_MAX_QUEUED", 1000))       # above this: refuse
+# Jobs started while the disease model is still loading wait this long for it
+MODEL_READY_WAIT_SECONDS = float(os.getenv("MODEL_READY_WAIT_SECONDS", 120))
 
-        # --- Download image securely ---
-        try:
-            img_response = requests.get(image_url, auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN), timeout=30)
-        except Exception as e:
-            print(f"[process_in_background] Failed to download image: {e}")
-            send_long_message(sender, "⚠️ Couldn't download the image. Please resend a clear photo.")
-            return
 
-        if img_response.status_code != 200:
-            print(f"[process_in_background] Image download status: {img_response.status_code}")
-            send_long_message(sender, "⚠️ Couldn't download the image. Please resend a clear photo.")
-            return
+def _run_whatsapp_job(payload):
+    process_in_background(payload["sender"], payload["message_body"], payload["image_url"])
 
-        image_path = f"temp_{sender.split(':')[-1]}.jpg"
-        with open(image_path, "wb") as f:
-            f.write(img_response.content)
-
-        # --- Validate image ---
-        if not os.path.exists(image_path) or os.path.getsize(image_path) < 1024:
-            send_long_message(sender, "⚠️ The image seems empty or unreadable. Please resend a clear photo.")
-            try:
-                if os.path.exists(image_path):
-                    os.remove(image_path)
-            except Exception:
-                pass
-            return
 
-        # --- Send to local backend (/api/advice) ---
-        try:
-            with open(image_path, "rb") as img_file:
-                files = {"image": img_file}
-                data = {"city": city}
-                api_res = requests.post("http://127.0.0.1:5000/api/advice/", files=files, data=data, timeout=200)
-        except Exception as e:
-            print(f"[process_in_background] Error calling /api/advice: {e}")
-            send_long_message(sender, "⚠️ Sorry, the Agro Advisor failed to process your request.")
-            try:
-                os.remove(image_path)
-            except Exception:
-                pass
-            return
+def _whatsapp_job_failed(payload, error):
+    """Every attempt failed: tell the farmer instead of staying silent."""
+    send_long_message(
+        payload["sender"],
+        "⚠️ Sorry, the Agro Advisor failed to process your request. Please resend your photo.",
+    )
 
-        try:
-            os.remove(image_path)
-        except Exception:
-            pass
 
-        if api_res.status_code != 200:
-            print(f"[process_in_background] /api/advice returned status {api_res.status_code}")
-            send_long_message(sender, "⚠️ Sorry, the Agro Advisor failed to process your request.")
-            return
+whatsapp_jobs = JobQueue(
+    JOB_DB_PATH,
+    _run_whatsapp_job,
+    workers=JOB_WORKERS,
+    max_in_flight=JOB_MAX_IN_FLIGHT,
+    max_queued=JOB_MAX_QUEUED,
+    on_failure=_whatsapp_job_failed,
+    name="whatsapp",
+)
 
-        result = api_res.json()
-        print("✅ Advisor response received.")
 
-        crop = result.get("crop", "Unknown crop")
-        disease = result.get("disease", {}).get("predicted_label", "Unknown disease")
-        advice_list = result.get("advice", ["No advice available."])
-        advice_text = advice_list[0] if advice_list else "No advice available."
+# -----------------------------
+# ADVICE CACHE PRE-WARM
+# -----------------------------
+# Generate LLM advice for every (label, weather condition) pair in the
+# background once the label encoder is loaded; already cached pairs are skipped.
+# It only uses the LLM while no live request does (see prewarm_advice_cache).
+# Started by init_background_services().
+ADVICE_PREWARM_ON_STARTUP = os.getenv("ADVICE_PREWARM_ON_STARTUP", "1").lower() in ("1", "true", "yes")
 
-        # --- Construct reply message ---
-        reply_msg = (
-            f"🌾 *Smart Agro Advisor*\n\n"
-            f"📍 City: {city}\n"
-            f"🌱 Crop: {crop}\n"
-            f"🦠 Disease: {disease}\n\n"
-            f"💡 *Advice:*\n{advice_text}"
-        )
 
-        # --- Send message safely (split if needed) ---
-        ok = send_long_message(sender, reply_msg)
-        if not ok:
-            # final fallback: send a short summary so user still receives something
-            fallback = (
-                f"🌾 Smart Agro Advisor\n\n"
-                f"📍 {city}\n"
-                f"🌱 {crop}\n"
-                f"🦠 {disease}\n\n"
-                "💡 Advice: (reply with 'more' to get details)"
-            )
-            send_long_message(sender, fallback)
-            print(f"[Thread] Sent fallback summary to {sender} due to send error.")
-        else:
-            print(f"[Thread] Reply sent to {sender} successfully.")
+def _prewarm_advice():
+    if not model_manager.wait_until_ready(timeout=None):
+        print("⚠️ Advice pre-warm skipped: disease model failed to load")
+        return
+    labels = model_manager.get()["index_to_label"].values()
+    prewarm_advice_cache(labels)
+
+
+# -----------------------------
+# FORECAST MODEL TRAINING
+# -----------------------------
+# Per-city weather models are (re)trained in the background whenever new
+# observations were logged; the forecast route only reads trained models.
+FORECAST_TRAINING_ON_STARTUP = os.getenv("FORECAST_TRAINING_ON_STARTUP", "1").lower() in ("1", "true", "yes")
+
+
+# -----------------------------
+# WEATHER PREFETCH
+# -----------------------------
+# The main farming cities are refreshed in the background so /weather and
+# WhatsApp advice are served from a warm cache, and each refresh is logged.
+WEATHER_PREFETCH_ON_STARTUP = os.getenv("WEATHER_PREFETCH_ON_STARTUP", "1").lower() in ("1", "true", "yes")
+
+
+# -----------------------------
+# BACKGROUND SERVICES
+# -----------------------------
+# Nothing is started at import time: worker processes (e.g. spawn pools)
+# and tools that import this module must not load the model, resume
+# WhatsApp jobs or call paid APIs. The server starts them exactly once.
+_services_lock = threading.Lock()
+_services_started = False
+
+
+def init_background_services():
+    """Start the model loader, job workers and background refreshers (idempotent)."""
+    global _services_started
+    with _services_lock:
+        if _services_started:
+            return
+        _services_started = True
+
+    # Load + warm up the disease model in the background so the port binds immediately
+    model_manager.start()
+    whatsapp_jobs.start()
+    if ADVICE_PREWARM_ON_STARTUP:
+        threading.Thread(target=_prewarm_advice, name="advice-prewarm", daemon=True).start()
+    if FORECAST_TRAINING_ON_STARTUP:
+        forecast_trainer.start()
+    if WEATHER_PREFETCH_ON_STARTUP:
+        weather_prefetcher.start()
 
-    except Exception as e:
-        error_msg = f"⚠️ An unexpected error occurred while processing your image.\n\nError details:\n{str(e)}"
-        print(f"❌ Background error for {sender}: {e}")
-        # use safe sender for error messages too
-        send_long_message(sender, error_msg)
+
+def create_app():
+    """App factory for WSGI servers, e.g. gunicorn "backend.app:create_app()"."""
+    init_background_services()
+    return app
 
 
 # -----------------------------
@@ -279,33 +364,56 @@ def whatsapp_reply():
     print(f"💬 Message: {message_body}")
     print(f"🖼 Media URL: {image_url}")
 
-    # --- Launch background thread ---
-    threading.Thread(target=process_in_background, args=(sender, message_body, image_url)).start()
-
-    # --- Respond immediately to Twilio ---
     resp = MessagingResponse()
-    resp.message("✅ Thanks! Your request is being processed. You’ll get results shortly.")
-    return str(resp)
-
-
-# -----------------------------
-# FRONTEND ROUTES
-# -----------------------------
-@app.route("/")
-def home():
-    return render_template("index.html")
 
+    # --- Persist job for the worker pool ---
+    try:
+        job_id, position, busy = whatsapp_jobs.submit({
+            "sender": sender,
+            "message_body": message_body,
+            "image_url": image_url,
+        })
+    except JobQueueFull:
+        print(f"🚫 Job queue full, refusing message from {sender}")
+        resp.message("⏳ Smart Agro Advisor is very busy right now. Please resend your photo in a few minutes.")
+        return str(resp)
+
+    print(f"🗂 Queued job #{job_id} at position {position}")
 
-@app.route("/static/<path:filename>")
-def serve_static(filename):
-    return send_from_directory(os.path.join(app.root_path, "static"), filename)
+    # --- Respond immediately to Twilio ---
+    if busy:
+        resp.message(
+            f"⏳ We're busy right now — your request is queued as #{position}. "
+            "You’ll get results as soon as it's your turn."
+        )
+    else:
+        resp.message("✅ Thanks! Your request is being processed. You’ll get results shortly.")
+    return str(resp)
 
 
 # -----------------------------
-# MAIN ENTRY
+# RUNTIME STATS
 # -----------------------------
-if __name__ == "__main__":
-    app.run(debug=True)
+@app.route("/api/stats", methods=["GET"])
+def runtime_stats():
+    """Expose internal queue/batching statistics for monitoring."""
+    return jsonify({
+        "model": model_manager.status(),
+        "inference": get_inference_stats(),
+        "weather_cache": weather_cache.stats(),
+        "geocode": geocode_cache.stats(),
+        "onecall_cache": onecall_cache.stats(),
+        "http": http.stats(),
+        "whatsapp_jobs": whatsapp_jobs.stats(),
+        "twilio_outbound": dispatcher.stats(),
+        "advice_cache": advice_cache.stats(),
+        "llm": llm_gateway.stats(),
+        "advisory_rules": rule_engine.stats(),
+        "treatments": treatment_index.stats(),
+        "weather_store": weather_store.stats(),
+        "forecast": dict(get_forecast_stats(), training=forecast_trainer.stats()),
+        "weather_prefetch": weather_prefetcher.stats(),
+    })
 
 
 # -----------------------------
@@ -315,12 +423,18 @@ if __name__ == "__main__":
 def home():
     return render_template("index.html")
 
+
 @app.route("/static/<path:filename>")
 def serve_static(filename):
     return send_from_directory(os.path.join(app.root_path, "static"), filename)
 
+
 # -----------------------------
 # MAIN ENTRY
 # -----------------------------
 if __name__ == "__main__":
-    app.run(debug=True)
+    debug = True
+    # With the debug reloader only the serving child starts services, not the file watcher
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        init_background_services()
+    app.run(debug=debug)
@@ -0,0 +1,168 @@
+"""
+export_inference_models.py
+Export the trained Keras disease model to faster CPU inference formats:
+  - an XLA-compiled SavedModel serving signature (engine "savedmodel-xla")
+  - a dynamic-range or int8-quantized TFLite model (engine "tflite")
+Each exported engine is then checked against the Keras model for top-1
+agreement, latency and size on the validation split.
+"""
+
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+from backend.ml_models.inference_engines import KerasEngine, SavedModelXLAEngine, TFLiteEngine
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+DATA_DIR = r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\data\raw\Maize_Plantain"
+MODEL_PATH = r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\models\disease_model.h5"
+SAVEDMODEL_XLA_DIR = r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\models\disease_model_xla"
+TFLITE_PATH = r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\models\disease_model.tflite"
+IMG_SIZE = (224, 224)
+BATCH_SIZE = 32
+QUANTIZATION = "dynamic"        # "dynamic" (weights only) or "int8" (full integer)
+REPRESENTATIVE_BATCHES = 10     # calibration batches for int8
+TFLITE_NUM_THREADS = os.cpu_count() or 1
+MIN_AGREEMENT = 0.98            # warn if an engine disagrees with Keras more than this
+# -----------------------------
+
+
+def validation_generator(shuffle=False):
+    """Same split/rescaling as training, without augmentation."""
+    datagen = ImageDataGenerator(rescale=1.0 / 255.0, validation_split=0.2)
+    return datagen.flow_from_directory(
+        DATA_DIR,
+        target_size=IMG_SIZE,
+        batch_size=BATCH_SIZE,
+        subset='validation',
+        class_mode='categorical',
+        shuffle=shuffle
+    )
+
+
+# -----------------------------
+# EXPORTERS
+# -----------------------------
+def export_savedmodel_xla(model, export_dir=SAVEDMODEL_XLA_DIR):
+    """Save a SavedModel whose serving signature is jit-compiled with XLA."""
+
+    @tf.function(
+        jit_compile=True,
+        input_signature=[tf.TensorSpec([None, IMG_SIZE[0], IMG_SIZE[1], 3], tf.float32, name="image")],
+    )
+    def serve(image):
+        return {"probabilities": model(image, training=False)}
+
+    tf.saved_model.save(model, export_dir, signatures={"serving_default": serve})
+    print(f"✅ XLA SavedModel exported to {export_dir}")
+    return export_dir
+
+
+def export_tflite(model, output_path=TFLITE_PATH, quantization=QUANTIZATION):
+    """Convert the Keras model to a dynamic-range or int8-quantized TFLite flatbuffer."""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if quantization == "int8":
+        calibration = validation_generator(shuffle=True)
+
+        def representative_dataset():
+            for _ in range(REPRESENTATIVE_BATCHES):
+                images, _ = next(calibration)
+                for img in images:
+                    yield [np.expand_dims(img, axis=0).astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    elif quantization != "dynamic":
+        raise ValueError("QUANTIZATION must be 'dynamic' or 'int8'")
+
+    tflite_model = converter.convert()
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "wb") as f:
+        f.write(tflite_model)
+    print(f"✅ TFLite ({quantization}) model exported to {output_path} "
+          f"({len(tflite_model) / 1e6:.1f} MB)")
+    return output_path
+
+
+# -----------------------------
+# AGREEMENT CHECK
+# -----------------------------
+def _path_size_mb(path):
+    if os.path.isdir(path):
+        total = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, files in os.walk(path) for name in files
+        )
+    else:
+        total = os.path.getsize(path)
+    return total / 1e6
+
+
+def compare_engines(reference, candidates, generator):
+    """
+    Run every engine over the validation set and report, per engine:
+    top-1 agreement with the reference (Keras), accuracy and ms/batch.
+    """
+    engines = [reference] + list(candidates)
+    top1 = {e.name: [] for e in engines}
+    latency = {e.name: [] for e in engines}
+    truth = []
+
+    for _ in range(len(generator)):
+        images, labels = next(generator)
+        truth.append(np.argmax(labels, axis=1))
+        for engine in engines:
+            t0 = time.perf_counter()
+            preds = engine.predict(images.astype(np.float32))
+            latency[engine.name].append((time.perf_counter() - t0) * 1000)
+            top1[engine.name].append(np.argmax(preds, axis=1))
+
+    truth = np.concatenate(truth)
+    ref_top1 = np.concatenate(top1[reference.name])
+    report = {}
+    for engine in engines:
+        pred = np.concatenate(top1[engine.name])
+        report[engine.name] = {
+            "agreement_with_keras": float(np.mean(pred == ref_top1)),
+            "accuracy": float(np.mean(pred == truth)),
+            # Skip the first batch: it includes tracing / XLA compilation
+            "ms_per_batch": float(np.median(latency[engine.name][1:] or latency[engine.name])),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    keras_model = tf.keras.models.load_model(MODEL_PATH)
+
+    export_savedmodel_xla(keras_model)
+    export_tflite(keras_model)
+
+    reference = KerasEngine(MODEL_PATH)
+    candidates = [
+        SavedModelXLAEngine(SAVEDMODEL_XLA_DIR),
+        TFLiteEngine(TFLITE_PATH, num_threads=TFLITE_NUM_THREADS),
+    ]
+    report = compare_engines(reference, candidates, validation_generator())
+
+    sizes = {
+        "keras": _path_size_mb(MODEL_PATH),
+        "savedmodel-xla": _path_size_mb(SAVEDMODEL_XLA_DIR),
+        "tflite": _path_size_mb(TFLITE_PATH),
+    }
+
+    print("\n📊 Engine comparison on validation split:")
+    print(f"{'engine':<16}{'agreement':>11}{'accuracy':>10}{'ms/batch':>10}{'size MB':>9}")
+    for name, row in report.items():
+        print(f"{name:<16}{row['agreement_with_keras'] * 100:>10.2f}%{row['accuracy'] * 100:>9.2f}%"
+              f"{row['ms_per_batch']:>10.1f}{sizes[name]:>9.1f}")
+        if row["agreement_with_keras"] < MIN_AGREEMENT:
+            print(f"⚠️ {name} top-1 agreement below {MIN_AGREEMENT * 100:.0f}% — "
+                  f"keep DISEASE_INFERENCE_ENGINE=keras or retry with another QUANTIZATION.")
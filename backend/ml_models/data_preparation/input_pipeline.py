@@ -0,0 +1,150 @@
+"""
+input_pipeline.py
+tf.data input pipeline for training the disease model, replacing
+ImageDataGenerator.flow_from_directory (which decodes and augments one
+JPEG at a time in Python and starves the CPU during training).
+- Same classes, class indices and train/validation split as
+  flow_from_directory(validation_split=0.2), so label_encoder.pkl is unchanged.
+- Files are read with a parallel interleave, decoded and resized with
+  num_parallel_calls=AUTOTUNE, optionally cached (in memory or on disk) as
+  uint8 after resizing, then shuffled, batched, augmented per batch and
+  prefetched.
+"""
+
+import hashlib
+import os
+import random
+
+import tensorflow as tf
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+DATA_DIR = r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\data\raw\Maize_Plantain"
+IMG_SIZE = (224, 224)
+BATCH_SIZE = 32
+VALIDATION_SPLIT = 0.2
+SHUFFLE_BUFFER = 1024     # decoded uint8 images (~150 KB each at 224x224)
+READ_PARALLELISM = 16     # files read concurrently by the interleave
+SHUFFLE_SEED = 1337       # fixes the file order, so an on-disk cache stays valid
+AUTOTUNE = tf.data.AUTOTUNE
+# -----------------------------
+
+# flow_from_directory also accepts .ppm/.tif/.tiff, which tf.io.decode_image cannot read
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+UNSUPPORTED_EXTENSIONS = (".ppm", ".tif", ".tiff")
+
+
+def list_image_files(data_dir=DATA_DIR, subset=None, validation_split=VALIDATION_SPLIT):
+    """
+    (paths, labels, class_indices) exactly as flow_from_directory lists them:
+    classes are the sorted sub-folders of data_dir, each class's images are
+    found recursively in sorted order, and the first `validation_split` of
+    every class is the validation subset (subset="validation"), the rest
+    the training subset (subset="training"). subset=None returns all files.
+    """
+    classes = sorted(d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d)))
+    class_indices = {name: i for i, name in enumerate(classes)}
+
+    paths, labels = [], []
+    skipped = 0
+    for name in classes:
+        files = []
+        for root, _, names in sorted(os.walk(os.path.join(data_dir, name)), key=lambda entry: entry[0]):
+            for fname in sorted(names):
+                lower = fname.lower()
+                if lower.endswith(IMAGE_EXTENSIONS):
+                    files.append(os.path.join(root, fname))
+                elif lower.endswith(UNSUPPORTED_EXTENSIONS):
+                    skipped += 1
+        if subset is not None:
+            cut = int(validation_split * len(files))
+            files = files[:cut] if subset == "validation" else files[cut:]
+        paths += files
+        labels += [class_indices[name]] * len(files)
+
+    if skipped:
+        print(f"⚠️ Skipped {skipped} .ppm/.tif images in {data_dir} (not decodable by tf.data)")
+    return paths, labels, class_indices
+
+
+def _augmenter():
+    """ImageDataGenerator's training augmentation as Keras preprocessing layers."""
+    return tf.keras.Sequential([
+        tf.keras.layers.RandomFlip("horizontal"),
+        tf.keras.layers.RandomRotation(25 / 360, fill_mode="nearest"),
+        tf.keras.layers.RandomTranslation(0.15, 0.15, fill_mode="nearest"),
+        tf.keras.layers.RandomZoom(0.2, fill_mode="nearest"),
+    ], name="augmentation")
+
+
+def _cache_file(cache_dir, subset, paths, img_size):
+    """One cache file per (file list, image size), so a changed dataset is never read stale."""
+    digest = hashlib.sha1("\n".join([str(img_size)] + list(paths)).encode("utf-8")).hexdigest()[:12]
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, f"{subset or 'all'}_{img_size[0]}x{img_size[1]}_{digest}")
+
+
+def build_dataset(paths, labels, num_classes, training=False, img_size=IMG_SIZE, batch_size=BATCH_SIZE,
+                  cache=None, subset=None):
+    """
+    Batched (images, one-hot labels) dataset; images are float32 in [0, 1].
+    cache: None (decode every epoch), "memory", or a directory for an
+    on-disk cache of the decoded, resized images.
+    """
+    paths, labels = list(paths), list(labels)
+    if training:
+        # flow_from_directory lists files class by class: mix them once with a
+        # fixed seed (the order a disk cache is written in), then reshuffle
+        # within SHUFFLE_BUFFER every epoch below
+        order = list(range(len(paths)))
+        random.Random(SHUFFLE_SEED).shuffle(order)
+        paths, labels = [paths[i] for i in order], [labels[i] for i in order]
+
+    def read(path, label):
+        return tf.data.Dataset.from_tensors((tf.io.read_file(path), label))
+
+    def decode(data, label):
+        img = tf.io.decode_image(data, channels=3, expand_animations=False)
+        # Nearest, like flow_from_directory and disease_model.load_image at inference
+        img = tf.image.resize(img, img_size, method="nearest")
+        return tf.cast(img, tf.uint8), label
+
+    ds = tf.data.Dataset.from_tensor_slices((paths, labels))
+    ds = ds.interleave(read, cycle_length=READ_PARALLELISM, num_parallel_calls=AUTOTUNE,
+                       deterministic=not training)
+    ds = ds.map(decode, num_parallel_calls=AUTOTUNE, deterministic=not training)
+    if cache == "memory":
+        ds = ds.cache()
+    elif cache:
+        ds = ds.cache(_cache_file(cache, subset, paths, img_size))
+    if training:
+        ds = ds.shuffle(SHUFFLE_BUFFER, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+
+    augment = _augmenter() if training else None
+
+    def finish(images, batch_labels):
+        images = tf.cast(images, tf.float32) / 255.0
+        if augment is not None:
+            images = augment(images, training=True)
+        return images, tf.one_hot(batch_labels, num_classes)
+
+    ds = ds.map(finish, num_parallel_calls=AUTOTUNE, deterministic=not training)
+    return ds.prefetch(AUTOTUNE)
+
+
+def make_datasets(data_dir=DATA_DIR, img_size=IMG_SIZE, batch_size=BATCH_SIZE,
+                  validation_split=VALIDATION_SPLIT, cache=None):
+    """(train_ds, val_ds, class_indices) — the tf.data version of the two flow_from_directory calls."""
+    train_paths, train_labels, class_indices = list_image_files(data_dir, "training", validation_split)
+    val_paths, val_labels, _ = list_image_files(data_dir, "validation", validation_split)
+    num_classes = len(class_indices)
+
+    train_ds = build_dataset(train_paths, train_labels, num_classes, training=True, img_size=img_size,
+                             batch_size=batch_size, cache=cache, subset="training")
+    val_ds = build_dataset(val_paths, val_labels, num_classes, training=False, img_size=img_size,
+                           batch_size=batch_size, cache=cache, subset="validation")
+    print(f"✅ tf.data: {len(train_paths)} training and {len(val_paths)} validation images, "
+          f"{num_classes} classes")
+    return train_ds, val_ds, class_indices
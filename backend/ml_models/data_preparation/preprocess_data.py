@@ -1,5 +1,6 @@
 import tensorflow as tf
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+from backend.ml_models.data_preparation.input_pipeline import make_datasets
 
 # ---------- CONFIG ----------
 DATA_DIR = r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\data\raw\Maize_Plantain"
@@ -7,32 +8,8 @@ IMG_SIZE = (224, 224)
 BATCH_SIZE = 32
 # ----------------------------
 
-datagen = ImageDataGenerator(
-    rescale=1.0/255.0,
-    validation_split=0.2,
-    rotation_range=25,
-    width_shift_range=0.15,
-    height_shift_range=0.15,
-    shear_range=0.1,
-    zoom_range=0.2,
-    horizontal_flip=True
-)
-
-train_ds = datagen.flow_from_directory(
-    DATA_DIR,
-    target_size=IMG_SIZE,
-    batch_size=BATCH_SIZE,
-    subset='training',
-    class_mode='categorical'
-)
-
-val_ds = datagen.flow_from_directory(
-    DATA_DIR,
-    target_size=IMG_SIZE,
-    batch_size=BATCH_SIZE,
-    subset='validation',
-    class_mode='categorical'
-)
+train_ds, val_ds, class_indices = make_datasets(DATA_DIR, img_size=IMG_SIZE, batch_size=BATCH_SIZE)
 
-print(f"✅ Loaded {train_ds.samples} training images and {val_ds.samples} validation images.")
-print("📚 Classes:", train_ds.class_indices)
+images, labels = next(iter(train_ds))
+print(f"✅ First training batch: images {tuple(images.shape)}, labels {tuple(labels.shape)}")
+print("📚 Classes:", class_indices)
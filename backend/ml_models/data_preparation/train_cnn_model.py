@@ -8,10 +8,11 @@ import tensorflow as tf
 from tensorflow.keras.applications import MobileNetV2
 from tensorflow.keras.models import Model, load_model
 from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping
 import joblib
 
+from backend.ml_models.data_preparation.input_pipeline import make_datasets
+
 # -----------------------------
 # CONFIG
 # -----------------------------
@@ -21,38 +22,20 @@ ENCODER_PATH = r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\models\lab
 IMG_SIZE = (224, 224)
 BATCH_SIZE = 32
 EPOCHS = 20  # you can increase later once verified
+# Cache decoded, resized images: None, "memory", or a directory on disk
+CACHE = r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\data\cache\tf_data"
 # -----------------------------
 
-# Data generators (with augmentation)
-datagen = ImageDataGenerator(
-    rescale=1.0 / 255.0,
-    validation_split=0.2,
-    rotation_range=25,
-    width_shift_range=0.15,
-    height_shift_range=0.15,
-    shear_range=0.1,
-    zoom_range=0.2,
-    horizontal_flip=True
-)
-
-train_ds = datagen.flow_from_directory(
-    DATA_DIR,
-    target_size=IMG_SIZE,
-    batch_size=BATCH_SIZE,
-    subset='training',
-    class_mode='categorical'
-)
-
-val_ds = datagen.flow_from_directory(
+# tf.data input pipeline (parallel decode + augmentation, prefetch);
+# same classes and split as flow_from_directory(validation_split=0.2)
+train_ds, val_ds, label_map = make_datasets(
     DATA_DIR,
-    target_size=IMG_SIZE,
+    img_size=IMG_SIZE,
     batch_size=BATCH_SIZE,
-    subset='validation',
-    class_mode='categorical'
+    cache=CACHE
 )
 
 # Save label encoder mapping
-label_map = train_ds.class_indices
 joblib.dump(label_map, ENCODER_PATH)
 print(f"✅ Label encoder saved at {ENCODER_PATH}")
 print("📚 Classes:", label_map)
@@ -70,7 +53,7 @@ x = base_model.output
 x = GlobalAveragePooling2D()(x)
 x = Dense(256, activation='relu')(x)
 x = Dropout(0.4)(x)
-predictions = Dense(train_ds.num_classes, activation='softmax')(x)
+predictions = Dense(len(label_map), activation='softmax')(x)
 
 model = Model(inputs=base_model.input, outputs=predictions)
 
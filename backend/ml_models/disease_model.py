@@ -4,100 +4,365 @@ Handles loading the trained CNN (MobileNetV2) and performing inference
 for maize and plantain leaf diseases with disease-level classification.
 """
 
+import io
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import tensorflow as tf
-from tensorflow.keras.preprocessing import image
+from PIL import Image
 import joblib
+from backend.ml_models.inference_engines import load_engine
+from backend.ml_models.inference_queue import InferenceScheduler
+from backend.ml_models.model_manager import ModelManager
+from backend.ml_models.prediction_cache import PredictionCache, content_hash, dhash
 
 # -----------------------------
 # CONFIG
 # -----------------------------
-MODEL_PATH = r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\models\disease_model.h5"
-ENCODER_PATH = r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\models\label_encoder.pkl"
+MODEL_PATH = os.getenv(
+    "DISEASE_MODEL_PATH",
+    r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\models\disease_model.h5",
+)
+ENCODER_PATH = os.getenv(
+    "DISEASE_ENCODER_PATH",
+    r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\models\label_encoder.pkl",
+)
 IMG_SIZE = (224, 224)
 
+# Inference engine: "keras" (default), "savedmodel-xla" or "tflite"
+# (exported by data_preparation/export_inference_models.py)
+INFERENCE_ENGINE = os.getenv("DISEASE_INFERENCE_ENGINE", "keras")
+SAVEDMODEL_XLA_DIR = os.getenv(
+    "DISEASE_SAVEDMODEL_XLA_DIR",
+    r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\models\disease_model_xla",
+)
+TFLITE_MODEL_PATH = os.getenv(
+    "DISEASE_TFLITE_MODEL_PATH",
+    r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\models\disease_model.tflite",
+)
+TFLITE_NUM_THREADS = int(os.getenv("TFLITE_NUM_THREADS", os.cpu_count() or 1))
+
+# Micro-batching: concurrent requests are grouped into one engine.predict call
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", 8))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", 15))
+
+# Batch diagnosis: images per forward pass and threads decoding uploads
+BATCH_PREDICT_SIZE = int(os.getenv("BATCH_PREDICT_SIZE", 16))
+BATCH_DECODE_WORKERS = int(os.getenv("BATCH_DECODE_WORKERS", os.cpu_count() or 1))
+
+# Warm-up: dummy batches run once after loading to trace the TF graph
+# e.g. MODEL_WARMUP_BATCH_SIZES="1,8" and MODEL_WARMUP_RUNS=2
+MODEL_WARMUP_BATCH_SIZES = [
+    int(size) for size in os.getenv("MODEL_WARMUP_BATCH_SIZES", f"1,{INFERENCE_MAX_BATCH_SIZE}").split(",")
+    if size.strip()
+]
+MODEL_WARMUP_RUNS = int(os.getenv("MODEL_WARMUP_RUNS", 1))
+
+# Prediction cache: exact (SHA-256) + near-duplicate (dHash) hits for resent photos
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", 1024))
+PREDICTION_CACHE_TTL_SECONDS = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", 3600))
+PREDICTION_CACHE_MAX_DISTANCE = int(os.getenv("PREDICTION_CACHE_MAX_DISTANCE", 4))  # -1 disables near-duplicates
+
 # -----------------------------
-# LOAD MODEL + LABEL ENCODER
+# LOAD MODEL + LABEL ENCODER (background)
 # -----------------------------
-print("🔄 Loading disease classification model and label encoder...")
+def _load_resources():
+    """Load the configured inference engine and label encoder (runs in the loader thread)."""
+    print(f"🔄 Loading disease classification model ({INFERENCE_ENGINE}) and label encoder...")
+
+    engine_paths = {
+        "keras": MODEL_PATH,
+        "savedmodel-xla": SAVEDMODEL_XLA_DIR,
+        "tflite": TFLITE_MODEL_PATH,
+    }
+    engine_path = engine_paths.get(INFERENCE_ENGINE)
+    if engine_path is not None and not os.path.exists(engine_path):
+        raise FileNotFoundError(f"❌ Model file not found at: {engine_path}")
+
+    if not os.path.exists(ENCODER_PATH):
+        raise FileNotFoundError(f"❌ Label encoder not found at: {ENCODER_PATH}")
 
-if not os.path.exists(MODEL_PATH):
-    raise FileNotFoundError(f"❌ Model file not found at: {MODEL_PATH}")
+    engine = load_engine(
+        INFERENCE_ENGINE,
+        keras_path=MODEL_PATH,
+        savedmodel_dir=SAVEDMODEL_XLA_DIR,
+        tflite_path=TFLITE_MODEL_PATH,
+        tflite_threads=TFLITE_NUM_THREADS,
+        tflite_max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+    )
+    label_map = joblib.load(ENCODER_PATH)
+    index_to_label = {v: k for k, v in label_map.items()}
 
-if not os.path.exists(ENCODER_PATH):
-    raise FileNotFoundError(f"❌ Label encoder not found at: {ENCODER_PATH}")
+    print("✅ Model and label encoder loaded successfully.")
+    print("📚 Classes detected:", index_to_label)
+    return {"engine": engine, "label_map": label_map, "index_to_label": index_to_label}
 
-model = tf.keras.models.load_model(MODEL_PATH)
-label_map = joblib.load(ENCODER_PATH)
-index_to_label = {v: k for k, v in label_map.items()}
 
-print("✅ Model and label encoder loaded successfully.")
-print("📚 Classes detected:", index_to_label)
+def _warm_up(resources):
+    """Run dummy 224x224 batches so the first real request skips graph tracing."""
+    engine = resources["engine"]
+    for batch_size in MODEL_WARMUP_BATCH_SIZES:
+        dummy = np.zeros((batch_size, IMG_SIZE[0], IMG_SIZE[1], 3), dtype=np.float32)
+        for _ in range(MODEL_WARMUP_RUNS):
+            engine.predict(dummy)
+
+
+model_manager = ModelManager("disease_model", _load_resources, warmup=_warm_up)
+
+# -----------------------------
+# INFERENCE SCHEDULER
+# -----------------------------
+scheduler = InferenceScheduler(
+    lambda batch: model_manager.get()["engine"].predict(batch),
+    max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=INFERENCE_MAX_WAIT_MS,
+)
+
+
+prediction_cache = PredictionCache(
+    max_entries=PREDICTION_CACHE_SIZE,
+    ttl_seconds=PREDICTION_CACHE_TTL_SECONDS,
+    max_distance=PREDICTION_CACHE_MAX_DISTANCE,
+)
+
+
+def get_inference_stats():
+    """Queue depth and batch-size statistics of the inference scheduler."""
+    stats = scheduler.stats()
+    stats["engine"] = INFERENCE_ENGINE
+    stats["prediction_cache"] = prediction_cache.stats()
+    return stats
 
 # -----------------------------
 # IMAGE PREPROCESSING
 # -----------------------------
-def preprocess_image(img_path):
-    """Load and preprocess an image for model prediction."""
-    if not os.path.exists(img_path):
-        raise FileNotFoundError(f"Image file not found: {img_path}")
+def _read_source(img_source):
+    """Raw bytes of an image source (ndarrays are returned unchanged)."""
+    if isinstance(img_source, np.ndarray):
+        return img_source
+    if isinstance(img_source, (bytes, bytearray, memoryview)):
+        return bytes(img_source)
+    if hasattr(img_source, "read"):
+        return img_source.read()
+    if not os.path.exists(img_source):
+        raise FileNotFoundError(f"Image file not found: {img_source}")
+    with open(img_source, "rb") as f:
+        return f.read()
+
+
+def load_image(img_source):
+    """
+    Decode an image into an RGB PIL image resized to IMG_SIZE.
+    Accepts a file path, raw bytes, a file-like object or a decoded
+    ndarray of pixels (H x W x C, values 0-255).
+    """
+    data = _read_source(img_source)
+    if isinstance(data, np.ndarray):
+        pixels = data[0] if data.ndim == 4 and data.shape[0] == 1 else data
+        img = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    else:
+        img = Image.open(io.BytesIO(data))
+
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    # Same interpolation as keras load_img / flow_from_directory used in training
+    if img.size != IMG_SIZE:
+        img = img.resize(IMG_SIZE, Image.NEAREST)
+    return img
 
-    img = image.load_img(img_path, target_size=IMG_SIZE)
-    img_array = image.img_to_array(img)
+
+def image_to_array(img):
+    """Convert a decoded PIL image into a (1, 224, 224, 3) model input in [0, 1]."""
+    img_array = np.asarray(img, dtype=np.float32)
     img_array = np.expand_dims(img_array, axis=0)
     img_array = img_array / 255.0
     return img_array
 
 
+def preprocess_image(img_source):
+    """Decode and preprocess an image (path, bytes, file-like or ndarray) for model prediction."""
+    return image_to_array(load_image(img_source))
+
+
 # -----------------------------
-# PREDICTION FUNCTION
+# PREDICTION FUNCTIONS
 # -----------------------------
-def predict_disease(img_path):
+def _format_prediction(preds, index_to_label):
+    """JSON-serializable result for one row of class probabilities."""
+    pred_index = int(np.argmax(preds))
+    return {
+        "predicted_label": index_to_label[pred_index],
+        "confidence": float(preds[pred_index]),
+        "probabilities": {index_to_label[i]: float(round(p, 4)) for i, p in enumerate(preds)},
+    }
+
+
+def predict_disease(img_source, use_cache=True):
     """
-    Predict crop disease given an image path.
+    Predict crop disease given an image path, raw bytes, a file-like
+    object or a decoded ndarray.
+    Set use_cache=False to bypass the prediction cache for this request.
     Returns a JSON-serializable dictionary with:
       - predicted_label
       - confidence
       - probabilities (dict)
+      - cache ("exact", "perceptual", "miss" or "bypass")
     """
     try:
-        # Preprocess input image
-        img_array = preprocess_image(img_path)
+        index_to_label = model_manager.get()["index_to_label"]
+        data = _read_source(img_source)
+
+        # Exact resend: skip decoding entirely
+        key = phash = None
+        if use_cache:
+            key = content_hash(data)
+            cached = prediction_cache.get_exact(key)
+            if cached is not None:
+                print(f"♻️ Prediction cache hit (exact): {cached['predicted_label']}")
+                return dict(cached, cache="exact")
+
+        img = load_image(data)
+
+        # Recompressed resend: match on perceptual hash
+        if use_cache:
+            phash = dhash(img)
+            cached = prediction_cache.get_perceptual(phash)
+            if cached is not None:
+                print(f"♻️ Prediction cache hit (near-duplicate): {cached['predicted_label']}")
+                prediction_cache.put(key, phash, cached)
+                return dict(cached, cache="perceptual")
 
-        # Run inference
-        preds = model.predict(img_array)
-        pred_index = int(np.argmax(preds[0]))
-        confidence = float(preds[0][pred_index])
-        predicted_label = index_to_label[pred_index]
+        # Preprocess input image
+        img_array = image_to_array(img)
 
-        # Convert probabilities to readable mapping
-        probabilities = {
-            index_to_label[i]: float(round(p, 4)) for i, p in enumerate(preds[0])
-        }
+        # Run inference (batched together with concurrent requests)
+        preds = scheduler.predict(img_array)
+        result = _format_prediction(preds, index_to_label)
 
         print(f"🧠 Prediction completed:")
-        print(f"   - Label: {predicted_label}")
-        print(f"   - Confidence: {confidence * 100:.2f}%")
-        print(f"   - All probabilities: {probabilities}")
+        print(f"   - Label: {result['predicted_label']}")
+        print(f"   - Confidence: {result['confidence'] * 100:.2f}%")
+        print(f"   - All probabilities: {result['probabilities']}")
 
-        # Return structured result
-        return {
-            "predicted_label": predicted_label,
-            "confidence": confidence,
-            "probabilities": probabilities
-        }
+        if use_cache:
+            prediction_cache.put(key, phash, result)
+        return dict(result, cache="miss" if use_cache else "bypass")
 
     except Exception as e:
         print(f"❌ Error during prediction: {str(e)}")
         return {"error": str(e)}
 
 
+def _prepare_for_batch(img_source, use_cache):
+    """
+    Decode one image of a batch (runs on the decode pool). Returns a dict with
+    either a cached result, an (H, W, C) model input, or an error.
+    """
+    try:
+        data = _read_source(img_source)
+        key = phash = None
+        if use_cache:
+            key = content_hash(data)
+            cached = prediction_cache.get_exact(key)
+            if cached is not None:
+                return {"result": dict(cached, cache="exact")}
+        img = load_image(data)
+        if use_cache:
+            phash = dhash(img)
+            cached = prediction_cache.get_perceptual(phash)
+            if cached is not None:
+                prediction_cache.put(key, phash, cached)
+                return {"result": dict(cached, cache="perceptual")}
+        return {"array": image_to_array(img)[0], "key": key, "phash": phash}
+    except Exception as e:
+        return {"result": {"error": str(e)}}
+
+
+def _map_ahead(pool, fn, items, window):
+    """
+    Ordered pool.map() that reads items lazily and keeps at most `window`
+    calls submitted ahead of the consumer (Executor.map submits them all).
+    """
+    pending = deque()
+    for item in items:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(pool.submit(fn, item))
+    while pending:
+        yield pending.popleft().result()
+
+
+def predict_disease_batch(img_sources, use_cache=True, batch_size=None, decode_workers=None):
+    """
+    Predict many images (paths, bytes, file-likes or ndarrays) at once.
+    Images are decoded in parallel on a thread pool and every batch_size
+    decoded images go through the model as one forward pass; the next batch
+    is decoded while the current one runs. At most 2 * batch_size images
+    are decoded ahead, so memory follows the batch size, not the upload.
+    Yields one result per image, in input order, shaped like predict_disease()
+    (a failed image yields {"error": ...} without stopping the rest).
+    """
+    batch_size = max(1, int(batch_size or BATCH_PREDICT_SIZE))
+    index_to_label = model_manager.get()["index_to_label"]
+    cache_label = "miss" if use_cache else "bypass"
+
+    def finish(chunk, future):
+        preds = None
+        error = None
+        if future is not None:
+            try:
+                preds = future.result()
+            except Exception as e:
+                print(f"❌ Error during batch prediction: {str(e)}")
+                error = str(e)
+        row = 0
+        for prepared in chunk:
+            if "result" in prepared:
+                yield prepared["result"]
+                continue
+            if error is not None:
+                yield {"error": error}
+                continue
+            result = _format_prediction(preds[row], index_to_label)
+            row += 1
+            if use_cache:
+                prediction_cache.put(prepared["key"], prepared["phash"], result)
+            yield dict(result, cache=cache_label)
+
+    def submit(chunk):
+        arrays = [prepared["array"] for prepared in chunk if "array" in prepared]
+        return scheduler.submit_batch(arrays) if arrays else None
+
+    with ThreadPoolExecutor(max_workers=decode_workers or BATCH_DECODE_WORKERS) as pool:
+        # Decodes ahead of the model; results come back in input order
+        prepared_iter = _map_ahead(pool, lambda source: _prepare_for_batch(source, use_cache), img_sources,
+                                   window=batch_size * 2)
+        pending = None
+        chunk, rows = [], 0
+        for prepared in prepared_iter:
+            chunk.append(prepared)
+            rows += "array" in prepared
+            if rows < batch_size:
+                continue
+            future = submit(chunk)
+            if pending is not None:
+                yield from finish(*pending)
+            pending, chunk, rows = (chunk, future), [], 0
+        if chunk:
+            future = submit(chunk)
+            if pending is not None:
+                yield from finish(*pending)
+            pending = (chunk, future)
+        if pending is not None:
+            yield from finish(*pending)
+
+
 # -----------------------------
 # TEST (Standalone Execution)
 # -----------------------------
 if __name__ == "__main__":
     # Example test
+    model_manager.wait_until_ready()
     test_image = r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\data\raw\Maize_Plantain\Plantain___pestalotiopsis\4_aug.jpeg"
     if os.path.exists(test_image):
         result = predict_disease(test_image)
@@ -0,0 +1,109 @@
+"""
+forecast_registry.py
+In-memory registry of pickled forecast models (Prophet).
+A model is unpickled once and kept in memory; lookups re-check the file at
+most every check_seconds (os.stat: mtime + size) and reload it only when it
+changed, e.g. after retraining. Each loaded model gets a version string so
+forecasts computed from it can be cached until the model is replaced.
+"""
+
+import os
+import pickle
+import threading
+import time
+
+
+def _unpickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+class _Entry:
+    __slots__ = ("model", "version", "signature", "checked_at", "loaded_at")
+
+    def __init__(self, model, signature):
+        self.model = model
+        self.signature = signature
+        self.version = f"{signature[0]}-{signature[1]}"
+        self.checked_at = time.monotonic()
+        self.loaded_at = time.time()
+
+
+class ForecastModelRegistry:
+    """
+    get(path) -> (model, version)
+    - loader(path): how to load a model file (default: pickle.load)
+    - check_seconds: minimum interval between change checks per model file
+    Raises FileNotFoundError when the model file does not exist (yet).
+    """
+
+    def __init__(self, loader=_unpickle, check_seconds=5.0, name="forecast_models"):
+        self.loader = loader
+        self.check_seconds = float(check_seconds)
+        self.name = name
+
+        self._entries = {}      # path -> _Entry
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.loads = 0
+        self.errors = 0
+
+    # -----------------------------
+    # PUBLIC API
+    # -----------------------------
+    def get(self, path):
+        entry = self._entries.get(path)
+        if entry is not None and time.monotonic() - entry.checked_at < self.check_seconds:
+            self.hits += 1
+            return entry.model, entry.version
+
+        with self._lock:
+            entry = self._entries.get(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                self._entries.pop(path, None)
+                raise FileNotFoundError(f"No forecast model at {path}")
+
+            signature = (st.st_mtime_ns, st.st_size)
+            if entry is not None and entry.signature == signature:
+                entry.checked_at = time.monotonic()
+                self.hits += 1
+                return entry.model, entry.version
+
+            try:
+                model = self.loader(path)
+            except Exception as e:
+                self.errors += 1
+                if entry is not None:
+                    # Keep serving the previous model rather than failing requests
+                    print(f"❌ [{self.name}] could not reload {path}: {e}. Keeping previous model.")
+                    entry.checked_at = time.monotonic()
+                    return entry.model, entry.version
+                raise
+
+            entry = self._entries[path] = _Entry(model, signature)
+            self.loads += 1
+            print(f"📦 [{self.name}] loaded {os.path.basename(path)} (version {entry.version})")
+            return entry.model, entry.version
+
+    def invalidate(self, path=None):
+        """Forget one model (or all) so the next get() reloads it from disk."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+    def stats(self):
+        return {
+            "models": {
+                path: {"version": entry.version, "loaded_at": entry.loaded_at}
+                for path, entry in list(self._entries.items())
+            },
+            "check_seconds": self.check_seconds,
+            "hits": self.hits,
+            "loads": self.loads,
+            "errors": self.errors,
+        }
@@ -0,0 +1,288 @@
+"""
+forecast_trainer.py
+Background training of the per-city weather forecast models.
+A scheduler thread wakes every FORECAST_TRAIN_INTERVAL_SECONDS (or when a
+city is requested) and retrains only the cities that logged new rows since
+their last fit. Cities are fitted in parallel in a thread pool (Prophet's
+optimizer runs in a CmdStan subprocess, so threads do not serialize on the
+GIL; FORECAST_TRAIN_EXECUTOR=process uses a spawn process pool instead), each
+fit warm-starts from the city's previous model, and the new
+pickle is swapped in with os.replace, so the forecast endpoint keeps serving
+the old model and never waits for training. With FORECAST_ENGINE=harmonic
+all due cities are fitted together in one vectorized NumPy batch instead.
+Each model has a <city>.json sidecar recording what it was trained on.
+"""
+
+import json
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from backend.ml_models.weather_predictor import (
+    FORECAST_ENGINE, city_model_path, fit_weather_model, fit_weather_models, save_weather_model,
+)
+from backend.utils.weather_store import weather_store, city_slug
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+FORECAST_TRAIN_INTERVAL_SECONDS = float(os.getenv("FORECAST_TRAIN_INTERVAL_SECONDS", 3600))
+FORECAST_TRAIN_WORKERS = int(os.getenv("FORECAST_TRAIN_WORKERS", min(4, os.cpu_count() or 1)))
+# "thread" (default) or "process"
+FORECAST_TRAIN_EXECUTOR = os.getenv("FORECAST_TRAIN_EXECUTOR", "thread").lower()
+# Observations a city needs before its first model is fitted
+FORECAST_MIN_ROWS = int(os.getenv("FORECAST_MIN_ROWS", 24))
+# Comma-separated cities to train; empty = every city in the weather store
+FORECAST_CITIES = [c.strip() for c in os.getenv("FORECAST_CITIES", "").split(",") if c.strip()]
+
+
+def _meta_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+def read_meta(path):
+    """Training metadata of a model file ({} if it was never trained)."""
+    try:
+        with open(_meta_path(path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_meta(path, meta):
+    tmp_path = f"{_meta_path(path)}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, _meta_path(path))
+
+
+def train_city_job(city, df, path):
+    """
+    Fit and save one city's model (runs in a worker process).
+    Returns the metadata written next to the model.
+    """
+    started = time.time()
+    previous = None
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                previous = pickle.load(f)
+        except Exception as e:
+            print(f"⚠️ Could not load previous model for {city}: {e}")
+
+    save_weather_model(fit_weather_model(df, previous), path)
+    return _finish(city, df, path, started, warm_start=previous is not None)
+
+
+def train_cities_batch(jobs):
+    """
+    Fit every city of jobs ({city: (df, path)}) in one vectorized call
+    (harmonic engine; runs in the trainer thread). Returns {city: metadata}.
+    """
+    started = time.time()
+    models = fit_weather_models({city: df for city, (df, _) in jobs.items()}, engine="harmonic")
+    results = {}
+    for city, (df, path) in jobs.items():
+        save_weather_model(models[city], path)
+        results[city] = _finish(city, df, path, started, warm_start=False, batch_size=len(jobs))
+    return results
+
+
+def _finish(city, df, path, started, warm_start, batch_size=1):
+    meta = {
+        "city": city,
+        "rows": len(df),
+        "trained_through": str(df["date"].max()),
+        "warm_start": warm_start,
+        "batch_size": batch_size,
+        "trained_at": time.time(),
+        "train_seconds": round(time.time() - started, 2),
+    }
+    write_meta(path, meta)
+    return meta
+
+
+class ForecastTrainer:
+    """
+    start()          run the scheduler thread (idempotent)
+    request(city)    ask for a city's model soon (e.g. the forecast route
+                     found none); never blocks
+    run_once()       check every city and train those with new rows (blocking)
+    """
+
+    def __init__(self, store=weather_store, path_for=None, cities=FORECAST_CITIES,
+                 interval_seconds=FORECAST_TRAIN_INTERVAL_SECONDS, workers=FORECAST_TRAIN_WORKERS,
+                 min_rows=FORECAST_MIN_ROWS, train_fn=train_city_job, executor_factory=None,
+                 batch_train_fn=None, executor=FORECAST_TRAIN_EXECUTOR):
+        self.store = store
+        self.path_for = path_for
+        self.cities = list(cities or [])
+        self.interval_seconds = float(interval_seconds)
+        self.workers = max(1, int(workers))
+        self.min_rows = int(min_rows)
+        self.train_fn = train_fn
+        self.executor_factory = executor_factory or (
+            self._process_pool if executor == "process" else self._thread_pool
+        )
+        # fn({city: (df, path)}) -> {city: meta}: fits all due cities in one call
+        self.batch_train_fn = batch_train_fn
+
+        self._executor = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._requested = set()
+
+        self.runs = 0
+        self.trained = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_run_at = None
+        self.last_error = None
+        self.models = {}    # city slug -> metadata of its current model
+
+    # -----------------------------
+    # PUBLIC API
+    # -----------------------------
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="forecast-trainer", daemon=True)
+                self._thread.start()
+
+    def request(self, city):
+        self._requested.add(city_slug(city))
+        self._wake.set()
+
+    def run_once(self):
+        """Retrain every city with new rows; returns {city: metadata or error}."""
+        with self._run_lock:
+            self.runs += 1
+            self.last_run_at = time.time()
+            self.store.flush()
+            jobs = {}
+            for city in self._candidate_cities():
+                df = self._training_rows(city)
+                if df is not None:
+                    jobs[city] = df
+            if not jobs:
+                return {}
+            if self.batch_train_fn is not None:
+                return self._run_batch(jobs)
+
+            executor = self._get_executor()
+            futures = {
+                city: executor.submit(self.train_fn, city, df, self._path(city))
+                for city, df in jobs.items()
+            }
+            results = {}
+            for city, future in futures.items():
+                try:
+                    meta = future.result()
+                except Exception as e:
+                    if isinstance(e, BrokenProcessPool):
+                        # A worker died (e.g. out of memory): start a fresh pool next run
+                        self._executor = None
+                    self.errors += 1
+                    self.last_error = f"{city}: {e}"
+                    print(f"❌ Forecast training failed for {city}: {e}")
+                    results[city] = {"error": str(e)}
+                    continue
+                self._record(city, meta)
+                results[city] = meta
+            return results
+
+    def stats(self):
+        return {
+            "interval_seconds": self.interval_seconds,
+            "workers": self.workers,
+            "min_rows": self.min_rows,
+            "runs": self.runs,
+            "trained": self.trained,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_run_at": self.last_run_at,
+            "pending_requests": sorted(self._requested),
+            "models": dict(self.models),
+        }
+
+    # -----------------------------
+    # INTERNALS
+    # -----------------------------
+    def _path(self, city):
+        return (self.path_for or city_model_path)(city)
+
+    def _run_batch(self, jobs):
+        try:
+            results = self.batch_train_fn({city: (df, self._path(city)) for city, df in jobs.items()})
+        except Exception as e:
+            self.errors += 1
+            self.last_error = f"batch of {len(jobs)}: {e}"
+            print(f"❌ Forecast batch training failed for {', '.join(jobs)}: {e}")
+            return {city: {"error": str(e)} for city in jobs}
+        for city, meta in results.items():
+            self._record(city, meta)
+        return results
+
+    def _record(self, city, meta):
+        self.trained += 1
+        self.models[city] = meta
+        print(f"📈 Forecast model for {city} retrained on {meta['rows']} rows "
+              f"in {meta['train_seconds']}s (warm start: {meta['warm_start']})")
+
+    def _candidate_cities(self):
+        cities = {city_slug(city) for city in self.cities} if self.cities else set(self.store.cities())
+        requested, self._requested = self._requested, set()
+        return sorted(cities | requested)
+
+    def _training_rows(self, city):
+        """The city's full history if it has rows newer than its model, else None."""
+        meta = read_meta(self._path(city))
+        trained_through = meta.get("trained_through")
+        if trained_through is not None:
+            # Only the partitions from the last fit onwards are read for the check
+            recent = self.store.read(cities=[city], start=trained_through)
+            if not (recent["date"].astype(str) > trained_through).any():
+                self.skipped += 1
+                self.models.setdefault(city, meta)
+                return None
+        df = self.store.read(cities=[city])
+        if len(df) < self.min_rows:
+            self.skipped += 1
+            return None
+        return df
+
+    def _thread_pool(self):
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="forecast-train")
+
+    def _process_pool(self):
+        # spawn: forking a process that runs Flask/worker threads is unsafe. Workers
+        # re-import the main module, which is why app.py starts nothing at import time
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = self.executor_factory()
+        return self._executor
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                print(f"❌ Forecast training run failed: {e}")
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+
+
+forecast_trainer = ForecastTrainer(
+    batch_train_fn=train_cities_batch if FORECAST_ENGINE == "harmonic" else None,
+)
@@ -0,0 +1,138 @@
+"""
+harmonic_forecast.py
+NumPy-only temperature forecaster: ridge-regularised harmonic regression
+(level + linear trend + daily and yearly Fourier terms). It is a drop-in
+alternative to Prophet for short per-city series.
+- fit_batch() fits many cities at once: series are padded to a common
+  length, and the normal equations of all cities are built with one batched
+  matmul and solved with one batched np.linalg.solve.
+- HarmonicForecaster mimics the parts of Prophet's interface the app uses
+  (make_future_dataframe / predict returning ds, yhat, yhat_lower, yhat_upper),
+  so it can be pickled, registered and cached exactly like a Prophet model.
+"""
+
+import numpy as np
+import pandas as pd
+
+DAILY_ORDER = 3         # Fourier pairs for the 24h cycle
+YEARLY_ORDER = 2        # Fourier pairs for the seasonal cycle
+RIDGE = 1e-2            # penalty on every coefficient except the level
+# Yearly terms are only estimated once a city has this much history; before
+# that they are penalised to ~0 instead of fighting the trend
+MIN_YEARLY_SPAN_DAYS = 300
+INTERVAL_Z = 1.2816     # 80% interval, Prophet's default interval_width
+DAY_SECONDS = 86400.0
+YEAR_DAYS = 365.25
+
+
+def _to_days(ds):
+    """Datetimes -> float days since the Unix epoch."""
+    values = pd.to_datetime(pd.Series(ds), cache=False).to_numpy(dtype="datetime64[ns]")
+    return values.astype(np.int64) / 1e9 / DAY_SECONDS
+
+
+def design_matrix(days, t0, daily_order=DAILY_ORDER, yearly_order=YEARLY_ORDER):
+    """
+    Regressors for times `days` (any shape, float days since epoch) and a
+    per-series origin t0 (broadcast against days' leading axes).
+    Returns an array of shape days.shape + (num_features,).
+    """
+    days = np.asarray(days, dtype=np.float64)
+    columns = [np.ones_like(days), (days - t0) / YEAR_DAYS]
+    for k in range(1, daily_order + 1):
+        angle = 2 * np.pi * k * days
+        columns += [np.cos(angle), np.sin(angle)]
+    for k in range(1, yearly_order + 1):
+        angle = 2 * np.pi * k * days / YEAR_DAYS
+        columns += [np.cos(angle), np.sin(angle)]
+    return np.stack(columns, axis=-1)
+
+
+class HarmonicForecaster:
+    """A fitted harmonic regression for one series."""
+
+    engine = "harmonic"
+
+    def __init__(self, coef, t0, sigma, last_ds, n_obs,
+                 daily_order=DAILY_ORDER, yearly_order=YEARLY_ORDER):
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.t0 = float(t0)
+        self.sigma = float(sigma)
+        self.last_ds = pd.Timestamp(last_ds)
+        self.n_obs = int(n_obs)
+        self.daily_order = daily_order
+        self.yearly_order = yearly_order
+
+    def make_future_dataframe(self, periods, freq="D"):
+        """The next `periods` timestamps after the last observation."""
+        ds = pd.date_range(self.last_ds, periods=periods + 1, freq=freq)[1:]
+        return pd.DataFrame({"ds": ds})
+
+    def predict(self, future):
+        """Forecast for future["ds"]: DataFrame with ds, yhat, yhat_lower, yhat_upper."""
+        X = design_matrix(_to_days(future["ds"]), self.t0, self.daily_order, self.yearly_order)
+        yhat = X @ self.coef
+        band = INTERVAL_Z * self.sigma
+        return pd.DataFrame({
+            "ds": pd.to_datetime(future["ds"]).reset_index(drop=True),
+            "yhat": yhat,
+            "yhat_lower": yhat - band,
+            "yhat_upper": yhat + band,
+        })
+
+
+def fit_batch(series, daily_order=DAILY_ORDER, yearly_order=YEARLY_ORDER, ridge=RIDGE):
+    """
+    Fit one model per (ds, y) series in a single vectorized solve.
+    Series may have different lengths; shorter ones are zero-weighted
+    padding. Returns a list of HarmonicForecaster in input order.
+    """
+    if not series:
+        return []
+    days = [_to_days(ds) for ds, _ in series]
+    ys = [np.asarray(y, dtype=np.float64) for _, y in series]
+    count = len(series)
+    length = max(len(d) for d in days)
+
+    # Padded (C, N) arrays; weight 0 marks padding
+    T = np.zeros((count, length))
+    Y = np.zeros((count, length))
+    W = np.zeros((count, length))
+    for i, (d, y) in enumerate(zip(days, ys)):
+        T[i, :len(d)] = d
+        Y[i, :len(y)] = y
+        W[i, :len(d)] = 1.0
+    t0 = np.array([d.min() for d in days])
+    spans = np.array([d.max() - d.min() for d in days])
+    n = W.sum(axis=1)
+
+    X = design_matrix(T, t0[:, None], daily_order, yearly_order)        # (C, N, P)
+    XW = X * W[:, :, None]
+    XtX = np.matmul(XW.transpose(0, 2, 1), X)                           # (C, P, P)
+    XtY = np.matmul(XW.transpose(0, 2, 1), Y[:, :, None])[..., 0]       # (C, P)
+
+    # Ridge penalty (scaled by sample count); never on the level
+    num_features = X.shape[-1]
+    penalty = np.full((count, num_features), ridge)
+    penalty[:, 0] = 0.0
+    yearly = slice(2 + 2 * daily_order, num_features)
+    penalty[spans < MIN_YEARLY_SPAN_DAYS, yearly] = 1e6
+    XtX = XtX + penalty[:, :, None] * np.eye(num_features) * np.maximum(n, 1)[:, None, None]
+
+    coef = np.linalg.solve(XtX, XtY[..., None])[..., 0]                # (C, P)
+    residuals = (Y - np.matmul(X, coef[:, :, None])[..., 0]) * W
+    dof = np.maximum(n - num_features, 1)
+    sigma = np.sqrt((residuals ** 2).sum(axis=1) / dof)
+
+    return [
+        HarmonicForecaster(
+            coef[i], t0[i], sigma[i], pd.Timestamp(round(d.max() * DAY_SECONDS), unit="s"), n[i],
+            daily_order=daily_order, yearly_order=yearly_order,
+        )
+        for i, d in enumerate(days)
+    ]
+
+
+def fit(ds, y, **kwargs):
+    """Fit a single series."""
+    return fit_batch([(ds, y)], **kwargs)[0]
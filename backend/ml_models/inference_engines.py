@@ -0,0 +1,110 @@
+"""
+inference_engines.py
+CPU inference backends for the disease classifier.
+All engines expose the same interface: predict(batch) takes a float32
+(N, 224, 224, 3) array scaled to [0, 1] and returns (N, num_classes)
+probabilities.
+  - keras:          full-precision Keras .h5 model (reference / fallback)
+  - savedmodel-xla: SavedModel whose serving signature is XLA-compiled
+  - tflite:         dynamic-range or int8-quantized TFLite model
+"""
+
+import threading
+import numpy as np
+
+ENGINE_NAMES = ("keras", "savedmodel-xla", "tflite")
+
+
+class KerasEngine:
+    name = "keras"
+
+    def __init__(self, model_path):
+        import tensorflow as tf
+        self.model = tf.keras.models.load_model(model_path)
+
+    def predict(self, batch):
+        return self.model.predict(batch, verbose=0)
+
+
+class SavedModelXLAEngine:
+    name = "savedmodel-xla"
+
+    def __init__(self, saved_model_dir, signature="serving_default"):
+        import tensorflow as tf
+        self._tf = tf
+        self._loaded = tf.saved_model.load(saved_model_dir)
+        self._fn = self._loaded.signatures[signature]
+        self._input_name = list(self._fn.structured_input_signature[1].keys())[0]
+        self._output_name = list(self._fn.structured_outputs.keys())[0]
+
+    def predict(self, batch):
+        inputs = self._tf.convert_to_tensor(batch, dtype=self._tf.float32)
+        outputs = self._fn(**{self._input_name: inputs})
+        return outputs[self._output_name].numpy()
+
+
+class TFLiteEngine:
+    name = "tflite"
+
+    def __init__(self, model_path, num_threads=None, max_batch_size=8):
+        # Prefer the slim tflite_runtime wheel when installed (much smaller RSS)
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self._interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        # Tensors are sized once for max_batch_size: smaller batches are padded
+        # and larger ones split, so predict() never re-allocates
+        self.max_batch_size = max(1, int(max_batch_size))
+        input_details = self._interpreter.get_input_details()[0]
+        shape = list(input_details["shape"])
+        shape[0] = self.max_batch_size
+        self._interpreter.resize_tensor_input(input_details["index"], shape)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        # The interpreter is not thread-safe
+        self._lock = threading.Lock()
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        size = self.max_batch_size
+        with self._lock:
+            return np.concatenate([self._invoke(batch[i:i + size]) for i in range(0, batch.shape[0], size)])
+
+    def _invoke(self, chunk):
+        """Run up to max_batch_size rows, zero-padded to the allocated shape."""
+        rows = chunk.shape[0]
+        if rows < self.max_batch_size:
+            padding = np.zeros((self.max_batch_size - rows,) + chunk.shape[1:], dtype=np.float32)
+            chunk = np.concatenate([chunk, padding])
+
+        input_dtype = self._input["dtype"]
+        if input_dtype in (np.int8, np.uint8):
+            scale, zero_point = self._input["quantization"]
+            chunk = np.clip(np.round(chunk / scale + zero_point),
+                            np.iinfo(input_dtype).min, np.iinfo(input_dtype).max)
+            chunk = chunk.astype(input_dtype)
+
+        self._interpreter.set_tensor(self._input["index"], chunk)
+        self._interpreter.invoke()
+        preds = self._interpreter.get_tensor(self._output["index"])[:rows].copy()
+
+        if self._output["dtype"] in (np.int8, np.uint8):
+            scale, zero_point = self._output["quantization"]
+            preds = (preds.astype(np.float32) - zero_point) * scale
+        return preds
+
+
+def load_engine(name, keras_path=None, savedmodel_dir=None, tflite_path=None, tflite_threads=None,
+                tflite_max_batch_size=8):
+    """Instantiate the configured inference engine."""
+    if name == "keras":
+        return KerasEngine(keras_path)
+    if name == "savedmodel-xla":
+        return SavedModelXLAEngine(savedmodel_dir)
+    if name == "tflite":
+        return TFLiteEngine(tflite_path, num_threads=tflite_threads, max_batch_size=tflite_max_batch_size)
+    raise ValueError(f"Unknown inference engine '{name}'. Choose one of: {', '.join(ENGINE_NAMES)}")
@@ -0,0 +1,208 @@
+"""
+inference_queue.py
+Micro-batching scheduler for CNN inference.
+Concurrent callers submit one preprocessed image each; a single worker thread
+groups whatever is waiting into one batch, runs one forward pass for the whole
+batch and hands every caller back its own row of predictions.
+Callers that already hold many images (batch diagnosis) submit them as one
+block with submit_batch(); blocks are never split across forward passes.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class _PendingItem:
+    """One queued image (or block of images) with the future its caller is waiting on."""
+
+    __slots__ = ("array", "future", "enqueued_at", "single")
+
+    def __init__(self, array, single=True):
+        self.array = array
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+        self.single = single
+
+    @property
+    def rows(self):
+        return self.array.shape[0]
+
+
+class InferenceScheduler:
+    """
+    Collects concurrent prediction requests into batches.
+    - max_batch_size: upper bound on images per forward pass.
+    - max_wait_ms: how long the first image of a batch may wait for company.
+    A block from submit_batch() larger than max_batch_size runs as its own
+    forward pass.
+    The predict function receives a stacked (N, H, W, C) array and must return
+    an (N, num_classes) array.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=8, max_wait_ms=10.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait_ms = float(max_wait_ms)
+
+        self._queue = queue.Queue()
+        self._carry = None          # item that did not fit in the previous batch
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+        # Stats
+        self._batches = 0
+        self._requests = 0
+        self._errors = 0
+        self._largest_batch = 0
+        self._batch_size_histogram = {}
+        self._last_batch_ms = 0.0
+        self._total_wait_ms = 0.0
+
+    # -----------------------------
+    # PUBLIC API
+    # -----------------------------
+    def start(self):
+        """Start the worker thread (idempotent; called lazily on first submit)."""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._worker, name="inference-scheduler", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, img_array):
+        """
+        Queue a single preprocessed image, shaped (H, W, C) or (1, H, W, C).
+        Returns a Future resolving to that image's prediction row.
+        """
+        img_array = np.asarray(img_array)
+        if img_array.ndim == 3:
+            img_array = np.expand_dims(img_array, axis=0)
+        if img_array.shape[0] != 1:
+            raise ValueError(f"Expected a single image, got batch of {img_array.shape[0]}")
+
+        self.start()
+        item = _PendingItem(img_array)
+        self._queue.put(item)
+        return item.future
+
+    def submit_batch(self, img_arrays):
+        """
+        Queue many preprocessed images as one block, either a stacked
+        (N, H, W, C) array or a sequence of (H, W, C) / (1, H, W, C) arrays.
+        Returns a Future resolving to the (N, num_classes) predictions.
+        """
+        if isinstance(img_arrays, np.ndarray) and img_arrays.ndim == 4:
+            block = img_arrays
+        else:
+            block = np.concatenate(
+                [a if np.ndim(a) == 4 else np.expand_dims(a, axis=0) for a in img_arrays], axis=0
+            )
+        if block.shape[0] == 0:
+            raise ValueError("submit_batch() needs at least one image")
+
+        self.start()
+        item = _PendingItem(block, single=False)
+        self._queue.put(item)
+        return item.future
+
+    def run_batch(self, img_arrays, timeout=None):
+        """Blocking helper: predict a block of images in one forward pass."""
+        return self.submit_batch(img_arrays).result(timeout=timeout)
+
+    def predict(self, img_array, timeout=None):
+        """Blocking helper: submit an image and wait for its prediction row."""
+        return self.submit(img_array).result(timeout=timeout)
+
+    def stats(self):
+        """Snapshot of queue depth and batch-size statistics."""
+        with self._stats_lock:
+            avg_batch = self._requests / self._batches if self._batches else 0.0
+            avg_wait = self._total_wait_ms / self._requests if self._requests else 0.0
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "batches": self._batches,
+                "requests": self._requests,
+                "errors": self._errors,
+                "avg_batch_size": round(avg_batch, 2),
+                "largest_batch": self._largest_batch,
+                "batch_size_histogram": dict(sorted(self._batch_size_histogram.items())),
+                "avg_queue_wait_ms": round(avg_wait, 2),
+                "last_batch_ms": round(self._last_batch_ms, 2),
+            }
+
+    # -----------------------------
+    # WORKER
+    # -----------------------------
+    def _collect_batch(self):
+        """Block for the first item, then gather more until full or max_wait expires."""
+        first, self._carry = self._carry, None
+        batch = [first if first is not None else self._queue.get()]
+        rows = batch[0].rows
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+
+        while rows < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    # Still take anything that is already waiting.
+                    item = self._queue.get_nowait()
+                else:
+                    item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if rows + item.rows > self.max_batch_size:
+                # Blocks are not split: it leads the next batch instead
+                self._carry = item
+                break
+            batch.append(item)
+            rows += item.rows
+        return batch
+
+    def _run_batch(self, batch):
+        started = time.monotonic()
+        try:
+            inputs = np.concatenate([item.array for item in batch], axis=0)
+            preds = np.asarray(self.predict_fn(inputs))
+            if preds.shape[0] != inputs.shape[0]:
+                raise RuntimeError(
+                    f"Model returned {preds.shape[0]} rows for a batch of {inputs.shape[0]}"
+                )
+        except Exception as e:
+            for item in batch:
+                item.future.set_exception(e)
+            with self._stats_lock:
+                self._errors += 1
+            return
+
+        finished = time.monotonic()
+        offset = 0
+        for item in batch:
+            rows = preds[offset:offset + item.rows]
+            item.future.set_result(rows[0] if item.single else rows)
+            offset += item.rows
+
+        with self._stats_lock:
+            size = offset
+            self._batches += 1
+            self._requests += size
+            self._largest_batch = max(self._largest_batch, size)
+            self._batch_size_histogram[size] = self._batch_size_histogram.get(size, 0) + 1
+            self._last_batch_ms = (finished - started) * 1000.0
+            self._total_wait_ms += sum(
+                (started - item.enqueued_at) * 1000.0 * item.rows for item in batch
+            )
+
+    def _worker(self):
+        while True:
+            batch = self._collect_batch()
+            self._run_batch(batch)
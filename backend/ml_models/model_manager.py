@@ -0,0 +1,142 @@
+"""
+model_manager.py
+Deferred model loading: resources are loaded in a background thread at
+startup, followed by an optional warm-up pass, so the web server can bind its
+port immediately and report readiness instead of blocking on TensorFlow.
+"""
+
+import threading
+import time
+
+
+class ModelNotReadyError(RuntimeError):
+    """Raised when a model is requested before loading and warm-up finished."""
+
+
+class ModelManager:
+    """
+    Owns a lazily-loaded resource bundle (model, label map, ...).
+    - loader(): returns the loaded resources.
+    - warmup(resources): optional, runs dummy inference to trace the graph.
+    - add_preload(name, fn): extra fn(resources) run in the loader thread after
+      the model loaded (e.g. lookup tables keyed by the model's labels); a
+      failing preload is reported in status() but does not fail the model.
+    States: idle -> loading -> warming_up -> ready (or failed).
+    """
+
+    def __init__(self, name, loader, warmup=None):
+        self.name = name
+        self._loader = loader
+        self._warmup = warmup
+
+        self._lock = threading.Lock()
+        self._ready_event = threading.Event()
+        self._thread = None
+        self._resources = None
+        self._preloads = []     # (name, fn)
+
+        self.preloads = {}      # name -> {"seconds": ..., "error": ...}
+
+        self.state = "idle"
+        self.error = None
+        self.started_at = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+
+    # -----------------------------
+    # LIFECYCLE
+    # -----------------------------
+    def start(self):
+        """Start loading in a background thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.state = "loading"
+            self.started_at = time.time()
+            self._thread = threading.Thread(
+                target=self._load, name=f"{self.name}-loader", daemon=True
+            )
+            self._thread.start()
+
+    def add_preload(self, name, fn):
+        """
+        Register fn(resources) to run once the model is loaded. Registered
+        after loading already finished, it runs immediately in the caller's thread.
+        """
+        with self._lock:
+            loaded = self._resources is not None
+            if not loaded:
+                self._preloads.append((name, fn))
+        if loaded:
+            self._run_preload(name, fn, self._resources)
+
+    def _run_preload(self, name, fn, resources):
+        t0 = time.perf_counter()
+        try:
+            fn(resources)
+            self.preloads[name] = {"seconds": round(time.perf_counter() - t0, 3), "error": None}
+            print(f"📦 [{self.name}] preloaded {name} in {time.perf_counter() - t0:.2f}s")
+        except Exception as e:
+            self.preloads[name] = {"seconds": None, "error": str(e)}
+            print(f"⚠️ [{self.name}] preload {name} failed: {e}")
+
+    def _load(self):
+        try:
+            t0 = time.perf_counter()
+            resources = self._loader()
+            self.load_seconds = time.perf_counter() - t0
+            print(f"✅ [{self.name}] loaded in {self.load_seconds:.2f}s")
+
+            if self._warmup is not None:
+                self.state = "warming_up"
+                t1 = time.perf_counter()
+                self._warmup(resources)
+                self.warmup_seconds = time.perf_counter() - t1
+                print(f"🔥 [{self.name}] warm-up finished in {self.warmup_seconds:.2f}s")
+
+            with self._lock:
+                preloads = list(self._preloads)
+                self._resources = resources
+            for name, fn in preloads:
+                self._run_preload(name, fn, resources)
+
+            self.state = "ready"
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+            print(f"❌ [{self.name}] failed to load: {e}")
+        finally:
+            self._ready_event.set()
+
+    def wait_until_ready(self, timeout=None):
+        """Block until loading finished (ready or failed). Returns is_ready()."""
+        self.start()
+        self._ready_event.wait(timeout)
+        return self.is_ready()
+
+    # -----------------------------
+    # ACCESS
+    # -----------------------------
+    def is_ready(self):
+        return self.state == "ready"
+
+    def get(self):
+        """Return loaded resources or raise ModelNotReadyError."""
+        if self.state != "ready":
+            if self.state == "failed":
+                raise ModelNotReadyError(f"{self.name} failed to load: {self.error}")
+            raise ModelNotReadyError(f"{self.name} is {self.state}")
+        return self._resources
+
+    def status(self):
+        """Readiness report with load and warm-up timings."""
+        return {
+            "name": self.name,
+            "ready": self.is_ready(),
+            "state": self.state,
+            "started_at": self.started_at,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "warmup_seconds": round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+            "error": self.error,
+            "preloads": dict(self.preloads),
+        }
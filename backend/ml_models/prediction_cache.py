@@ -0,0 +1,142 @@
+"""
+prediction_cache.py
+Two-tier LRU cache for disease predictions.
+  - exact tier:      keyed by the SHA-256 of the image bytes
+  - perceptual tier: keyed by a 64-bit dHash, matched within a Hamming
+                     distance so WhatsApp-recompressed resends also hit
+Entries expire after a TTL and the least recently used entry is evicted
+once the cache is full.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+
+# -----------------------------
+# HASHING
+# -----------------------------
+def content_hash(data):
+    """SHA-256 hex digest of raw image bytes (or of a decoded ndarray)."""
+    if isinstance(data, np.ndarray):
+        h = hashlib.sha256(str((data.shape, data.dtype.str)).encode())
+        h.update(np.ascontiguousarray(data).tobytes())
+        return h.hexdigest()
+    return hashlib.sha256(data).hexdigest()
+
+
+def dhash(img, hash_size=8):
+    """
+    Difference hash of a PIL image: compares neighbouring pixels of a
+    (hash_size + 1) x hash_size grayscale thumbnail. Returns an int.
+    """
+    gray = img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+# -----------------------------
+# CACHE
+# -----------------------------
+class PredictionCache:
+    """
+    Bounded LRU cache with TTL.
+    max_distance: Hamming threshold for perceptual hits (negative disables the tier).
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, max_distance=4):
+        self.max_entries = int(max_entries)
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_distance = int(max_distance)
+
+        # sha256 -> (result, perceptual_hash, expires_at)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expire(self, key):
+        self._entries.pop(key, None)
+        self.expirations += 1
+
+    def get_exact(self, key):
+        """Look up by content hash. Returns the cached result or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= now:
+                self._expire(key)
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry[0]
+
+    def get_perceptual(self, phash):
+        """Closest non-expired entry within max_distance, or None (counts a miss)."""
+        now = time.monotonic()
+        with self._lock:
+            best_key, best_distance = None, None
+            if self.max_distance >= 0 and phash is not None:
+                for key, (_, other, expires_at) in list(self._entries.items()):
+                    if expires_at <= now:
+                        self._expire(key)
+                        continue
+                    if other is None:
+                        continue
+                    distance = hamming_distance(phash, other)
+                    if distance <= self.max_distance and (best_distance is None or distance < best_distance):
+                        best_key, best_distance = key, distance
+
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.perceptual_hits += 1
+            return self._entries[best_key][0]
+
+    def put(self, key, phash, result):
+        with self._lock:
+            self._entries[key] = (result, phash, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.exact_hits + self.perceptual_hits + self.misses
+            hits = self.exact_hits + self.perceptual_hits
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "max_hamming_distance": self.max_distance,
+                "exact_hits": self.exact_hits,
+                "perceptual_hits": self.perceptual_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -2,36 +2,138 @@
 import pandas as pd
 import os
 import pickle
-from prophet import Prophet
 from datetime import timedelta
+from backend.ml_models import harmonic_forecast
+from backend.ml_models.forecast_registry import ForecastModelRegistry
+from backend.utils.cache import TTLCache
+from backend.utils.weather_store import weather_store, city_slug
 
-MODEL_PATH = "models/weather_model.pkl"
-DATA_PATH = "data/weather_data.csv"
+# One model per city: models/weather/<city>.pkl
+FORECAST_MODEL_DIR = os.getenv("FORECAST_MODEL_DIR", "models/weather")
 
-def train_weather_model():
-    """Train Prophet model on logged weather data."""
-    if not os.path.exists(DATA_PATH):
-        raise FileNotFoundError("No weather data available for training!")
+# Forecasting engine: "prophet" (default) or "harmonic" (NumPy harmonic
+# regression, fits all cities in one vectorized batch; no Prophet import)
+FORECAST_ENGINE = os.getenv("FORECAST_ENGINE", "prophet")
 
-    df = pd.read_csv(DATA_PATH)
-    df.rename(columns={"date": "ds", "temp": "y"}, inplace=True)
+# Loaded models stay in memory; the file is re-checked at most this often (seconds)
+FORECAST_MODEL_CHECK_SECONDS = float(os.getenv("FORECAST_MODEL_CHECK_SECONDS", 5))
+# Forecasts are keyed by (model file, model version, days): a retrained model
+# gets a new version, so the TTL only bounds how long unused entries linger
+FORECAST_CACHE_TTL_SECONDS = float(os.getenv("FORECAST_CACHE_TTL_SECONDS", 24 * 3600))
+
+model_registry = ForecastModelRegistry(check_seconds=FORECAST_MODEL_CHECK_SECONDS)
+forecast_cache = TTLCache("forecast", ttl_seconds=FORECAST_CACHE_TTL_SECONDS, max_entries=256)
+
+
+def city_model_path(city):
+    """Pickle path of a city's forecast model."""
+    return os.path.join(FORECAST_MODEL_DIR, f"{city_slug(city)}.pkl")
+
+
+def _warm_start_params(model):
+    """Fitted parameters of a previous model, used to initialise the next fit."""
+    params = {name: model.params[name][0][0] for name in ("k", "m", "sigma_obs")}
+    params.update({name: model.params[name][0] for name in ("delta", "beta")})
+    return params
+
+
+def _fit_prophet(history, previous=None):
+    """
+    Fit Prophet (imported here: it is slow to import and optional with the
+    harmonic engine). With a previous model the optimiser starts from its
+    parameters, which converges much faster when only a few rows were added;
+    if the shapes no longer match (more changepoints or seasonalities) it
+    falls back to a cold start.
+    """
+    from prophet import Prophet
+
+    if previous is not None and hasattr(previous, "params"):
+        try:
+            model = Prophet(daily_seasonality=True)
+            return model.fit(history, init=_warm_start_params(previous))
+        except Exception as e:
+            print(f"⚠️ Warm start failed ({e}); fitting from scratch.")
 
     model = Prophet(daily_seasonality=True)
-    model.fit(df)
+    return model.fit(history)
+
+
+def fit_weather_model(df, previous=None, engine=None):
+    """Fit the configured engine on a city's records (date, temp, ...)."""
+    return fit_weather_models({None: df}, {None: previous}, engine=engine)[None]
+
 
-    os.makedirs("models", exist_ok=True)
-    with open(MODEL_PATH, "wb") as f:
+def fit_weather_models(frames, previous=None, engine=None):
+    """
+    Fit one model per city: frames maps city -> records. The harmonic engine
+    solves all cities in a single vectorized batch; Prophet fits them in turn.
+    Returns city -> model.
+    """
+    engine = engine or FORECAST_ENGINE
+    previous = previous or {}
+    if engine == "harmonic":
+        cities = list(frames)
+        models = harmonic_forecast.fit_batch(
+            [(frames[city]["date"], frames[city]["temp"]) for city in cities]
+        )
+        return dict(zip(cities, models))
+    if engine == "prophet":
+        return {
+            city: _fit_prophet(df[["date", "temp"]].rename(columns={"date": "ds", "temp": "y"}),
+                               previous.get(city))
+            for city, df in frames.items()
+        }
+    raise ValueError(f"Unknown forecast engine: {engine}")
+
+
+def save_weather_model(model, path):
+    """Write next to the old model and swap, so readers never see a partial pickle."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
         pickle.dump(model, f)
+    os.replace(tmp_path, path)
+
+
+def train_weather_model(city="Bamenda"):
+    """Train (or retrain) one city's Prophet model on its logged weather data."""
+    df = weather_store.read(cities=[city])
+    if df.empty:
+        raise FileNotFoundError(f"No weather data available for training ({city})!")
+
+    path = city_model_path(city)
+    previous = None
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            previous = pickle.load(f)
+
+    save_weather_model(fit_weather_model(df, previous), path)
+    print(f"✅ Weather model for {city} trained and saved.")
+
+
+def forecast_records(days=7, city="Bamenda", model_path=None):
+    """
+    Forecast rows (ds, yhat, yhat_lower, yhat_upper) for the next given days,
+    computed once per model version and served from memory afterwards.
+    Raises FileNotFoundError if the city's model has not been trained yet.
+    The returned list is shared: do not modify it.
+    """
+    path = model_path or city_model_path(city)
+    model, version = model_registry.get(path)
+
+    def compute():
+        future = model.make_future_dataframe(periods=days)
+        forecast = model.predict(future)
+        return forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].tail(days).to_dict(orient="records")
+
+    return forecast_cache.get_or_fetch((path, version, days), compute)
 
-    print("✅ Weather model trained and saved.")
 
-def predict_weather(days=7):
+def predict_weather(days=7, city="Bamenda"):
     """Predict temperature for the next given days."""
-    with open(MODEL_PATH, "rb") as f:
-        model = pickle.load(f)
+    return pd.DataFrame(forecast_records(days, city))
 
-    last_date = pd.read_csv(DATA_PATH)["date"].iloc[-1]
-    future = model.make_future_dataframe(periods=days)
-    forecast = model.predict(future)
 
-    return forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].tail(days)
+def get_forecast_stats():
+    """Loaded forecast models and forecast cache statistics."""
+    return {"engine": FORECAST_ENGINE, "models": model_registry.stats(), "cache": forecast_cache.stats()}
@@ -1,30 +1,31 @@
 """
 advisory.py
 Combines disease detection and weather prediction to give actionable advice.
+The pipeline itself lives in backend/utils/advisory_pipeline.py; this route
+is a thin HTTP adapter around it. /api/advice/stream returns the same result
+as server-sent events so the page can show each part as soon as it is ready.
 """
 
-from flask import Blueprint, request, jsonify
-from backend.ml_models.disease_model import predict_disease
-from backend.utils.weather_api import get_weather
-from backend.utils.advisory_rules import get_disease_advice
-from backend.utils.ai_advisor import generate_ai_advice
-import os
+import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from backend.routes.health import require_model_ready
+from backend.utils.advisory_pipeline import run_advisory_pipeline, stream_advisory_pipeline
+from backend.utils.stage_graph import server_timing_header
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
-import requests
+advisory_bp = Blueprint("advisory_bp", __name__, url_prefix="/api/advice")
 
 
-advisory_bp = Blueprint("advisory_bp", __name__, url_prefix="/api/advice")
-API_KEY = os.getenv("OPENWEATHER_API_KEY")
 @advisory_bp.route("/", methods=["POST"])
+@require_model_ready
 def give_advice():
     """
     POST request with an image + city name
     Returns disease prediction + weather info + expert advice.
-    Each section (weather, disease, advice) is independent.
+    Stage timings are returned in "timings" and in the Server-Timing header.
     """
     try:
         if 'image' not in request.files or 'city' not in request.form:
@@ -32,72 +33,56 @@ def give_advice():
 
         file = request.files['image']
         city = request.form['city']
-        file.save("temp.jpg")
+        # Decode in memory: no shared temp file between concurrent requests
+        image_bytes = file.read()
+        # ?no_cache=1 (or form field) forces a fresh CNN prediction
+        use_cache = request.values.get("no_cache", "").lower() not in ("1", "true", "yes")
 
-        # -----------------------------
-        # 1️⃣ DISEASE PREDICTION
-        # -----------------------------
-        disease_result = {}
-        try:
-            disease_result = predict_disease("temp.jpg")
-        except Exception as e:
-            print("❌ Disease prediction failed:", e)
-            disease_result = {"predicted_label": "Unknown", "confidence": 0.0, "error": str(e)}
+        response = run_advisory_pipeline(image_bytes, city, use_cache=use_cache)
 
-        # -----------------------------
-        # 2️⃣ WEATHER DATA
-        # -----------------------------
-        weather = {}
-        try:
-            res = requests.get(
-                f"https://api.openweathermap.org/data/2.5/weather?q={city},CM&appid={API_KEY}&units=metric",
-                timeout=10
-            )
-            if res.status_code == 200:
-                weather = res.json()
-            else:
-                weather = {"error": f"Weather API returned {res.status_code}"}
-        except Exception as e:
-            print("🌩️ Error fetching weather:", e)
-            weather = {"error": "Weather data unavailable due to connection issue"}
+        resp = jsonify(response)
+        resp.headers["Server-Timing"] = server_timing_header(response["timings"])
+        return resp, 200
+
+    except Exception as e:
+        print("💥 Critical Error:", e)
+        return jsonify({"error": str(e)}), 500
 
-        # Safe weather summary extraction
-        if weather and "weather" in weather:
-            weather_summary = weather.get("weather", [{}])[0].get("main", "Unknown")
-        else:
-            weather_summary = "Unknown"
 
+def sse_event(event, data):
+    """Format one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-        advice_list = []
+
+@advisory_bp.route("/stream", methods=["POST"])
+@require_model_ready
+def stream_advice():
+    """
+    Same input as POST /api/advice/, answered as text/event-stream:
+    "disease" and "weather" events as soon as each is known, then one
+    "token" event per advice fragment from the LLM, then "done" with the
+    full advice and stage timings ("error" if the pipeline crashes).
+    """
+    if 'image' not in request.files or 'city' not in request.form:
+        return jsonify({"error": "Image and city are required"}), 400
+
+    # Read the upload before streaming starts (the request body is gone afterwards)
+    image_bytes = request.files['image'].read()
+    city = request.form['city']
+    use_cache = request.values.get("no_cache", "").lower() not in ("1", "true", "yes")
+
+    def events():
+        # Comment line: flushes headers so the client gets its first byte immediately
+        yield ": processing\n\n"
         try:
-            if "predicted_label" in disease_result and disease_result["predicted_label"] != "Unknown":
-                crop_type = disease_result["predicted_label"].split("_")[0]
-                disease_name = disease_result["predicted_label"]
-
-                # Use AI to generate dynamic advice
-                ai_advice = generate_ai_advice(crop_type, disease_name, weather_summary)
-                advice_list = [ai_advice]
-            else:
-                advice_list = ["Unable to generate advice due to missing disease information."]
+            for event, data in stream_advisory_pipeline(image_bytes, city, use_cache=use_cache):
+                yield sse_event(event, data)
         except Exception as e:
-            print("⚠️ Advice generation failed:", e)
-            advice_list = [f"Advice generation failed: {str(e)}"]
-
-        # -----------------------------
-        # 4️⃣ FINAL RESPONSE
-        # -----------------------------
-        crop_type = disease_result["predicted_label"].split("_")[0]
-        response = {
-            "status": "success",
-            "crop": crop_type,
-            "city": city,
-            "weather": weather,
-            "disease": disease_result,
-            "advice": advice_list
-        }
-
-        return jsonify(response), 200
-
-    except Exception as e:
-        print("💥 Critical Error:", e)
-        return jsonify({"error": str(e)}), 500
+            print("💥 Critical Error (stream):", e)
+            yield sse_event("error", {"error": str(e)})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
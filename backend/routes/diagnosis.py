@@ -5,24 +5,41 @@ Now supports disease-level predictions (e.g., maize_blight, plantain_sigatoka)
 and provides treatment advice based on the predicted disease.
 """
 
-import os
+import io
 import json
-from flask import Blueprint, request, jsonify
+import os
+import time
+import zipfile
+from collections import Counter
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from werkzeug.utils import secure_filename
-from backend.ml_models.disease_model import predict_disease
+from backend.ml_models.disease_model import (
+    BATCH_PREDICT_SIZE, predict_disease, predict_disease_batch, model_manager,
+)
+from backend.routes.health import require_model_ready
+from backend.utils.treatment_index import TreatmentIndex
 
 # -----------------------------
 # CONFIG
 # -----------------------------
-UPLOAD_FOLDER = r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\backend\static\uploads"
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 
 # Path to local disease treatment/advisory info
-DISEASE_INFO_PATH = r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\data\disease_treatments.json"
+DISEASE_INFO_PATH = os.getenv(
+    "DISEASE_INFO_PATH",
+    r"C:\Users\IDRESS COMPUTERS\Desktop\smart_agro_advisor\data\disease_treatments.json",
+)
+# How often (seconds) lookups check the treatment file for changes
+TREATMENT_INDEX_CHECK_SECONDS = float(os.getenv("TREATMENT_INDEX_CHECK_SECONDS", 30))
+NO_TREATMENT = "No treatment info available for this disease yet."
 
-diagnosis_bp = Blueprint("diagnosis_bp", __name__, url_prefix="/api/diagnose")
+# Batch diagnosis (/api/diagnose/batch): limits on one upload (image count,
+# size of each image inside a zip). The default images per forward pass is
+# disease_model.BATCH_PREDICT_SIZE.
+DIAGNOSE_BATCH_MAX_IMAGES = int(os.getenv("DIAGNOSE_BATCH_MAX_IMAGES", 200))
+DIAGNOSE_BATCH_MAX_IMAGE_BYTES = int(os.getenv("DIAGNOSE_BATCH_MAX_IMAGE_BYTES", 10 * 1024 * 1024))
 
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+diagnosis_bp = Blueprint("diagnosis_bp", __name__, url_prefix="/api/diagnose")
 
 # -----------------------------
 # HELPERS
@@ -32,20 +49,148 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def load_disease_info():
-    """Load disease treatment/advisory information from JSON file."""
-    if os.path.exists(DISEASE_INFO_PATH):
-        with open(DISEASE_INFO_PATH, 'r') as f:
-            return json.load(f)
-    else:
-        print("⚠️ Warning: disease_treatments.json not found. Proceeding without advisory info.")
-        return {}
+class ZipMember:
+    """One image inside an uploaded zip; its bytes are only read by read()."""
+
+    def __init__(self, archive, info, stream):
+        self.archive = archive
+        self.info = info
+        self.stream = stream
+
+    def read(self):
+        return self.archive.read(self.info)
+
+
+def _images_from_zip(stream, archive_name):
+    """(filename, ZipMember) for every allowed image in a zip archive, in archive order."""
+    images = []
+    archive = zipfile.ZipFile(stream)
+    for info in archive.infolist():
+        name = info.filename
+        if info.is_dir() or name.startswith("__MACOSX/") or os.path.basename(name).startswith("."):
+            continue
+        if not allowed_file(name):
+            continue
+        if info.file_size > DIAGNOSE_BATCH_MAX_IMAGE_BYTES:
+            archive.close()
+            raise ValueError(f"{archive_name}: {name} is larger than {DIAGNOSE_BATCH_MAX_IMAGE_BYTES} bytes")
+        images.append((name, ZipMember(archive, info, stream)))
+        if len(images) > DIAGNOSE_BATCH_MAX_IMAGES:
+            break
+    if not images:
+        archive.close()
+        stream.close()
+    return images
+
+
+def _take_stream(file):
+    """
+    The upload's stream, detached from the request: Flask closes request.files
+    when the view returns, before a streamed response has read them.
+    """
+    stream, file.stream = file.stream, io.BytesIO()
+    return stream
+
+
+def close_batch_images(images):
+    """Close the upload streams and zip archives handed out by collect_batch_images()."""
+    owned = {}
+    for _, source in images:
+        if isinstance(source, ZipMember):
+            owned[id(source.archive)] = source.archive
+            source = source.stream
+        owned[id(source)] = source
+    for item in owned.values():
+        item.close()
+
+
+def collect_batch_images(files):
+    """
+    (filename, source) pairs from uploaded files: images are taken as they
+    are, zip archives are expanded. Sources are readers (the upload stream
+    or a ZipMember), so image bytes are only read when the batch decoder
+    gets to them; close them with close_batch_images(). Raises ValueError
+    for an unusable upload.
+    """
+    images = []
+    for file in files:
+        if not file or file.filename == "":
+            continue
+        filename = secure_filename(file.filename) or file.filename
+        if filename.lower().endswith(".zip"):
+            stream = _take_stream(file)
+            try:
+                images.extend(_images_from_zip(stream, filename))
+            except (zipfile.BadZipFile, ValueError) as e:
+                stream.close()
+                close_batch_images(images)
+                if isinstance(e, zipfile.BadZipFile):
+                    raise ValueError(f"{filename} is not a valid zip archive")
+                raise
+        elif allowed_file(filename):
+            images.append((filename, _take_stream(file)))
+        else:
+            close_batch_images(images)
+            raise ValueError(f"Invalid file format: {filename}. Allowed: PNG, JPG, JPEG or a ZIP of them")
+        if len(images) > DIAGNOSE_BATCH_MAX_IMAGES:
+            close_batch_images(images)
+            raise ValueError(f"Too many images: at most {DIAGNOSE_BATCH_MAX_IMAGES} per request")
+    if not images:
+        raise ValueError("No image files provided")
+    return images
+
+
+def summarize_batch(field, results, elapsed):
+    """Per-field disease summary of a batch's per-image results."""
+    labels = Counter()
+    confidence = Counter()
+    crops = Counter()
+    for result in results:
+        if "error" in result:
+            continue
+        label = result["predicted_label"]
+        labels[label] += 1
+        confidence[label] += result["confidence"]
+        crops[label.split("_")[0]] += 1
+
+    diagnosed = sum(labels.values())
+    healthy = sum(count for label, count in labels.items() if "healthy" in label.lower())
+    diseases = {
+        label: {
+            "count": count,
+            "share": round(count / diagnosed, 3),
+            "avg_confidence": round(confidence[label] / count, 3),
+        }
+        for label, count in labels.most_common()
+    }
+    dominant = next((label for label, _ in labels.most_common() if "healthy" not in label.lower()), None)
+    return {
+        "field": field,
+        "images": len(results),
+        "diagnosed": diagnosed,
+        "errors": len(results) - diagnosed,
+        "crops": dict(crops),
+        "diseases": diseases,
+        "healthy_share": round(healthy / diagnosed, 3) if diagnosed else None,
+        "dominant_disease": dominant,
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "images_per_second": round(len(results) / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+# Loaded once per process (next to the model) and reloaded only when the file changes
+treatment_index = TreatmentIndex(DISEASE_INFO_PATH, check_seconds=TREATMENT_INDEX_CHECK_SECONDS)
+model_manager.add_preload(
+    "treatment_index",
+    lambda resources: treatment_index.load(labels=resources["label_map"].keys()),
+)
 
 
 # -----------------------------
 # ROUTES
 # -----------------------------
 @diagnosis_bp.route("/", methods=["POST"])
+@require_model_ready
 def diagnose():
     """Endpoint for disease diagnosis + treatment recommendation."""
     if 'image' not in request.files:
@@ -58,20 +203,18 @@ def diagnose():
 
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
-
-        print(f"📥 Image received: {filepath}")
+        image_bytes = file.read()
+        # ?no_cache=1 (or form field) forces a fresh CNN prediction
+        use_cache = request.values.get("no_cache", "").lower() not in ("1", "true", "yes")
 
-        # Run prediction
-        result = predict_disease(filepath)
+        print(f"📥 Image received: {filename} ({len(image_bytes)} bytes)")
 
-        # Load disease advisory info
-        disease_info = load_disease_info()
+        # Run prediction (decoded in memory, nothing written to disk)
+        result = predict_disease(image_bytes, use_cache=use_cache)
 
         predicted_label = result.get("predicted_label")
         confidence = result.get("confidence", 0)
-        treatment = disease_info.get(predicted_label, "No treatment info available for this disease yet.")
+        treatment = treatment_index.get(predicted_label, NO_TREATMENT)
 
         response = {
             "status": "success",
@@ -87,3 +230,68 @@ def diagnose():
         return jsonify(response), 200
 
     return jsonify({"error": "Invalid file format. Allowed: PNG, JPG, JPEG"}), 400
+
+
+@diagnosis_bp.route("/batch", methods=["POST"])
+@require_model_ready
+def diagnose_batch():
+    """
+    Diagnose many images from one field visit. Accepts several "images" files
+    and/or a zip archive ("archive", or any uploaded .zip). Streams NDJSON:
+    one line per image as its batch finishes, then a {"summary": ...} line.
+    Optional: "field" (name echoed in the summary), "batch_size", "no_cache".
+    """
+    try:
+        images = collect_batch_images(request.files.getlist("images") + request.files.getlist("archive"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    field = request.values.get("field") or None
+    use_cache = request.values.get("no_cache", "").lower() not in ("1", "true", "yes")
+    try:
+        batch_size = int(request.values.get("batch_size") or BATCH_PREDICT_SIZE)
+    except ValueError:
+        close_batch_images(images)
+        return jsonify({"error": "batch_size must be an integer"}), 400
+    batch_size = max(1, min(batch_size, DIAGNOSE_BATCH_MAX_IMAGES))
+
+    print(f"📥 Batch received: {len(images)} images (field={field}, batch_size={batch_size})")
+
+    def generate():
+        started = time.perf_counter()
+        results = []
+        predictions = predict_disease_batch(
+            (source for _, source in images), use_cache=use_cache, batch_size=batch_size
+        )
+        try:
+            yield from _result_lines(images, predictions, results)
+        finally:
+            close_batch_images(images)
+        summary = summarize_batch(field, results, time.perf_counter() - started)
+        print(f"🧾 Batch done: {summary['diagnosed']}/{summary['images']} images, "
+              f"{summary['images_per_second']} images/s")
+        yield json.dumps({"summary": summary}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+def _result_lines(images, predictions, results):
+    """One NDJSON line per image; results collects the raw results for the summary."""
+    for index, ((filename, _), result) in enumerate(zip(images, predictions)):
+        results.append(result)
+        if "error" in result:
+            line = {"index": index, "filename": filename, "status": "error", "error": result["error"]}
+        else:
+            line = {
+                "index": index,
+                "filename": filename,
+                "status": "success",
+                "prediction": {
+                    "predicted_label": result["predicted_label"],
+                    "confidence": round(result["confidence"], 3),
+                    "probabilities": result.get("probabilities", {}),
+                    "treatment_advice": treatment_index.get(result["predicted_label"], NO_TREATMENT),
+                },
+                "cache": result.get("cache"),
+            }
+        yield json.dumps(line) + "\n"
@@ -0,0 +1,67 @@
+"""
+health.py
+Readiness reporting for the deferred model loader, plus a decorator that
+makes model-backed routes answer a fast 503 until the model is ready.
+"""
+
+import os
+from functools import wraps
+from flask import Blueprint, jsonify
+from backend.ml_models.disease_model import model_manager
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+RETRY_AFTER_SECONDS = int(os.getenv("MODEL_RETRY_AFTER_SECONDS", 5))
+
+health_bp = Blueprint("health_bp", __name__, url_prefix="/healthz")
+
+
+# -----------------------------
+# HELPERS
+# -----------------------------
+def model_not_ready_response():
+    """503 response telling the client when to retry."""
+    status = model_manager.status()
+    response = jsonify({
+        "status": "error",
+        "message": "Disease model is still loading. Please retry shortly.",
+        "model": status,
+    })
+    response.status_code = 503
+    response.headers["Retry-After"] = str(RETRY_AFTER_SECONDS)
+    return response
+
+
+def model_failed_response():
+    """503 response for a model that failed to load; retrying will not help."""
+    status = model_manager.status()
+    response = jsonify({
+        "status": "error",
+        "message": f"Disease model failed to load: {model_manager.error}",
+        "model": status,
+    })
+    response.status_code = 503
+    return response
+
+
+def require_model_ready(view):
+    """Route decorator: return 503 + Retry-After until the model is ready (no Retry-After if it failed)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not model_manager.is_ready():
+            if model_manager.state == "failed":
+                return model_failed_response()
+            return model_not_ready_response()
+        return view(*args, **kwargs)
+    return wrapper
+
+
+# -----------------------------
+# ROUTES
+# -----------------------------
+@health_bp.route("/ready", methods=["GET"])
+def ready():
+    """Report model load/warm-up state and timings (200 when ready, else 503)."""
+    status = model_manager.status()
+    return jsonify(status), 200 if status["ready"] else 503
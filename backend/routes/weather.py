@@ -2,21 +2,20 @@
 
 from flask import Blueprint, request, jsonify
 from backend.utils.weather_api import get_weather
-from backend.utils.logger import log_weather_data
-from backend.ml_models.weather_predictor import predict_weather, train_weather_model
-import os
+from backend.utils.weather_store import weather_store
+from backend.ml_models.weather_predictor import forecast_records
+from backend.ml_models.forecast_trainer import forecast_trainer
 
 weather_bp = Blueprint("weather", __name__)
 
 @weather_bp.route("/api/weather/current", methods=["GET"])
 def current_weather():
-    """Fetch and return live weather info."""
+    """Fetch and return live weather info (fresh fetches are logged by weather_api)."""
     city = request.args.get("city", "Bamenda")
     country = request.args.get("country", "CM")
 
     weather = get_weather(city, country)
     if weather:
-        log_weather_data(weather)
         return jsonify({
             "status": "success",
             "data": weather
@@ -30,29 +29,28 @@ def current_weather():
 
 @weather_bp.route("/api/weather/forecast", methods=["GET"])
 def forecast_weather():
-    """Predict temperature trend for the next few days."""
+    """Predict temperature trend for the next few days in a city."""
+    city = request.args.get("city", "Bamenda")
     days = int(request.args.get("days", 7))
     try:
-        forecast = predict_weather(days)
-        results = forecast.to_dict(orient="records")
+        results = forecast_records(days, city)
         return jsonify({
             "status": "success",
+            "city": city,
             "days": days,
             "forecast": results
         }), 200
     except FileNotFoundError:
-        # Model not yet trained → train first
-        if os.path.exists("data/weather_data.csv"):
-            train_weather_model()
-            forecast = predict_weather(days)
-            results = forecast.to_dict(orient="records")
+        # Model not trained yet → ask the background trainer, never train here
+        if weather_store.has_data(city):
+            forecast_trainer.request(city)
             return jsonify({
-                "status": "success",
-                "days": days,
-                "forecast": results
-            }), 200
+                "status": "pending",
+                "city": city,
+                "message": f"The forecast model for {city} is being prepared. Try again in a few minutes."
+            }), 202
         else:
             return jsonify({
                 "status": "error",
-                "message": "No weather data found. Fetch current weather first!"
+                "message": f"No weather data found for {city}. Fetch current weather first!"
             }), 400
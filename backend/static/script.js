@@ -67,73 +67,144 @@ form.addEventListener("submit", async e => {
   ["weather-card", "disease-card", "advice-card"].forEach(id =>
     document.getElementById(id).classList.add("hidden")
   );
+  document.getElementById("advice-text").innerText = "";
 
   const formData = new FormData();
   formData.append("image", file);
   formData.append("city", city);
 
   try {
-    const res = await fetch("/api/advice/", {
+    const res = await fetch("/api/advice/stream", {
       method: "POST",
       body: formData,
     });
 
-    const data = await res.json();
-    loading.classList.add("hidden");
-    console.log(data);
-
-    // WEATHER
-    if (data.weather) {
-      document.getElementById("weather-card").classList.remove("hidden");
-      document.getElementById("weather-content").innerHTML = `
-        <b>City:</b> ${city}<br>
-        <b>Temperature:</b> ${data.weather.main.temp || "N/A"} °C<br>
-        <b>Condition:</b> ${data.weather.weather[0].description || "N/A"}<br>
-        <b>Humidity:</b> ${data.weather.main.humidity || "N/A"}%
-      `;
+    if (!res.ok || !res.body) {
+      // 503 while the model loads, or a browser without streaming fetch
+      return await fetchFullAdvice(formData, city);
     }
+    await readAdviceStream(res.body, city);
 
-    // DISEASE
-    if (data.disease) {
-      const { predicted_label, confidence, probabilities } = data.disease;
-      document.getElementById("disease-card").classList.remove("hidden");
-      document.getElementById("predicted_crop").innerText = data.crop || "Unknown";
-      document.getElementById("predicted_label").innerText = data.disease.predicted_label || "Unknown";
-      document.getElementById("confidence").innerText =
-        data.disease.confidence ? `${(data.disease.confidence * 100).toFixed(2)}%` : "N/A";
-
-      const probsDiv = document.getElementById("probabilities");
-      probsDiv.innerHTML = "";
-      if (probabilities) {
-        for (const [label, prob] of Object.entries(probabilities)) {
-          const bar = document.createElement("div");
-          bar.classList.add("prob-bar");
-          bar.innerHTML = `
-            <div class="prob-fill" style="width:${(prob * 100).toFixed(1)}%">
-              ${(prob * 100).toFixed(1)}%
-            </div>
-            <small>${label}</small>`;
-          probsDiv.appendChild(bar);
-        }
+  } catch (err) {
+    console.error("❌ Error:", err);
+    alert("Failed to connect to the backend. Please check your connection.");
+  }
+});
+
+// 📡 Read server-sent events from a POST response and render them as they arrive
+async function readAdviceStream(body, city) {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  const adviceText = document.getElementById("advice-text");
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = "message";
+      let data = "";
+      for (const line of raw.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data += line.slice(5).trim();
+      }
+      if (!data) continue;  // comments / keep-alives
+      const payload = JSON.parse(data);
+
+      if (event === "disease") {
+        loading.classList.add("hidden");
+        renderDisease(payload.disease, payload.crop);
+      } else if (event === "weather") {
+        renderWeather(payload.weather, city);
+      } else if (event === "token") {
+        loading.classList.add("hidden");
+        document.getElementById("advice-card").classList.remove("hidden");
+        adviceText.innerText += payload.text;
+      } else if (event === "advisor" && payload.advisor === "rules") {
+        adviceText.innerText = "ℹ️ The AI advisor is busy — here are our standard recommendations:\n";
+      } else if (event === "done") {
+        if (payload.advisor !== "rules") adviceText.innerText = payload.advice;
+        console.log("⏱️ timings", payload.timings);
+      } else if (event === "error") {
+        alert("⚠️ Advice failed: " + payload.error);
       }
     }
+  }
+  loading.classList.add("hidden");
+}
 
-    // ADVICE
-    if (data.advice) {
-      document.getElementById("advice-card").classList.remove("hidden");
-      document.getElementById("advice-text").innerText = data.advice;
-    }
+// 🐢 Non-streaming fallback: whole JSON answer at once
+async function fetchFullAdvice(formData, city) {
+  const res = await fetch("/api/advice/", {
+    method: "POST",
+    body: formData,
+  });
 
-    // Handle partial errors gracefully
-    if (data.warning) {
-      alert("⚠️ Some modules failed: " + data.warning);
-    }
+  const data = await res.json();
+  loading.classList.add("hidden");
+  console.log(data);
 
-  } catch (err) {
-    console.error("❌ Error:", err);
-    alert("Failed to connect to the backend. Please check your connection.");
+  if (data.weather) renderWeather(data.weather, city);
+  if (data.disease) renderDisease(data.disease, data.crop);
+
+  // ADVICE
+  if (data.advice) {
+    document.getElementById("advice-card").classList.remove("hidden");
+    document.getElementById("advice-text").innerText = data.advisor === "rules"
+      ? "ℹ️ The AI advisor is busy — here are our standard recommendations:\n" + data.advice.join("\n")
+      : data.advice;
   }
-});
+
+  // Handle partial errors gracefully
+  if (data.warning) {
+    alert("⚠️ Some modules failed: " + data.warning);
+  }
+}
+
+// WEATHER
+function renderWeather(weather, city) {
+  if (!weather || !weather.main) return;
+  document.getElementById("weather-card").classList.remove("hidden");
+  document.getElementById("weather-content").innerHTML = `
+    <b>City:</b> ${city}<br>
+    <b>Temperature:</b> ${weather.main.temp || "N/A"} °C<br>
+    <b>Condition:</b> ${weather.weather[0].description || "N/A"}<br>
+    <b>Humidity:</b> ${weather.main.humidity || "N/A"}%
+  `;
+}
+
+// DISEASE
+function renderDisease(disease, crop) {
+  if (!disease) return;
+  const { predicted_label, confidence, probabilities } = disease;
+  document.getElementById("disease-card").classList.remove("hidden");
+  document.getElementById("predicted_crop").innerText = crop || "Unknown";
+  document.getElementById("predicted_label").innerText = predicted_label || "Unknown";
+  document.getElementById("confidence").innerText =
+    confidence ? `${(confidence * 100).toFixed(2)}%` : "N/A";
+
+  const probsDiv = document.getElementById("probabilities");
+  probsDiv.innerHTML = "";
+  if (probabilities) {
+    for (const [label, prob] of Object.entries(probabilities)) {
+      const bar = document.createElement("div");
+      bar.classList.add("prob-bar");
+      bar.innerHTML = `
+        <div class="prob-fill" style="width:${(prob * 100).toFixed(1)}%">
+          ${(prob * 100).toFixed(1)}%
+        </div>
+        <small>${label}</small>`;
+      probsDiv.appendChild(bar);
+    }
+  }
+}
 
 // 🌼 Animated dots for “Analyzing...”
 function animateDots() {
@@ -0,0 +1,206 @@
+"""
+advice_cache.py
+Persistent cache of LLM advice, stored in a local SQLite file so it survives
+restarts. Entries are keyed by a fingerprint of the normalized prompt plus
+the model name, expire after a TTL, and are ignored once the cache version
+is bumped (e.g. after changing the model or the prompt style).
+Concurrent misses for the same prompt wait on a single LLM call.
+The SQLite file is opened on first use, not when the cache is created.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+
+def prompt_fingerprint(prompt, model):
+    """SHA-256 of the model name and the prompt with whitespace/case normalized."""
+    normalized = re.sub(r"\s+", " ", prompt).strip().lower()
+    return hashlib.sha256(f"{model}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+class AdviceCache:
+    """
+    get_or_generate(key, generate) returns cached advice or calls generate()
+    once; generate() returning None (e.g. the LLM failed) is not cached.
+    - ttl_seconds: entries older than this are regenerated (0 = never expire)
+    - version:     entries written under another version are treated as misses
+    """
+
+    def __init__(self, db_path, ttl_seconds=30 * 24 * 3600, version="1", name="advice_cache"):
+        self.db_path = db_path
+        self.ttl_seconds = float(ttl_seconds)
+        self.version = str(version)
+        self.name = name
+
+        self._conn = None
+        self._open_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._inflight = {}   # key -> Future of the running generation
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.coalesced_timeouts = 0
+        self.stored = 0
+        self.not_cached = 0
+
+    # -----------------------------
+    # PUBLIC API
+    # -----------------------------
+    def get(self, key):
+        """Cached advice for key, or None if missing, expired or from another version."""
+        with self._lock:
+            return self._lookup(key)
+
+    def lookup(self, key):
+        """get() that counts as a request hit/miss (for callers not using get_or_generate)."""
+        with self._lock:
+            advice = self._lookup(key)
+            if advice is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return advice
+
+    def put(self, key, advice, model, disease=None, weather=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO advice (key, model, version, disease, weather, advice, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, self.version, disease, weather, advice, time.time()),
+            )
+            self.stored += 1
+
+    def get_or_generate(self, key, generate, model, disease=None, weather=None, info=None, wait_seconds=None):
+        """
+        If an info dict is given, info["source"] is set to "cache",
+        "coalesced" (waited for another caller's generation) or "generated".
+        A coalesced caller waits at most wait_seconds for that generation
+        (None = as long as it takes) and then gets TimeoutError.
+        """
+        info = {} if info is None else info
+        with self._lock:
+            advice = self._lookup(key)
+            if advice is not None:
+                self.hits += 1
+                info["source"] = "cache"
+                return advice
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                info["source"] = "coalesced"
+                owner = False
+            else:
+                self.misses += 1
+                info["source"] = "generated"
+                future = self._inflight[key] = Future()
+                owner = True
+
+        if not owner:
+            try:
+                return future.result(timeout=wait_seconds)
+            except FutureTimeout:
+                with self._lock:
+                    self.coalesced_timeouts += 1
+                raise TimeoutError(f"advice still being generated after {wait_seconds:.0f}s") from None
+
+        try:
+            advice = generate()
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        if advice is None:
+            with self._lock:
+                self.not_cached += 1
+        else:
+            self.put(key, advice, model, disease, weather)
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_result(advice)
+        return advice
+
+    def invalidate(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM advice WHERE key = ?", (key,))
+
+    def contains(self, key):
+        return self.get(key) is not None
+
+    def purge(self):
+        """Delete expired entries and entries from other versions. Returns the number removed."""
+        with self._lock:
+            cur = self._db.execute(
+                "DELETE FROM advice WHERE version != ? OR (? > 0 AND created_at < ?)",
+                (self.version, self.ttl_seconds, time.time() - self.ttl_seconds),
+            )
+            return cur.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM advice")
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses + self.coalesced
+            entries = self._db.execute(
+                "SELECT COUNT(*) FROM advice WHERE version = ?", (self.version,)
+            ).fetchone()[0]
+            return {
+                "version": self.version,
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "coalesced_timeouts": self.coalesced_timeouts,
+                "stored": self.stored,
+                "not_cached": self.not_cached,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    # -----------------------------
+    # INTERNALS
+    # -----------------------------
+    @property
+    def _db(self):
+        """The SQLite connection, opened (and the table created) on first use."""
+        if self._conn is None:
+            with self._open_lock:
+                if self._conn is None:
+                    if os.path.dirname(self.db_path):
+                        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+                    conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(
+                        """CREATE TABLE IF NOT EXISTS advice (
+                            key TEXT PRIMARY KEY,
+                            model TEXT NOT NULL,
+                            version TEXT NOT NULL,
+                            disease TEXT,
+                            weather TEXT,
+                            advice TEXT NOT NULL,
+                            created_at REAL NOT NULL
+                        )"""
+                    )
+                    self._conn = conn
+        return self._conn
+
+    def _lookup(self, key):
+        row = self._db.execute(
+            "SELECT advice, version, created_at FROM advice WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        advice, version, created_at = row
+        if version != self.version:
+            return None
+        if self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds:
+            return None
+        return advice
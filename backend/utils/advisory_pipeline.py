@@ -0,0 +1,188 @@
+"""
+advisory_pipeline.py
+In-process advisory pipeline: disease prediction + weather + AI advice.
+Shared by the /api/advice route and the WhatsApp worker, both of which pass
+image bytes straight in (no loopback HTTP, no temp files).
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from backend.ml_models.disease_model import predict_disease
+from backend.utils.weather_api import get_current_weather_raw
+from backend.utils.ai_advisor import advise, stream_ai_advice
+from backend.utils.stage_graph import StageGraph
+
+# -----------------------------
+# PIPELINE CONFIG
+# -----------------------------
+# Disease prediction and the weather fetch run concurrently on stage_executor;
+# advice waits for both and runs on the caller's thread (it can take minutes
+# and must not hold a worker the input stages of other requests need).
+# advise() bounds itself with the LLM deadline.
+DISEASE_STAGE_TIMEOUT = float(os.getenv("ADVICE_DISEASE_TIMEOUT", 30))
+WEATHER_STAGE_TIMEOUT = float(os.getenv("ADVICE_WEATHER_TIMEOUT", 10))
+ADVICE_STAGE_TIMEOUT = float(os.getenv("ADVICE_LLM_TIMEOUT", 120))
+stage_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ADVICE_STAGE_WORKERS", 16)), thread_name_prefix="advice-stage"
+)
+
+
+# -----------------------------
+# STAGES
+# -----------------------------
+def disease_stage(image, use_cache=True):
+    result = predict_disease(image, use_cache=use_cache)
+    if "predicted_label" not in result:
+        # predict_disease reports failures as {"error": ...}
+        return {"predicted_label": "Unknown", "confidence": 0.0, **result}
+    return result
+
+
+def weather_stage(city, country="CM"):
+    try:
+        # Shared per-city cache (coalesced upstream calls)
+        return get_current_weather_raw(city, country)
+    except requests.exceptions.HTTPError as e:
+        return {"error": f"Weather API returned {e.response.status_code}"}
+
+
+def weather_summary_of(weather):
+    """OpenWeather 'main' condition (e.g. 'Rain'), or 'Unknown'."""
+    if weather and "weather" in weather:
+        return weather.get("weather", [{}])[0].get("main", "Unknown")
+    return "Unknown"
+
+
+NO_DISEASE_ADVICE = "Unable to generate advice due to missing disease information."
+
+
+def advice_stage(disease_result, weather):
+    """{"advice": [...], "advisor": "cache" | "coalesced" | "llm" | "rules" | "none"}"""
+    weather_summary = weather_summary_of(weather)
+
+    if disease_result.get("predicted_label", "Unknown") != "Unknown":
+        crop_type = disease_result["predicted_label"].split("_")[0]
+        disease_name = disease_result["predicted_label"]
+
+        # AI advice when the LLM can answer in time, rule-based advice otherwise
+        return advise(crop_type, disease_name, weather_summary)
+    return {"advice": [NO_DISEASE_ADVICE], "advisor": "none"}
+
+
+# -----------------------------
+# PIPELINE
+# -----------------------------
+def _add_input_stages(graph, image, city, use_cache):
+    # 1️⃣ DISEASE PREDICTION
+    graph.add(
+        "disease",
+        lambda r: disease_stage(image, use_cache),
+        timeout=DISEASE_STAGE_TIMEOUT,
+        fallback=lambda e: {"predicted_label": "Unknown", "confidence": 0.0, "error": str(e)},
+    )
+    # 2️⃣ WEATHER DATA
+    graph.add(
+        "weather",
+        lambda r: weather_stage(city),
+        timeout=WEATHER_STAGE_TIMEOUT,
+        fallback={"error": "Weather data unavailable due to connection issue"},
+    )
+
+
+def run_advisory_pipeline(image, city, use_cache=True):
+    """
+    Run the full advisory pipeline on an in-memory image (bytes, file-like or
+    ndarray). Each section (weather, disease, advice) is independent: disease
+    and weather run concurrently, each stage has its own timeout, and a
+    failed stage degrades to a partial result.
+    Returns the response dict, including per-stage "timings".
+    """
+    graph = StageGraph(stage_executor)
+    _add_input_stages(graph, image, city, use_cache)
+    # 3️⃣ ADVICE (needs both)
+    graph.add(
+        "advice",
+        lambda r: advice_stage(r["disease"], r["weather"]),
+        deps=("disease", "weather"),
+        timeout=ADVICE_STAGE_TIMEOUT,
+        fallback=lambda e: {"advice": [f"Advice generation failed: {str(e)}"], "advisor": "none"},
+        inline=True,
+    )
+    results, timings = graph.run()
+    disease_result = results["disease"]
+    advice_result = results["advice"]
+
+    # 4️⃣ FINAL RESPONSE
+    crop_type = disease_result.get("predicted_label", "Unknown").split("_")[0]
+    return {
+        "status": "success",
+        "crop": crop_type,
+        "city": city,
+        "weather": results["weather"],
+        "disease": disease_result,
+        "advice": advice_result["advice"],
+        "advisor": advice_result["advisor"],
+        "timings": timings
+    }
+
+
+def stream_advisory_pipeline(image, city, use_cache=True):
+    """
+    Streaming variant of run_advisory_pipeline. Yields (event, data) pairs:
+      ("disease", {...}) and ("weather", {...}) as soon as each is available,
+      ("advisor", {"advisor": ...}) once it is known who answers (see advise()),
+      ("token", {"text": ...}) for every advice fragment,
+      ("done", {"advice": full_text, "advisor": ..., "timings": {...}}) at the end.
+    The advice stage stops relaying tokens after ADVICE_STAGE_TIMEOUT.
+    """
+    graph = StageGraph(stage_executor)
+    _add_input_stages(graph, image, city, use_cache)
+    results, timings = {}, {}
+
+    for name in graph.iter_run(results, timings):
+        if name == "disease":
+            disease_result = results["disease"]
+            crop_type = disease_result.get("predicted_label", "Unknown").split("_")[0]
+            yield "disease", {"crop": crop_type, "disease": disease_result}
+        else:
+            yield name, {"city": city, name: results[name]}
+
+    # 3️⃣ ADVICE (needs both), relayed fragment by fragment
+    disease_result = results["disease"]
+    started = time.perf_counter()
+    first_token_ms = None
+    status = "ok"
+    fragments = []
+    info = {}
+    if disease_result.get("predicted_label", "Unknown") != "Unknown":
+        disease_name = disease_result["predicted_label"]
+        tokens = stream_ai_advice(disease_name.split("_")[0], disease_name,
+                                  weather_summary_of(results["weather"]), use_cache=use_cache, info=info)
+    else:
+        info["advisor"] = "none"
+        tokens = iter([NO_DISEASE_ADVICE])
+
+    for fragment in tokens:
+        if first_token_ms is None:
+            first_token_ms = round((time.perf_counter() - started) * 1000, 1)
+            yield "advisor", dict(info)
+        fragments.append(fragment)
+        yield "token", {"text": fragment}
+        if time.perf_counter() - started > ADVICE_STAGE_TIMEOUT:
+            status = "timeout"
+            if hasattr(tokens, "close"):
+                tokens.close()  # stops reading from Ollama
+            break
+
+    timings["advice"] = {
+        "start_ms": timings["total_ms"],
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "first_token_ms": first_token_ms,
+        "status": status,
+    }
+    timings["total_ms"] = round(timings["total_ms"] + timings["advice"]["duration_ms"], 1)
+    yield "done", {"advice": "".join(fragments).strip(), "advisor": info.get("advisor", "none"), "timings": timings}
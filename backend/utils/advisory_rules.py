@@ -1,45 +1,239 @@
 """
 advisory_rules.py
-Contains AI-driven rule-based logic for actionable recommendations
-based on crop, disease, and weather data.
+Rule-based recommendations for crop, disease and weather data.
+Rules live in backend/data/advisory_rules.json and are compiled into a
+dictionary keyed by (crop, disease) using the same labels as the CNN's label
+encoder (e.g. "Maize___Blight"), so a lookup costs the same however many
+rules there are. Weather predicates are compiled once per rule file, and
+the file is reloaded when its mtime changes.
 """
 
+import json
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+ADVISORY_RULES_PATH = os.getenv(
+    "ADVISORY_RULES_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "advisory_rules.json"),
+)
+# How often (seconds) lookups check the rule file's mtime for hot reload
+ADVISORY_RULES_RELOAD_SECONDS = float(os.getenv("ADVISORY_RULES_RELOAD_SECONDS", 5))
+
+DEFAULT_FALLBACK = ["No specific recommendation — monitor crop health regularly."]
+# Distinct labels whose normalized key / keyword match is remembered
+MAX_MEMOIZED_LABELS = 10000
+
+
+# -----------------------------
+# KEYS
+# -----------------------------
+def normalize_token(text):
+    """'Black Sigatoka' / 'black-sigatoka' / 'Black_Sigatoka' -> 'black_sigatoka'."""
+    return re.sub(r"[\s\-_]+", "_", str(text or "").strip().lower()).strip("_")
+
+
+@lru_cache(maxsize=MAX_MEMOIZED_LABELS)
+def rule_key(crop, disease_name):
+    """
+    Index key for a prediction. disease_name may be a full CNN label
+    ("Maize___Blight") or just the disease part ("blight").
+    """
+    disease = str(disease_name or "").split("___")[-1]
+    return normalize_token(crop), normalize_token(disease)
+
+
+# -----------------------------
+# WEATHER PREDICATES
+# -----------------------------
+def _compile_predicate(when):
+    """
+    {"condition_in": [...]} exact OpenWeather condition, {"contains": [...]}
+    substring of the summary; all given keys must hold. {} always matches.
+    """
+    conditions = {c.lower() for c in when.get("condition_in", [])}
+    substrings = [s.lower() for s in when.get("contains", [])]
+    unknown = set(when) - {"condition_in", "contains"}
+    if unknown:
+        raise ValueError(f"unknown weather predicate(s): {sorted(unknown)}")
+
+    def predicate(summary):
+        if conditions and summary not in conditions:
+            return False
+        if substrings and not any(s in summary for s in substrings):
+            return False
+        return True
+
+    return predicate
+
+
+def _compile_weather_rules(rules):
+    return [(_compile_predicate(rule.get("when", {})), list(rule["advice"])) for rule in rules or []]
+
+
+# -----------------------------
+# COMPILED RULE SET
+# -----------------------------
+class _RuleSet:
+    """Immutable compiled form of one rule file (swapped atomically on reload)."""
+
+    def __init__(self, data):
+        self.version = data.get("version")
+        self.index = {}       # (crop, disease) -> (advice, weather rules)
+        self.keywords = {}    # crop -> [(keyword, entry)] for labels not in the index
+        for rule in data.get("diseases", []):
+            key = rule_key(rule["crop"], rule.get("label") or rule["disease"])
+            entry = (list(rule.get("advice", [])), _compile_weather_rules(rule.get("weather")))
+            self.index[key] = entry
+            for keyword in rule.get("keywords", []):
+                self.keywords.setdefault(key[0], []).append((normalize_token(keyword), entry))
+        # General weather rules: the first matching one applies
+        self.weather = _compile_weather_rules(data.get("weather"))
+        self.fallback = list(data.get("fallback", DEFAULT_FALLBACK))
+        self._memo = {}       # labels resolved through keywords (or not at all)
+        self._memo_lock = threading.Lock()
+
+    def entry_for(self, key):
+        entry = self.index.get(key)
+        if entry is not None:
+            return entry
+        entry = self._memo.get(key, False)
+        if entry is not False:
+            return entry
+        # Label the rule file doesn't list exactly: first keyword contained in it
+        entry = next((e for word, e in self.keywords.get(key[0], ()) if word in key[1]), None)
+        with self._memo_lock:
+            if len(self._memo) < MAX_MEMOIZED_LABELS:
+                self._memo[key] = entry
+        return entry
+
+    def advice_for(self, key, summary):
+        advice = []
+        entry = self.entry_for(key)
+        if entry is not None:
+            disease_advice, disease_weather = entry
+            advice.extend(disease_advice)
+            for predicate, extra in disease_weather:
+                if predicate(summary):
+                    advice.extend(extra)
+        for predicate, extra in self.weather:
+            if predicate(summary):
+                advice.extend(extra)
+                break
+        return advice or list(self.fallback)
+
+
+class RuleEngine:
+    """
+    Loads and compiles a JSON rule file. get_advice() and evaluate_batch()
+    check the file's mtime at most every reload_seconds and recompile when it
+    changed; a file that fails to parse keeps the previous rules active.
+    """
+
+    def __init__(self, path, reload_seconds=ADVISORY_RULES_RELOAD_SECONDS):
+        self.path = path
+        self.reload_seconds = float(reload_seconds)
+        self._rules = _RuleSet({})
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.reload_errors = 0
+        self.lookups = 0
+        self.reload(force=True)
+
+    # -----------------------------
+    # LOADING
+    # -----------------------------
+    def reload(self, force=False):
+        """Recompile the rule file if it changed (or always with force). Returns True if reloaded."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                if self._mtime is not None or force:
+                    print(f"⚠️ Advisory rules not found at {self.path}. Using general advice only.")
+                self._mtime = None
+                return False
+            if not force and mtime == self._mtime:
+                return False
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    rules = _RuleSet(json.load(f))
+            except (ValueError, KeyError, TypeError) as e:
+                self.reload_errors += 1
+                print(f"❌ Invalid advisory rules in {self.path}: {e}. Keeping previous rules.")
+                self._mtime = mtime
+                return False
+            self._rules = rules
+            self._mtime = mtime
+            self.reloads += 1
+            print(f"📖 Loaded {len(rules.index)} advisory rules (version {rules.version})")
+            return True
+
+    def _current(self):
+        if time.monotonic() - self._checked_at >= self.reload_seconds:
+            self.reload()
+        return self._rules
+
+    # -----------------------------
+    # EVALUATION
+    # -----------------------------
+    def get_advice(self, crop, disease_name, weather_summary):
+        self.lookups += 1
+        summary = str(weather_summary or "").strip().lower()
+        return self._current().advice_for(rule_key(crop, disease_name), summary)
+
+    def evaluate_batch(self, predictions):
+        """
+        Advice for many predictions in one call: an iterable of
+        (crop, disease_name, weather_summary) tuples or dicts with those keys.
+        Identical (label, weather) pairs are evaluated once. Returns a list of
+        advice lists in input order.
+        """
+        rules = self._current()
+        seen = {}
+        results = []
+        for item in predictions:
+            if isinstance(item, dict):
+                item = (item.get("crop"), item.get("disease_name") or item.get("predicted_label"),
+                        item.get("weather_summary"))
+            crop, disease_name, weather_summary = item
+            pair = (rule_key(crop, disease_name), str(weather_summary or "").strip().lower())
+            if pair not in seen:
+                seen[pair] = rules.advice_for(*pair)
+            results.append(list(seen[pair]))
+        self.lookups += len(results)
+        return results
+
+    def stats(self):
+        rules = self._rules
+        return {
+            "path": self.path,
+            "version": rules.version,
+            "rules": len(rules.index),
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "lookups": self.lookups,
+        }
+
+
+rule_engine = RuleEngine(ADVISORY_RULES_PATH)
+
+
 def get_disease_advice(crop, disease_name, weather_summary):
     """
     Generate practical recommendations for the farmer.
     """
-    advice = []
-
-    # --- Maize Diseases ---
-    if crop.lower() == "maize":
-        if "blight" in disease_name.lower():
-            advice.append("Spray copper-based fungicides during dry conditions.")
-            advice.append("Remove infected leaves to prevent spread.")
-        elif "rust" in disease_name.lower():
-            advice.append("Use resistant maize varieties if available.")
-            advice.append("Apply Mancozeb or Propiconazole at early infection.")
-        elif "streak" in disease_name.lower():
-            advice.append("Control insect vectors (aphids) with appropriate insecticides.")
-            advice.append("Avoid planting new maize near infected fields.")
-
-    # --- Plantain Diseases ---
-    elif crop.lower() == "plantain":
-        if "black_sigatoka" in disease_name.lower():
-            advice.append("Prune affected leaves and destroy them.")
-            advice.append("Use systemic fungicides like Propiconazole.")
-        elif "banana_bunchy_top" in disease_name.lower():
-            advice.append("Remove and burn infected suckers immediately.")
-            advice.append("Control aphids to limit transmission.")
-
-    # --- Weather-based Enhancements ---
-    if "rain" in weather_summary.lower():
-        advice.append("Avoid applying pesticides or fertilizers before rainfall.")
-    elif "dry" in weather_summary.lower():
-        advice.append("Irrigate if soil moisture is low and no rain expected soon.")
-    else:
-        advice.append("Monitor soil moisture and weather regularly.")
-
-    if not advice:
-        advice.append("No specific recommendation — monitor crop health regularly.")
-
-    return advice
+    return rule_engine.get_advice(crop, disease_name, weather_summary)
+
+
+def get_disease_advice_batch(predictions):
+    """Recommendations for a list of (crop, disease_name, weather_summary) predictions."""
+    return rule_engine.evaluate_batch(predictions)
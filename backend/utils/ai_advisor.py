@@ -1,12 +1,65 @@
+import os
+import time
 import requests
 import json
+from backend.utils.http_client import http
+from backend.utils.advice_cache import AdviceCache, prompt_fingerprint
+from backend.utils.advisory_rules import get_disease_advice
+from backend.utils.llm_gateway import LLMGateway, LLMOverloaded
 
-def generate_ai_advice(crop, disease, weather_summary):
-    """
-    Generate AI-based agricultural advice using local LLaMA 3 (via Ollama).
-    """
+# -----------------------------
+# LLM CONFIG
+# -----------------------------
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://127.0.0.1:11434/api/generate")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", 120))
+
+# Advice only depends on (disease, weather condition): cache it on disk.
+# Bump ADVICE_CACHE_VERSION to throw away everything generated so far.
+ADVICE_CACHE_DB = os.getenv("ADVICE_CACHE_DB", "data/advice_cache.sqlite3")
+ADVICE_CACHE_TTL_SECONDS = float(os.getenv("ADVICE_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+ADVICE_CACHE_VERSION = os.getenv("ADVICE_CACHE_VERSION", "1")
+
+# OpenWeather "main" groups (+ "Unknown" when the weather lookup failed)
+WEATHER_CONDITIONS = [
+    "Clear", "Clouds", "Rain", "Drizzle", "Thunderstorm",
+    "Mist", "Haze", "Fog", "Smoke", "Dust", "Unknown",
+]
+
+# Admission control: Ollama generates only a few answers at a time. Requests
+# that cannot get a slot within their deadline get rule-based advice instead.
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", 2))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", 8))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", 60))
+LLM_EXPECTED_SECONDS = float(os.getenv("LLM_EXPECTED_SECONDS", 20))
+
+# Pre-warming runs at low priority: each generation waits for an idle LLM
+# (at most PREWARM_IDLE_WAIT_SECONDS, then the pre-warm stops) and gets
+# PREWARM_DEADLINE_SECONDS to finish.
+PREWARM_IDLE_WAIT_SECONDS = float(os.getenv("PREWARM_IDLE_WAIT_SECONDS", 300))
+PREWARM_DEADLINE_SECONDS = float(os.getenv("PREWARM_DEADLINE_SECONDS", 120))
+
+advice_cache = AdviceCache(ADVICE_CACHE_DB, ttl_seconds=ADVICE_CACHE_TTL_SECONDS, version=ADVICE_CACHE_VERSION)
+llm_gateway = LLMGateway(
+    max_concurrent=LLM_MAX_CONCURRENT,
+    max_queue=LLM_MAX_QUEUE,
+    expected_seconds=LLM_EXPECTED_SECONDS,
+)
 
-    prompt = f"""
+NO_ADVICE = "No advice generated by AI."
+
+
+def normalize_weather_summary(weather_summary):
+    """Map a weather summary onto its canonical condition name ("rain " -> "Rain")."""
+    summary = " ".join(str(weather_summary or "").split())
+    for condition in WEATHER_CONDITIONS:
+        if summary.lower() == condition.lower():
+            return condition
+    return summary or "Unknown"
+
+
+def build_prompt(disease, weather_summary):
+    return f"""
 You are an experienced agricultural expert.
 
 A farmer has a crop currently affected by {disease}.
@@ -23,36 +76,287 @@ and go straight to appreciate the condition of the crops and and give the farmer
  tips to keep the crops in that good condition.
     """
 
-    try:
-        response = requests.post(
-            "http://127.0.0.1:11434/api/generate",
-            json={
-                "model": "llama3",
-                "prompt": prompt,
-                "stream": True  # ✅ Streaming mode
-            },
-            stream=True,
-            timeout=120
-        )
 
-        response.raise_for_status()
+def _stream_llm(prompt, deadline=None):
+    """
+    Stream a completion from Ollama, yielding text fragments as they arrive.
+    Raises on HTTP errors, and TimeoutError once time.monotonic() passes deadline.
+    """
+    timeout = OLLAMA_TIMEOUT
+    if deadline is not None:
+        timeout = max(1.0, min(timeout, deadline - time.monotonic()))
+    response = http.post(
+        OLLAMA_URL,
+        json={
+            "model": OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": True  # ✅ Streaming mode
+        },
+        stream=True,
+        timeout=timeout
+    )
+
+    response.raise_for_status()
 
-        # Read each line of streaming JSON safely
-        full_text = ""
+    # Read each line of streaming JSON safely
+    try:
         for line in response.iter_lines():
             if not line:
                 continue
             try:
                 data = json.loads(line.decode("utf-8"))
-                full_text += data.get("response", "")
-                if data.get("done", False):
-                    break
             except json.JSONDecodeError:
                 continue
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError("LLM answer exceeded its deadline")
+            if data.get("response"):
+                yield data["response"]
+            if data.get("done", False):
+                break
+    finally:
+        response.close()
+
+
+def _call_llm(prompt, deadline=None):
+    """Full completion text from Ollama (raises on HTTP errors / deadline)."""
+    return "".join(_stream_llm(prompt, deadline)).strip()
+
+
+def _llm_advice(disease, weather_summary, use_cache=True, deadline_seconds=None, idle_wait_seconds=None):
+    """
+    Cached or freshly generated LLM advice, going through the LLM gateway.
+    Returns (advice or None, "cache" | "coalesced" | "llm", failure) where
+    "coalesced" means another caller's generation answered this one, and
+    failure holds "reason" and "message" when no advice could be produced.
+    With idle_wait_seconds the LLM slot is taken at low priority
+    (LLMGateway.admit_when_idle) before the prompt is marked as in flight,
+    so live callers never wait on a generation that has not started.
+    Waiting for another caller's generation is bounded by the deadline.
+    """
+    prompt = build_prompt(disease, weather_summary)
+    failure = {}
+    generated = []
+    outcome = {}
+    held = []
+
+    if idle_wait_seconds is not None:
+        try:
+            held.append(llm_gateway.admit_when_idle(idle_wait_seconds, deadline_seconds))
+        except LLMOverloaded as e:
+            failure.update(reason=e.reason, message=f"⏳ AI advisor busy: {str(e)}")
+            return None, "llm", failure
+    wait_seconds = held[0].remaining() if held else deadline_seconds
+
+    def _generate():
+        generated.append(True)
+        try:
+            slot = held.pop() if held else llm_gateway.admit(deadline_seconds)
+            with slot:
+                return _call_llm(prompt, slot.deadline) or None
+        except LLMOverloaded as e:
+            failure.update(reason=e.reason, message=f"⏳ AI advisor busy: {str(e)}")
+        except requests.exceptions.RequestException as e:
+            failure.update(reason="error", message=f"⚠️ Error connecting to LLaMA: {str(e)}")
+        except TimeoutError as e:
+            failure.update(reason="timeout", message=f"⏱️ {str(e)}")
+        except Exception as e:
+            failure.update(reason="error", message=f"💥 Unexpected error: {str(e)}")
+        return None
 
-        return full_text.strip() or "No advice generated by AI."
+    if not use_cache:
+        return _generate(), "llm", failure
 
-    except requests.exceptions.RequestException as e:
-        return f"⚠️ Error connecting to LLaMA: {str(e)}"
+    key = prompt_fingerprint(prompt, OLLAMA_MODEL)
+    try:
+        advice = advice_cache.get_or_generate(
+            key, _generate, OLLAMA_MODEL, disease=disease, weather=weather_summary, info=outcome,
+            wait_seconds=wait_seconds,
+        )
+    except TimeoutError as e:
+        failure.update(reason="timeout", message=f"⏱️ {str(e)}")
+        advice = None
     except Exception as e:
-        return f"💥 Unexpected error: {str(e)}"
+        print(f"⚠️ [ai_advisor] advice cache unavailable: {e}")
+        advice = _generate()
+    finally:
+        if held:
+            # Answered from the cache or another generation: the slot was not used
+            held.pop().abandon()
+    return advice, "llm" if generated else outcome.get("source", "cache"), failure
+
+
+def generate_ai_advice(crop, disease, weather_summary, use_cache=True):
+    """
+    Generate AI-based agricultural advice using local LLaMA 3 (via Ollama).
+    Answers come from the advice cache when the same prompt was seen before;
+    error messages and empty answers are returned but never cached.
+    Waits for an LLM slot without a deadline.
+    """
+    weather_summary = normalize_weather_summary(weather_summary)
+    advice, _, failure = _llm_advice(disease, weather_summary, use_cache=use_cache)
+    return advice or failure.get("message", NO_ADVICE)
+
+
+def advise(crop, disease, weather_summary, use_cache=True, deadline_seconds=LLM_DEADLINE_SECONDS):
+    """
+    Advice for a live request: cached or LLM advice when the LLM can answer
+    within deadline_seconds, otherwise the rule-based advice at once.
+    Returns {"advice": [...], "advisor": "cache" | "coalesced" | "llm" | "rules"} plus
+    "reason" (queue_full, deadline, timeout, error) when rules were used.
+    """
+    weather_summary = normalize_weather_summary(weather_summary)
+    advice, source, failure = _llm_advice(disease, weather_summary, use_cache, deadline_seconds)
+    if advice:
+        return {"advice": [advice], "advisor": source}
+
+    reason = failure.get("reason", "unavailable")
+    print(f"🪫 [ai_advisor] LLM not used ({reason}) — answering from advisory rules")
+    return {
+        "advice": get_disease_advice(crop, disease, weather_summary),
+        "advisor": "rules",
+        "reason": reason,
+    }
+
+
+def stream_ai_advice(crop, disease, weather_summary, use_cache=True, info=None,
+                     deadline_seconds=LLM_DEADLINE_SECONDS):
+    """
+    Same advice as advise(), yielded as text fragments while the LLM
+    produces them. A cached answer or the rule-based fallback is yielded in
+    one piece; a complete streamed answer is stored in the cache, errors are
+    yielded but not cached. If an info dict is given, info["advisor"] (and
+    info["reason"] for rules) is set before the first fragment is yielded.
+    deadline_seconds bounds both getting an LLM slot and the generation:
+    it is the read timeout of the Ollama stream, and the stream is closed
+    once it passes, so a stalled Ollama cannot hold the slot (or the
+    caller) for OLLAMA_TIMEOUT.
+    """
+    info = {} if info is None else info
+    weather_summary = normalize_weather_summary(weather_summary)
+    prompt = build_prompt(disease, weather_summary)
+    key = prompt_fingerprint(prompt, OLLAMA_MODEL)
+
+    def _rules(reason):
+        info.update(advisor="rules", reason=reason)
+        print(f"🪫 [ai_advisor] LLM not used ({reason}) — answering from advisory rules")
+        return "\n".join(get_disease_advice(crop, disease, weather_summary))
+
+    if use_cache:
+        try:
+            cached = advice_cache.lookup(key)
+        except Exception as e:
+            print(f"⚠️ [ai_advisor] advice cache unavailable: {e}")
+            cached = None
+        if cached is not None:
+            info["advisor"] = "cache"
+            yield cached
+            return
+
+    try:
+        slot = llm_gateway.admit(deadline_seconds)
+    except LLMOverloaded as e:
+        yield _rules(e.reason)
+        return
+
+    chunks = []
+    with slot:
+        fragments = _stream_llm(prompt, slot.deadline)
+        try:
+            for fragment in fragments:
+                # Ollama's first fragments are often leading whitespace
+                if not chunks:
+                    fragment = fragment.lstrip()
+                    if not fragment:
+                        continue
+                    info["advisor"] = "llm"
+                chunks.append(fragment)
+                yield fragment
+        except Exception as e:
+            if hasattr(fragments, "close"):
+                fragments.close()  # stops reading from Ollama
+            slot.release(ok=False)
+            # requests reports a read timeout mid-stream as a ConnectionError
+            timed_out = isinstance(e, (TimeoutError, requests.exceptions.Timeout)) or slot.remaining() == 0
+            if not chunks:
+                yield _rules("timeout" if timed_out else "error")
+            elif timed_out:
+                yield f"⏱️ {str(e)}"
+            elif isinstance(e, requests.exceptions.RequestException):
+                yield f"⚠️ Error connecting to LLaMA: {str(e)}"
+            else:
+                yield f"💥 Unexpected error: {str(e)}"
+            return
+
+    advice = "".join(chunks).strip()
+    if not advice:
+        yield _rules("empty")
+    elif use_cache:
+        advice_cache.put(key, advice, OLLAMA_MODEL, disease=disease, weather=weather_summary)
+
+
+# -----------------------------
+# CACHE PRE-WARMING
+# -----------------------------
+def prewarm_advice_cache(labels, conditions=WEATHER_CONDITIONS, force=False,
+                         idle_wait_seconds=PREWARM_IDLE_WAIT_SECONDS, deadline_seconds=PREWARM_DEADLINE_SECONDS):
+    """
+    Generate advice for every (label, weather condition) pair that is not
+    cached yet, one LLM call at a time and only while the LLM is idle, so
+    live requests never queue behind the pre-warm. Each call has its own
+    deadline. If the LLM stays busy for idle_wait_seconds the pre-warm
+    stops and the remaining pairs are counted as "skipped".
+    force regenerates cached pairs; the old entry is served until the new
+    one replaces it. Returns counts of what happened.
+    """
+    summary = {"cached": 0, "generated": 0, "failed": 0, "skipped": 0}
+    labels = sorted(set(labels))
+    pairs = [(label, normalize_weather_summary(condition)) for label in labels for condition in conditions]
+    print(f"🔥 [ai_advisor] pre-warming advice for {len(labels)} labels x {len(conditions)} conditions")
+
+    for i, (label, condition) in enumerate(pairs):
+        key = prompt_fingerprint(build_prompt(label, condition), OLLAMA_MODEL)
+        if not force and advice_cache.contains(key):
+            summary["cached"] += 1
+            continue
+        advice, source, failure = _llm_advice(label, condition, use_cache=not force,
+                                              deadline_seconds=deadline_seconds,
+                                              idle_wait_seconds=idle_wait_seconds)
+        if failure.get("reason") == "busy":
+            summary["skipped"] = len(pairs) - i
+            print(f"⏸️ [ai_advisor] pre-warm stopped, LLM busy with live requests: {failure['message']}")
+            break
+        if not advice:
+            summary["failed"] += 1
+        elif source != "llm":
+            # A live request generated it meanwhile
+            summary["cached"] += 1
+        else:
+            if force:
+                advice_cache.put(key, advice, OLLAMA_MODEL, disease=label, weather=condition)
+            summary["generated"] += 1
+        done = sum(summary.values())
+        print(f"   [{done}/{len(pairs)}] {label} / {condition}")
+
+    print(f"✅ [ai_advisor] pre-warm done: {summary}")
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Pre-generate cached LLM advice")
+    parser.add_argument("--labels", help="comma-separated labels (default: all classes of the label encoder)")
+    parser.add_argument("--conditions", default=",".join(WEATHER_CONDITIONS))
+    parser.add_argument("--force", action="store_true", help="regenerate entries that are already cached")
+    parser.add_argument("--purge", action="store_true", help="drop expired / old-version entries first")
+    args = parser.parse_args()
+
+    if args.purge:
+        print(f"🧹 removed {advice_cache.purge()} stale advice entries")
+    if args.labels:
+        labels = [label.strip() for label in args.labels.split(",") if label.strip()]
+    else:
+        from backend.ml_models.disease_model import ENCODER_PATH
+        labels = list(joblib.load(ENCODER_PATH).keys())
+    prewarm_advice_cache(labels, [c.strip() for c in args.conditions.split(",") if c.strip()], force=args.force)
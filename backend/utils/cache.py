@@ -0,0 +1,165 @@
+"""
+cache.py
+In-process TTL cache with single-flight request coalescing and optional
+stale-while-revalidate, used to share upstream API responses (e.g. weather)
+between concurrent requests.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+
+class TTLCache:
+    """
+    get_or_fetch(key, fetch) returns a cached value or calls fetch() once:
+    - fresh entry (age < ttl)                -> returned directly
+    - stale entry (age < ttl + stale_ttl)    -> returned, refreshed in background
+    - missing / expired                      -> fetched; concurrent misses for the
+                                                same key wait on one upstream call
+    fetch() returning None is treated as "don't cache"; exceptions propagate
+    to every coalesced caller.
+    """
+
+    def __init__(self, name, ttl_seconds, stale_ttl_seconds=0, max_entries=1024):
+        self.name = name
+        self.ttl_seconds = float(ttl_seconds)
+        self.stale_ttl_seconds = float(stale_ttl_seconds)
+        self.max_entries = int(max_entries)
+
+        self._entries = {}    # key -> (value, stored_at)
+        self._inflight = {}   # key -> Future of the running fetch
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    # -----------------------------
+    # PUBLIC API
+    # -----------------------------
+    def get_or_fetch(self, key, fetch):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = now - stored_at
+                if age < self.ttl_seconds:
+                    self.hits += 1
+                    return value
+                if age < self.ttl_seconds + self.stale_ttl_seconds:
+                    self.stale_hits += 1
+                    if key not in self._inflight:
+                        self._inflight[key] = Future()
+                        threading.Thread(
+                            target=self._refresh, args=(key, fetch),
+                            name=f"{self.name}-revalidate", daemon=True
+                        ).start()
+                    return value
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+                leader = True
+
+        if not leader:
+            return future.result()
+        self._run_fetch(key, fetch, future)
+        return future.result()
+
+    def force_refresh(self, key, fetch):
+        """
+        Fetch a new value now whatever the cached entry's age (joining a fetch
+        already in flight). The entry is only replaced on success, so if
+        fetch() raises it stays available as the stale fallback.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.refreshes += 1
+                future = self._inflight[key] = Future()
+                leader = True
+        if leader:
+            self._run_fetch(key, fetch, future)
+        return future.result()
+
+    def peek(self, key):
+        """Cached value regardless of age (None if absent). Does not count as a hit."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+            ages = [now - stored_at for _, stored_at in self._entries.values()]
+            return {
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl_seconds,
+                "stale_ttl_seconds": self.stale_ttl_seconds,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "refreshes": self.refreshes,
+                "errors": self.errors,
+                "upstream_calls": self.misses + self.refreshes,
+                "hit_rate": round((self.hits + self.stale_hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+                "stale_entries": sum(1 for age in ages if age >= self.ttl_seconds),
+                "oldest_entry_age_seconds": round(max(ages), 1) if ages else None,
+            }
+
+    # -----------------------------
+    # INTERNALS
+    # -----------------------------
+    def _store(self, key, value):
+        self._entries[key] = (value, time.monotonic())
+        if len(self._entries) > self.max_entries:
+            oldest = min(self._entries, key=lambda k: self._entries[k][1])
+            self._entries.pop(oldest, None)
+
+    def _run_fetch(self, key, fetch, future):
+        try:
+            value = fetch()
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            return
+        with self._lock:
+            if value is not None:
+                self._store(key, value)
+            self._inflight.pop(key, None)
+        future.set_result(value)
+
+    def _refresh(self, key, fetch):
+        with self._lock:
+            self.refreshes += 1
+            future = self._inflight[key]
+        self._run_fetch(key, fetch, future)
+        # Nobody waits on a background refresh; swallow its error after counting it
+        future.exception()
@@ -0,0 +1,64 @@
+"""
+fake_twilio.py
+Local stand-in for twilio.rest.Client used to test and benchmark the
+outbound dispatcher without sending real WhatsApp messages.
+Simulates API latency and an account-wide rate limit that answers 429.
+"""
+
+import threading
+import time
+from collections import deque
+
+from twilio.base.exceptions import TwilioRestException
+
+
+class _FakeMessages:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, from_=None, to=None, body=None):
+        return self._owner._create(from_, to, body)
+
+
+class FakeTwilioClient:
+    """
+    latency:         seconds each create() call takes
+    max_per_second:  account limit; calls above it raise a 429 TwilioRestException
+    max_body_length: bodies longer than this raise a 400 (like Twilio's 1600 limit)
+    length_fn:       how a body is measured against max_body_length (default len)
+    """
+
+    def __init__(self, latency=0.05, max_per_second=None, max_body_length=1600, length_fn=len):
+        self.latency = latency
+        self.max_per_second = max_per_second
+        self.max_body_length = max_body_length
+        self.length_fn = length_fn
+        self.rejected_400 = 0
+        self.messages = _FakeMessages(self)
+        self.sent = []          # (timestamp, to, body)
+        self.rejected_429 = 0
+        self._window = deque()
+        self._lock = threading.Lock()
+
+    def _create(self, from_, to, body):
+        time.sleep(self.latency)
+        now = time.monotonic()
+        with self._lock:
+            if self.max_body_length is not None and self.length_fn(body) > self.max_body_length:
+                self.rejected_400 += 1
+                raise TwilioRestException(
+                    400, "/Messages", msg="The concatenated message body exceeds the 1600 character limit"
+                )
+            if self.max_per_second is not None:
+                while self._window and now - self._window[0] >= 1.0:
+                    self._window.popleft()
+                if len(self._window) >= self.max_per_second:
+                    self.rejected_429 += 1
+                    raise TwilioRestException(429, "/Messages", msg="Too Many Requests")
+                self._window.append(now)
+            self.sent.append((now, to, body))
+        return {"sid": f"SM{len(self.sent):032d}", "to": to, "body": body}
+
+    def bodies_for(self, to):
+        with self._lock:
+            return [body for _, recipient, body in self.sent if recipient == to]
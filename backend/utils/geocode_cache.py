@@ -0,0 +1,177 @@
+"""
+geocode_cache.py
+Persistent city -> (lat, lon) cache, stored in a local SQLite file.
+City coordinates never change, so each location is resolved upstream at most
+once and kept forever. The table is seeded from
+backend/data/cameroon_localities.json (the localities we serve) and also
+learns coordinates from any /weather response it sees.
+Keys are normalized (city, country): case, whitespace and accents are
+ignored, so "Yaoundé", " yaounde " and "YAOUNDE" share one entry.
+The SQLite file is opened (and seeded) on first use, not when the cache
+object is created, so importing a module that holds one touches no files.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+
+def geocode_key(city, country="CM"):
+    """('Yaoundé ', 'cm') -> ('yaounde', 'CM'); like weather_api.normalize_location, minus accents."""
+    folded = unicodedata.normalize("NFKD", " ".join(str(city).split()).lower())
+    return "".join(c for c in folded if not unicodedata.combining(c)), str(country).strip().upper()
+
+
+class GeocodeCache:
+    """
+    resolve(city, country) -> (lat, lon) or None
+    - seed_path: JSON {"country": ..., "localities": [{"city", "lat", "lon"}]}
+      inserted on start-up (existing rows are kept)
+    - resolver(city, country): upstream lookup for unknown locations,
+      returning (lat, lon) or None; its answers are stored permanently
+    """
+
+    def __init__(self, db_path, seed_path=None, resolver=None, name="geocode"):
+        self.db_path = db_path
+        self.seed_path = seed_path
+        self.resolver = resolver
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._conn = None
+        self._loaded = None
+
+        self.hits = 0
+        self.misses = 0
+        self.resolved = 0
+        self.learned = 0
+        self.unresolved = 0
+        self.seeded = 0
+
+    # -----------------------------
+    # PUBLIC API
+    # -----------------------------
+    def lookup(self, city, country="CM"):
+        """Cached coordinates, or None (no upstream call)."""
+        return self._entries.get(geocode_key(city, country))
+
+    def resolve(self, city, country="CM"):
+        """Cached coordinates, resolving unknown locations upstream once."""
+        key = geocode_key(city, country)
+        coords = self._entries.get(key)
+        if coords is not None:
+            self.hits += 1
+            return coords
+        self.misses += 1
+        if self.resolver is None:
+            return None
+        try:
+            coords = self.resolver(*key)
+        except Exception as e:
+            print(f"❌ [{self.name}] could not geocode {key[0]}, {key[1]}: {e}")
+            coords = None
+        if coords is None:
+            self.unresolved += 1
+            return None
+        self.resolved += 1
+        self.put(key[0], key[1], coords[0], coords[1], source="geocoding_api")
+        return self._entries[key]
+
+    def learn(self, city, country, coord):
+        """Store coordinates seen in an OpenWeather payload ({"lat", "lon"}) if new."""
+        key = geocode_key(city, country)
+        if key in self._entries or not coord:
+            return
+        try:
+            self.put(key[0], key[1], coord["lat"], coord["lon"], source="weather_api")
+        except (KeyError, TypeError, ValueError):
+            return
+        self.learned += 1
+
+    def put(self, city, country, lat, lon, source="manual"):
+        key = geocode_key(city, country)
+        coords = (round(float(lat), 4), round(float(lon), 4))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO geocode (city, country, lat, lon, source, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key[0], key[1], coords[0], coords[1], source, time.time()),
+            )
+            self._entries[key] = coords
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "seeded": self.seeded,
+            "hits": self.hits,
+            "misses": self.misses,
+            "resolved_upstream": self.resolved,
+            "learned": self.learned,
+            "unresolved": self.unresolved,
+        }
+
+    # -----------------------------
+    # INTERNALS
+    # -----------------------------
+    @property
+    def _db(self):
+        self._open()
+        return self._conn
+
+    @property
+    def _entries(self):
+        self._open()
+        return self._loaded
+
+    def _open(self):
+        """Open, create and seed the database once, on first use."""
+        if self._loaded is not None:
+            return
+        with self._open_lock:
+            if self._loaded is not None:
+                return
+            if os.path.dirname(self.db_path):
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS geocode (
+                    city TEXT NOT NULL,
+                    country TEXT NOT NULL,
+                    lat REAL NOT NULL,
+                    lon REAL NOT NULL,
+                    source TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (city, country)
+                )"""
+            )
+            self.seeded = self._seed(self.seed_path) if self.seed_path else 0
+            # The whole table is small: lookups are served from memory
+            self._loaded = {
+                (city, country): (lat, lon)
+                for city, country, lat, lon in self._conn.execute("SELECT city, country, lat, lon FROM geocode")
+            }
+
+    def _seed(self, seed_path):
+        try:
+            with open(seed_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ [{self.name}] could not read seed localities {seed_path}: {e}")
+            return 0
+        rows = []
+        for place in data.get("localities", []):
+            city, country = geocode_key(place["city"], place.get("country", data.get("country", "CM")))
+            rows.append((city, country, float(place["lat"]), float(place["lon"]), "seed", time.time()))
+        # Called by _open() only, before anyone else can use the connection
+        before = self._conn.total_changes
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO geocode (city, country, lat, lon, source, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        return self._conn.total_changes - before
@@ -0,0 +1,130 @@
+"""
+http_client.py
+Shared pooled HTTP client for every outbound call (OpenWeather, Ollama,
+Twilio media, loopback). One keep-alive requests.Session per host, so
+repeated calls reuse TCP/TLS connections instead of handshaking each time,
+with retry + exponential backoff on transient failures.
+"""
+
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 20))          # connections kept per host
+HTTP_POOL_BLOCK = os.getenv("HTTP_POOL_BLOCK", "false").lower() == "true"
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 30))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 3))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", 0.5))  # 0.5s, 1s, 2s ...
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _retry_policy():
+    # Status/read retries only for idempotent methods (urllib3 default set);
+    # connection errors are retried for every method since nothing was sent.
+    return Retry(
+        total=HTTP_MAX_RETRIES,
+        connect=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+class PooledHTTPClient:
+    """requests-compatible get/post/request backed by one pooled Session per host."""
+
+    def __init__(self, pool_maxsize=HTTP_POOL_MAXSIZE, pool_block=HTTP_POOL_BLOCK,
+                 timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)):
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.timeout = timeout
+        self._sessions = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _host_key(self, url):
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _session(self, host):
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self.pool_maxsize,
+                    pool_block=self.pool_block,
+                    max_retries=_retry_policy(),
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+                self._stats[host] = {"requests": 0, "errors": 0, "in_flight": 0, "peak_in_flight": 0}
+            return session
+
+    def request(self, method, url, **kwargs):
+        host = self._host_key(url)
+        session = self._session(host)
+        kwargs.setdefault("timeout", self.timeout)
+
+        with self._lock:
+            stats = self._stats[host]
+            stats["requests"] += 1
+            stats["in_flight"] += 1
+            stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+        try:
+            return session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                stats["in_flight"] -= 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self):
+        """Per-host pool usage; saturation = in-flight requests / pool size."""
+        with self._lock:
+            report = {}
+            for host, stats in self._stats.items():
+                adapter = self._sessions[host].get_adapter(host)
+                report[host] = dict(
+                    stats,
+                    pool_maxsize=self.pool_maxsize,
+                    saturation=round(stats["in_flight"] / self.pool_maxsize, 2),
+                    peak_saturation=round(stats["peak_in_flight"] / self.pool_maxsize, 2),
+                    idle_connections=_idle_connections(adapter),
+                )
+            return report
+
+
+def _idle_connections(adapter):
+    """Open keep-alive sockets parked in the adapter's urllib3 pools."""
+    idle = 0
+    pools = adapter.poolmanager.pools
+    for key in pools.keys():
+        queue = getattr(pools.get(key), "pool", None)
+        if queue is not None:
+            # urllib3 pre-fills the queue with None placeholders
+            idle += sum(1 for conn in list(queue.queue) if conn is not None)
+    return idle
+
+
+# Process-wide client shared by all call sites
+http = PooledHTTPClient()
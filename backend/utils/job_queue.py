@@ -0,0 +1,312 @@
+"""
+job_queue.py
+Durable job queue with a fixed-size worker pool, used for WhatsApp webhook
+processing. Jobs are persisted in a local SQLite file before the webhook is
+acknowledged, so a restart resumes them instead of losing them. The number
+of outstanding jobs is bounded: above max_in_flight callers are told they
+are queued (backpressure), above max_queued new jobs are refused.
+A job is only deleted once its handler returns; a handler that raises is
+retried with exponential backoff, up to max_attempts in total.
+Handlers record side effects (e.g. messages already sent) with checkpoint(),
+so a retried or resumed job can skip them.
+The SQLite file is opened on first use (submit, start, stats), not when the
+queue object is created.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+
+class JobQueueFull(Exception):
+    """Raised by submit() when max_queued outstanding jobs are already waiting."""
+
+
+class JobQueue:
+    """
+    handler(payload) is called on a worker thread for every job; raising
+    marks the attempt as failed.
+    - workers:       fixed number of worker threads (max concurrent jobs)
+    - max_in_flight: outstanding jobs above which submit() reports backpressure
+    - max_queued:    hard cap on outstanding jobs
+    - max_attempts:  jobs that raised or were interrupted (e.g. crash mid-job)
+                     this many times are failed
+    - retry_base_seconds: a raising job is retried after base * 2^(attempt-1)
+    - on_failure(payload, error): called once when a job is finally failed
+    """
+
+    def __init__(self, db_path, handler, workers=4, max_in_flight=20, max_queued=1000,
+                 max_attempts=3, retry_base_seconds=5.0, on_failure=None, name="jobs"):
+        self.db_path = db_path
+        self.handler = handler
+        self.workers = int(workers)
+        self.max_in_flight = int(max_in_flight)
+        self.max_queued = int(max_queued)
+        self.max_attempts = int(max_attempts)
+        self.retry_base_seconds = float(retry_base_seconds)
+        self.on_failure = on_failure
+        self.name = name
+
+        self._conn = None
+        self._open_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._threads = []
+        self._stopping = False
+        self._local = threading.local()   # .job_id of the job running on this worker
+
+        # Recent latencies (seconds) for metrics
+        self._wait_times = deque(maxlen=500)
+        self._run_times = deque(maxlen=500)
+        self._completed = 0
+        self._failed = 0
+        self._retried = 0
+        self._rejected = 0
+        self.resumed = 0
+
+    # -----------------------------
+    # LIFECYCLE
+    # -----------------------------
+    def start(self):
+        """Resume interrupted jobs and start the worker pool (idempotent)."""
+        with self._lock:
+            if self._threads:
+                return
+            # Jobs still 'running' were interrupted by a restart: queue them again
+            cur = self._db.execute(
+                "UPDATE jobs SET status = 'pending' WHERE status = 'running' AND attempts < ?",
+                (self.max_attempts,),
+            )
+            self.resumed = cur.rowcount
+            abandoned = self._db.execute("SELECT payload FROM jobs WHERE status = 'running'").fetchall()
+            self._db.execute(
+                "UPDATE jobs SET status = 'failed', error = 'too many interrupted attempts', "
+                "finished_at = ? WHERE status = 'running'",
+                (time.time(),),
+            )
+            self._failed += len(abandoned)
+            self._stopping = False
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"{self.name}-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        for (payload,) in abandoned:
+            self._notify_failure(json.loads(payload), "too many interrupted attempts")
+        pending = self.stats()["pending"]
+        if pending:
+            print(f"🔁 [{self.name}] resuming {pending} queued job(s) ({self.resumed} interrupted)")
+
+    def stop(self, timeout=None):
+        """Stop workers after their current job (pending jobs stay in the store)."""
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    # -----------------------------
+    # SUBMIT
+    # -----------------------------
+    def submit(self, payload):
+        """
+        Persist a job. Returns (job_id, position, busy):
+        position is the 1-based place in line, busy is True when the number of
+        outstanding jobs exceeds max_in_flight. Raises JobQueueFull above max_queued.
+        """
+        with self._lock:
+            outstanding = self._count("status IN ('pending', 'running')")
+            if outstanding >= self.max_queued:
+                self._rejected += 1
+                raise JobQueueFull(f"{outstanding} jobs already queued")
+
+            cur = self._db.execute(
+                "INSERT INTO jobs (payload, created_at) VALUES (?, ?)",
+                (json.dumps(payload), time.time()),
+            )
+            job_id = cur.lastrowid
+            position = self._count("status = 'pending' AND id <= ?", (job_id,))
+            self._wakeup.notify()
+        return job_id, position, outstanding + 1 > self.max_in_flight
+
+    # -----------------------------
+    # CHECKPOINTS
+    # -----------------------------
+    def current_job_id(self):
+        """Id of the job the calling worker thread is running (None outside a job)."""
+        return getattr(self._local, "job_id", None)
+
+    def checkpoint(self, job_id, step):
+        """Record that `step` of a job is done; kept across retries and restarts."""
+        with self._lock:
+            row = self._db.execute("SELECT checkpoints FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            steps = json.loads(row[0])
+            if step not in steps:
+                steps.append(step)
+                self._db.execute("UPDATE jobs SET checkpoints = ? WHERE id = ?", (json.dumps(steps), job_id))
+
+    def checkpoints(self, job_id):
+        """Steps recorded with checkpoint() for a job, as a set."""
+        with self._lock:
+            row = self._db.execute("SELECT checkpoints FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return set(json.loads(row[0])) if row else set()
+
+    # -----------------------------
+    # WORKERS
+    # -----------------------------
+    @property
+    def _db(self):
+        """The SQLite connection, opened (and the schema created/upgraded) on first use."""
+        if self._conn is None:
+            with self._open_lock:
+                if self._conn is None:
+                    if os.path.dirname(self.db_path):
+                        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+                    conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(
+                        """CREATE TABLE IF NOT EXISTS jobs (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            payload TEXT NOT NULL,
+                            status TEXT NOT NULL DEFAULT 'pending',
+                            attempts INTEGER NOT NULL DEFAULT 0,
+                            created_at REAL NOT NULL,
+                            started_at REAL,
+                            finished_at REAL,
+                            error TEXT,
+                            run_after REAL NOT NULL DEFAULT 0,
+                            checkpoints TEXT NOT NULL DEFAULT '[]'
+                        )"""
+                    )
+                    # Databases created before retries / checkpoints existed lack the columns
+                    columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+                    if "run_after" not in columns:
+                        conn.execute("ALTER TABLE jobs ADD COLUMN run_after REAL NOT NULL DEFAULT 0")
+                    if "checkpoints" not in columns:
+                        conn.execute("ALTER TABLE jobs ADD COLUMN checkpoints TEXT NOT NULL DEFAULT '[]'")
+                    conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+                    self._conn = conn
+        return self._conn
+
+    def _count(self, where, params=()):
+        return self._db.execute(f"SELECT COUNT(*) FROM jobs WHERE {where}", params).fetchone()[0]
+
+    def _claim(self):
+        """Atomically mark the oldest due pending job as running (caller holds the lock)."""
+        now = time.time()
+        row = self._db.execute(
+            "SELECT id, payload, created_at, attempts FROM jobs "
+            "WHERE status = 'pending' AND run_after <= ? ORDER BY id LIMIT 1",
+            (now,),
+        ).fetchone()
+        if row is None:
+            return None
+        self._db.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ? WHERE id = ?",
+            (now, row[0]),
+        )
+        return row[0], row[1], row[2], row[3] + 1
+
+    def _next_retry_wait(self):
+        """Seconds until the earliest backed-off job is due (caller holds the lock)."""
+        due = self._db.execute(
+            "SELECT MIN(run_after) FROM jobs WHERE status = 'pending'"
+        ).fetchone()[0]
+        if due is None:
+            return 5
+        return min(5, max(0.01, due - time.time()))
+
+    def _notify_failure(self, payload, error):
+        if self.on_failure is None:
+            return
+        try:
+            self.on_failure(payload, error)
+        except Exception as e:
+            print(f"❌ [{self.name}] on_failure callback raised: {e}")
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                job = self._claim()
+                while job is None and not self._stopping:
+                    self._wakeup.wait(timeout=self._next_retry_wait())
+                    job = self._claim()
+                if self._stopping and job is None:
+                    return
+
+            job_id, payload, created_at, attempt = job
+            started = time.time()
+            error = None
+            self._local.job_id = job_id
+            try:
+                self.handler(json.loads(payload))
+            except Exception as e:
+                error = str(e)
+                print(f"❌ [{self.name}] job #{job_id} failed: {e}")
+            finally:
+                self._local.job_id = None
+            finished = time.time()
+
+            failed = False
+            with self._lock:
+                if error is None:
+                    # Finished jobs are not needed for recovery
+                    self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+                    self._completed += 1
+                elif attempt < self.max_attempts:
+                    delay = self.retry_base_seconds * (2 ** (attempt - 1))
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'pending', run_after = ?, error = ? WHERE id = ?",
+                        (finished + delay, error, job_id),
+                    )
+                    self._retried += 1
+                    print(f"🔁 [{self.name}] job #{job_id} retry {attempt}/{self.max_attempts - 1} in {delay:.0f}s")
+                else:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                        (finished, error, job_id),
+                    )
+                    self._failed += 1
+                    failed = True
+                self._wait_times.append(started - created_at)
+                self._run_times.append(finished - started)
+            if failed:
+                self._notify_failure(json.loads(payload), error)
+
+    # -----------------------------
+    # METRICS
+    # -----------------------------
+    @staticmethod
+    def _summary(samples):
+        if not samples:
+            return {"avg": None, "p95": None}
+        ordered = sorted(samples)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return {"avg": round(sum(ordered) / len(ordered), 3), "p95": round(p95, 3)}
+
+    def stats(self):
+        with self._lock:
+            oldest = self._db.execute(
+                "SELECT MIN(created_at) FROM jobs WHERE status = 'pending'"
+            ).fetchone()[0]
+            return {
+                "workers": self.workers,
+                "max_in_flight": self.max_in_flight,
+                "max_queued": self.max_queued,
+                "pending": self._count("status = 'pending'"),
+                "running": self._count("status = 'running'"),
+                "failed_stored": self._count("status = 'failed'"),
+                "completed": self._completed,
+                "failed": self._failed,
+                "retried": self._retried,
+                "rejected": self._rejected,
+                "resumed_after_restart": self.resumed,
+                "oldest_pending_age_seconds": round(time.time() - oldest, 1) if oldest else None,
+                "queue_wait_seconds": self._summary(self._wait_times),
+                "run_seconds": self._summary(self._run_times),
+            }
@@ -0,0 +1,204 @@
+"""
+llm_gateway.py
+Admission control for the local LLM (Ollama), which can only generate a few
+completions at a time.
+- At most max_concurrent generations run at once; further callers wait in a
+  bounded FIFO queue.
+- Each caller has a deadline: if the queue is full, or the expected wait plus
+  a typical generation time would overrun the deadline, the caller is
+  refused at once (LLMOverloaded) so it can answer from the rule-based
+  advisor instead of timing out with everyone else.
+- Background work (cache pre-warming) uses admit_when_idle(): it never
+  queues ahead of live callers, only takes a slot while nothing else runs
+  or waits, and gives up when the LLM stays busy.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+
+class LLMOverloaded(Exception):
+    """Raised by admit() when a request is shed. .reason is queue_full, deadline, timeout or busy."""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
+class _Slot:
+    """Context manager holding one generation slot; release() is idempotent."""
+
+    def __init__(self, gateway, deadline):
+        self._gateway = gateway
+        self.deadline = deadline
+        self.started = time.monotonic()
+        self._released = False
+
+    def remaining(self):
+        """Seconds left before the caller's deadline (None = no deadline)."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def release(self, ok=True):
+        if not self._released:
+            self._released = True
+            self._gateway._release(time.monotonic() - self.started, ok)
+
+    def abandon(self):
+        """Give the slot back without having generated anything (not counted)."""
+        if not self._released:
+            self._released = True
+            self._gateway._release(None, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release(ok=exc_type is None)
+        return False
+
+
+class LLMGateway:
+    """
+    max_concurrent:   generations allowed at once (match Ollama's OLLAMA_NUM_PARALLEL)
+    max_queue:        callers allowed to wait for a slot; more are shed
+    expected_seconds: initial guess of one generation's duration, refined
+                      from observed generations (moving average)
+    """
+
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, max_concurrent=2, max_queue=8, expected_seconds=20.0, name="llm"):
+        self.max_concurrent = int(max_concurrent)
+        self.max_queue = int(max_queue)
+        self.expected_seconds = float(expected_seconds)
+        self.name = name
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = deque()   # tickets in FIFO order
+        self._started_at = time.monotonic()
+        self._busy_seconds = 0.0
+
+        self.admitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.shed = {"queue_full": 0, "deadline": 0, "timeout": 0, "busy": 0}
+        self.peak_waiting = 0
+        self._queue_wait_ms = deque(maxlen=500)
+
+    # -----------------------------
+    # PUBLIC API
+    # -----------------------------
+    def admit(self, deadline_seconds=None):
+        """
+        Wait for a generation slot and return it (use as a context manager).
+        Raises LLMOverloaded if the request should be answered another way.
+        """
+        now = time.monotonic()
+        deadline = None if deadline_seconds is None else now + deadline_seconds
+        with self._cond:
+            if self._active < self.max_concurrent and not self._waiting:
+                return self._grant(deadline, now)
+
+            if len(self._waiting) >= self.max_queue:
+                self.shed["queue_full"] += 1
+                raise LLMOverloaded("queue_full", f"{len(self._waiting)} requests already waiting for the LLM")
+
+            if deadline is not None:
+                expected = self.expected_wait(len(self._waiting) + 1) + self.expected_seconds
+                if expected > deadline_seconds:
+                    self.shed["deadline"] += 1
+                    raise LLMOverloaded(
+                        "deadline", f"expected {expected:.0f}s for the LLM, deadline is {deadline_seconds:.0f}s"
+                    )
+
+            ticket = object()
+            self._waiting.append(ticket)
+            self.peak_waiting = max(self.peak_waiting, len(self._waiting))
+            try:
+                while not (self._waiting[0] is ticket and self._active < self.max_concurrent):
+                    # Stop waiting once a typical generation would no longer fit
+                    if deadline is not None:
+                        left = deadline - self.expected_seconds - time.monotonic()
+                        if left <= 0:
+                            self.shed["timeout"] += 1
+                            raise LLMOverloaded("timeout", "no LLM slot freed up before the deadline")
+                        self._cond.wait(left)
+                    else:
+                        self._cond.wait()
+            finally:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+            return self._grant(deadline, now)
+
+    def admit_when_idle(self, wait_seconds, deadline_seconds=None):
+        """
+        Low-priority admit(): wait up to wait_seconds until no generation is
+        running and no caller is waiting, then take a slot whose deadline is
+        deadline_seconds from now. Live callers arriving meanwhile go first.
+        Raises LLMOverloaded("busy") if the LLM did not become idle in time.
+        """
+        now = time.monotonic()
+        give_up = now + wait_seconds
+        with self._cond:
+            while self._active or self._waiting:
+                left = give_up - time.monotonic()
+                if left <= 0:
+                    self.shed["busy"] += 1
+                    raise LLMOverloaded("busy", f"LLM not idle within {wait_seconds:.0f}s")
+                self._cond.wait(left)
+            deadline = None if deadline_seconds is None else time.monotonic() + deadline_seconds
+            return self._grant(deadline, now)
+
+    def expected_wait(self, position):
+        """Rough seconds until the caller at 1-based queue position gets a slot."""
+        rounds = math.ceil(position / self.max_concurrent)
+        return rounds * self.expected_seconds
+
+    def stats(self):
+        with self._cond:
+            elapsed = max(time.monotonic() - self._started_at, 1e-9)
+            waits = sorted(self._queue_wait_ms)
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "waiting": len(self._waiting),
+                "peak_waiting": self.peak_waiting,
+                "utilization": round(self._active / self.max_concurrent, 3),
+                "busy_ratio": round(self._busy_seconds / (elapsed * self.max_concurrent), 3),
+                "admitted": self.admitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "shed": dict(self.shed),
+                "expected_generation_seconds": round(self.expected_seconds, 2),
+                "avg_queue_wait_ms": round(sum(waits) / len(waits), 1) if waits else None,
+            }
+
+    # -----------------------------
+    # INTERNALS
+    # -----------------------------
+    def _grant(self, deadline, requested_at):
+        """Take a slot (caller holds the lock)."""
+        self._active += 1
+        self.admitted += 1
+        self._queue_wait_ms.append((time.monotonic() - requested_at) * 1000)
+        return _Slot(self, deadline)
+
+    def _release(self, duration, ok):
+        with self._cond:
+            self._active -= 1
+            if ok is None:
+                self._cond.notify_all()
+                return
+            self._busy_seconds += duration
+            if ok:
+                self.completed += 1
+                self.expected_seconds += self.EWMA_ALPHA * (duration - self.expected_seconds)
+            else:
+                self.failed += 1
+            self._cond.notify_all()
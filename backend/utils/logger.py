@@ -1,19 +1,32 @@
 # backend/utils/logger.py
-import pandas as pd
 import os
+import threading
+
+import pandas as pd
 
+from backend.utils.weather_store import weather_store
 
-def log_weather_data(weather, filepath="data/weather_data.csv"):
-    """Append a single weather record to CSV."""
+_csv_lock = threading.Lock()
+
+
+def log_weather_data(weather, filepath=None):
+    """
+    Record a single weather observation.
+    By default it goes to the buffered, partitioned weather store; pass a
+    filepath to append straight to that CSV file instead (legacy layout).
+    """
     if weather is None:
         return False
 
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    if filepath is None:
+        return weather_store.append(weather)
+
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
 
     df = pd.DataFrame([weather])
-    if not os.path.exists(filepath):
-        df.to_csv(filepath, index=False)
-    else:
-        df.to_csv(filepath, mode="a", header=False, index=False)
+    with _csv_lock:
+        df.to_csv(filepath, mode="a", header=not os.path.exists(filepath), index=False)
 
     return True
@@ -0,0 +1,223 @@
+"""
+message_splitter.py
+Split long WhatsApp replies into the minimum number of parts that are
+guaranteed to fit Twilio's 1600-unit limit, measured the way the carrier
+counts them:
+  - GSM-7 text: 1 septet per character, 2 for the extension table (€, [, ] ...)
+  - anything else (UCS-2): UTF-16 code units, so emoji outside the BMP cost 2
+The "(Part i/N)" label is included in each part's budget. Cuts prefer
+paragraph, then line, then sentence, then word boundaries and never split a
+grapheme (emoji ZWJ sequences, skin tones, combining marks, flags).
+"""
+
+import bisect
+import re
+import unicodedata
+
+TWILIO_MAX_LEN = 1600
+MAX_PARTS = 5
+ELLIPSIS = "..."
+
+GSM7_BASIC = set(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENDED = set("^{}\\[~]|€\f")
+
+ZWJ = "\u200d"
+# A boundary preference only wins if it keeps at least this share of the part full
+MIN_FILL_RATIO = 0.5
+
+_SENTENCE_END = re.compile(r"[.!?…][\"')\]]*$")
+
+
+# -----------------------------
+# ENCODED LENGTH
+# -----------------------------
+def is_gsm7(text):
+    return all(c in GSM7_BASIC or c in GSM7_EXTENDED for c in text)
+
+
+def encoded_length(text):
+    """Length of a single message body as counted against the limit."""
+    if is_gsm7(text):
+        return sum(2 if c in GSM7_EXTENDED else 1 for c in text)
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _char_costs(text):
+    """
+    Per-character costs that upper-bound encoded_length of any substring:
+    exact for all-GSM-7 text; for mixed text a GSM extension character is
+    charged 2 in case its part ends up GSM-7 encoded.
+    """
+    if is_gsm7(text):
+        return [2 if c in GSM7_EXTENDED else 1 for c in text]
+    return [2 if (c in GSM7_EXTENDED or ord(c) > 0xFFFF) else 1 for c in text]
+
+
+# -----------------------------
+# GRAPHEME SAFETY
+# -----------------------------
+def _is_extender(c):
+    """Characters that attach to the previous one and must not start a part."""
+    cp = ord(c)
+    return (
+        c == ZWJ
+        or unicodedata.combining(c) != 0
+        or 0xFE00 <= cp <= 0xFE0F          # variation selectors
+        or 0x1F3FB <= cp <= 0x1F3FF        # skin tone modifiers
+        or 0xE0020 <= cp <= 0xE007F        # tag characters (subdivision flags)
+        or unicodedata.category(c) in ("Mn", "Me")
+    )
+
+
+def _is_regional_indicator(c):
+    return 0x1F1E6 <= ord(c) <= 0x1F1FF
+
+
+def safe_cut(text, pos, floor=0):
+    """Move a cut position left until it does not fall inside a grapheme."""
+    while pos > floor and pos < len(text):
+        if _is_extender(text[pos]) or text[pos - 1] == ZWJ:
+            pos -= 1
+            continue
+        if _is_regional_indicator(text[pos]) and _is_regional_indicator(text[pos - 1]):
+            # Flags are pairs: count the run to know whether pos splits one
+            run = 0
+            i = pos - 1
+            while i >= 0 and _is_regional_indicator(text[i]):
+                run += 1
+                i -= 1
+            if run % 2 == 1:
+                pos -= 1
+                continue
+        break
+    return pos
+
+
+# -----------------------------
+# SPLITTER
+# -----------------------------
+def part_label(index, total):
+    return f"(Part {index}/{total})\n"
+
+
+class _Splitter:
+    def __init__(self, text):
+        self.text = text
+        costs = _char_costs(text)
+        self.prefix = [0]
+        for cost in costs:
+            self.prefix.append(self.prefix[-1] + cost)
+
+        # Boundaries are positions where a token starts right after whitespace.
+        # Each list holds (start_of_next_part, end_of_current_part_without_ws).
+        levels = {"paragraph": [], "line": [], "sentence": [], "word": []}
+        for match in re.finditer(r"\s+", text):
+            start, end = match.span()
+            if start == 0 or end == len(text):
+                continue
+            gap = match.group()
+            entry = (end, start)
+            levels["word"].append(entry)
+            if gap.count("\n") >= 2:
+                levels["paragraph"].append(entry)
+            if "\n" in gap:
+                levels["line"].append(entry)
+            if _SENTENCE_END.search(text[max(0, start - 4):start]):
+                levels["sentence"].append(entry)
+        self.levels = [levels[name] for name in ("paragraph", "line", "sentence", "word")]
+        # Part-end costs per level for bisecting: prefix[end_of_part]
+        self.level_end_costs = [[self.prefix[e] for _, e in entries] for entries in self.levels]
+
+    def cost(self, start, end):
+        return self.prefix[end] - self.prefix[start]
+
+    def skip_ws(self, pos):
+        while pos < len(self.text) and self.text[pos].isspace():
+            pos += 1
+        return pos
+
+    def _last_fitting(self, level, pos, budget):
+        """Last boundary of a level whose part [pos, end) fits the budget, or None."""
+        entries = self.levels[level]
+        limit = self.prefix[pos] + budget
+        i = bisect.bisect_right(self.level_end_costs[level], limit) - 1
+        if i >= 0 and entries[i][1] > pos:
+            return entries[i]
+        return None
+
+    def _hard_cut(self, pos, budget):
+        """Largest grapheme-safe end position within budget (for giant tokens)."""
+        end = bisect.bisect_right(self.prefix, self.prefix[pos] + budget) - 1
+        end = safe_cut(self.text, end, floor=pos + 1)
+        return (end, end)
+
+    def _next_cut(self, pos, budget, preferred=True, remaining=None):
+        """Choose where the part starting at pos ends."""
+        n = len(self.text)
+        if self.cost(pos, n) <= budget:
+            return (n, len(self.text.rstrip()))
+
+        word = self._last_fitting(3, pos, budget)
+        if preferred and word is not None:
+            min_end = pos + (word[1] - pos) * MIN_FILL_RATIO
+            for level in range(3):
+                candidate = self._last_fitting(level, pos, budget)
+                if candidate is None or candidate[1] < min_end:
+                    continue
+                if remaining is None or self.fits(candidate[0], remaining):
+                    return candidate
+        return word if word is not None else self._hard_cut(pos, budget)
+
+    def fits(self, pos, budgets):
+        """Can text[pos:] be packed greedily (word level) into the given budgets?"""
+        pos = self.skip_ws(pos)
+        for budget in budgets:
+            if pos >= len(self.text):
+                return True
+            nxt, _ = self._next_cut(pos, budget, preferred=False)
+            pos = self.skip_ws(nxt)
+        return pos >= len(self.text)
+
+    def spans(self, budgets):
+        """Greedy split into len(budgets) parts; returns (spans, consumed_everything)."""
+        pos = self.skip_ws(0)
+        result = []
+        for k, budget in enumerate(budgets):
+            if pos >= len(self.text):
+                break
+            nxt, end = self._next_cut(pos, budget, remaining=budgets[k + 1:])
+            result.append((pos, end))
+            pos = self.skip_ws(nxt)
+        return result, pos >= len(self.text)
+
+
+def split_message(text, max_len=TWILIO_MAX_LEN, max_parts=MAX_PARTS, ellipsis=ELLIPSIS):
+    """
+    Split text into at most max_parts labelled parts, each within max_len
+    encoded units including its "(Part i/N)" label. Uses the fewest parts
+    possible; text that cannot fit in max_parts is truncated with an ellipsis
+    at a word boundary.
+    """
+    text = text.strip()
+    if encoded_length(text) <= max_len:
+        return [text]
+
+    splitter = _Splitter(text)
+    for total in range(2, max_parts + 1):
+        budgets = [max_len - len(part_label(i, total)) for i in range(1, total + 1)]
+        if not splitter.fits(0, budgets):
+            continue
+        spans, done = splitter.spans(budgets)
+        if done:
+            return [part_label(i, len(spans)) + text[s:e] for i, (s, e) in enumerate(spans, 1)]
+
+    # Too long even for max_parts: keep what fits and mark the cut
+    budgets = [max_len - len(part_label(i, max_parts)) for i in range(1, max_parts + 1)]
+    budgets[-1] -= len(ellipsis)
+    spans, _ = splitter.spans(budgets)
+    parts = [text[s:e] for s, e in spans]
+    parts[-1] = parts[-1] + ellipsis
+    return [part_label(i, len(parts)) + part for i, part in enumerate(parts, 1)]
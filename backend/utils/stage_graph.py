@@ -0,0 +1,171 @@
+"""
+stage_graph.py
+Tiny dependency graph runner for request pipelines.
+Independent stages run concurrently on a thread pool; each stage has its own
+timeout and a fallback value used when it fails or times out, so dependent
+stages still get a (partial) input. Per-stage wall-clock timings are recorded
+for the response / Server-Timing header.
+- A stage's timeout counts from when its function starts running, not from
+  when it was queued on the pool.
+- Long stages can run inline, on the caller's thread, so they never hold
+  a pool worker that the short stages of other requests need.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+class _Stage:
+    def __init__(self, name, fn, deps, timeout, fallback, inline):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.fallback = fallback
+        self.inline = inline
+
+
+class StageGraph:
+    """
+    Usage:
+        graph = StageGraph(executor)
+        graph.add("disease", lambda r: predict(...), timeout=30, fallback={...})
+        graph.add("weather", lambda r: fetch(...), timeout=10)
+        graph.add("advice", lambda r: advise(r["disease"], r["weather"]),
+                  deps=("disease", "weather"), timeout=120)
+        results, timings = graph.run()
+    Each stage function receives the dict of results produced so far.
+    A fallback may be a value or a callable taking the exception.
+    inline=True runs the stage on the caller's thread once nothing else is
+    running; the graph cannot interrupt it, so its timeout is only reported
+    (status "timeout") and the function must bound its own duration.
+    """
+
+    POLL_SECONDS = 0.05  # how often queued stages are checked for having started
+
+    def __init__(self, executor):
+        self.executor = executor
+        self._stages = {}
+
+    def add(self, name, fn, deps=(), timeout=None, fallback=None, inline=False):
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self._stages[name] = _Stage(name, fn, deps, timeout, fallback, inline)
+        return self
+
+    @staticmethod
+    def _fallback_value(stage, error):
+        if callable(stage.fallback):
+            return stage.fallback(error)
+        return stage.fallback
+
+    def run(self):
+        """Execute all stages. Returns (results, timings)."""
+        results, timings = {}, {}
+        for _ in self.iter_run(results, timings):
+            pass
+        return results, timings
+
+    def iter_run(self, results, timings):
+        """
+        Execute all stages, yielding each stage name as soon as it finishes
+        (so callers can stream partial results). results and timings are
+        filled in place; timings["total_ms"] is set once everything is done.
+        """
+        t0 = time.perf_counter()
+        done = set()
+        running = {}   # future -> stage
+        started = {}   # stage name -> when its function started running
+
+        def call(stage, snapshot):
+            started[stage.name] = time.perf_counter()
+            return stage.fn(snapshot)
+
+        def ready():
+            busy = set(running.values())
+            return [
+                stage for stage in self._stages.values()
+                if stage.name not in done and stage not in busy and all(dep in done for dep in stage.deps)
+            ]
+
+        def launch_ready():
+            for stage in ready():
+                if not stage.inline:
+                    running[self.executor.submit(call, stage, dict(results))] = stage
+
+        def finish(stage, value, status, error=None):
+            began = started.setdefault(stage.name, time.perf_counter())
+            results[stage.name] = value
+            timings[stage.name] = {
+                "start_ms": round((began - t0) * 1000, 1),
+                "duration_ms": round((time.perf_counter() - began) * 1000, 1),
+                "status": status,
+            }
+            if error is not None:
+                timings[stage.name]["error"] = str(error)
+            done.add(stage.name)
+
+        launch_ready()
+        while True:
+            if not running:
+                inline = ready()
+                if not inline:
+                    break
+                stage = inline[0]
+                try:
+                    value = call(stage, dict(results))
+                except Exception as e:
+                    print(f"⚠️ Stage '{stage.name}' failed: {e}")
+                    finish(stage, self._fallback_value(stage, e), "error", e)
+                else:
+                    late = stage.timeout is not None and time.perf_counter() - started[stage.name] > stage.timeout
+                    finish(stage, value, "timeout" if late else "ok")
+                yield stage.name
+                launch_ready()
+                continue
+
+            now = time.perf_counter()
+            deadlines = [
+                started[stage.name] + stage.timeout - now
+                for stage in running.values() if stage.timeout is not None and stage.name in started
+            ]
+            if any(stage.timeout is not None and stage.name not in started for stage in running.values()):
+                # Still queued: check again soon, its clock starts when it runs
+                deadlines.append(self.POLL_SECONDS)
+            wait_for = max(0.0, min(deadlines)) if deadlines else None
+            completed, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in completed:
+                stage = running.pop(future)
+                try:
+                    finish(stage, future.result(), "ok")
+                except Exception as e:
+                    print(f"⚠️ Stage '{stage.name}' failed: {e}")
+                    finish(stage, self._fallback_value(stage, e), "error", e)
+                yield stage.name
+
+            # Give up on stages past their own deadline (the worker finishes in the background)
+            now = time.perf_counter()
+            for future, stage in list(running.items()):
+                began = started.get(stage.name)
+                if stage.timeout is not None and began is not None and now - began >= stage.timeout:
+                    running.pop(future)
+                    error = TimeoutError(f"stage '{stage.name}' exceeded {stage.timeout}s")
+                    print(f"⏱️ {error}")
+                    finish(stage, self._fallback_value(stage, error), "timeout", error)
+                    yield stage.name
+
+            launch_ready()
+
+        timings["total_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+
+
+def server_timing_header(timings):
+    """Format stage timings as an HTTP Server-Timing header value."""
+    parts = [
+        f"{name};dur={info['duration_ms']}"
+        for name, info in timings.items() if isinstance(info, dict)
+    ]
+    parts.append(f"total;dur={timings.get('total_ms', 0)}")
+    return ", ".join(parts)
@@ -0,0 +1,143 @@
+"""
+treatment_index.py
+Process-wide index of disease treatment info (disease_treatments.json).
+The file is parsed once and kept in memory. Lookups check at most every
+check_seconds whether the file changed (a cheap os.stat: mtime + size); only
+then is it read and hashed, and only a different SHA-256 is re-parsed and
+swapped in atomically. Keys are normalized the same way as the CNN's label
+encoder keys, so "Maize___Blight", "maize_blight" and "Maize Blight" match.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+
+def normalize_label(label):
+    """Canonical form of a disease label: lowercase words joined by single underscores."""
+    return re.sub(r"[^0-9a-z]+", "_", str(label or "").lower()).strip("_")
+
+
+class TreatmentIndex:
+    """
+    get(label, default) -> treatment info for a label-encoder key.
+    - check_seconds: minimum interval between change checks on lookups
+    - load(labels=None): force a (re)load now; pass the label encoder keys to
+      log which classes have no treatment entry (e.g. as a model preload)
+    """
+
+    def __init__(self, path, check_seconds=30.0, name="treatment_index"):
+        self.path = path
+        self.check_seconds = float(check_seconds)
+        self.name = name
+
+        self._entries = {}          # normalized label -> info (replaced, never mutated)
+        self._signature = None      # (mtime_ns, size) of the loaded file
+        self._sha256 = None
+        self._checked_at = None
+        self._missing = False       # file absent at the last check
+        self._labels = None
+        self._lock = threading.Lock()
+
+        self.loads = 0
+        self.checks = 0
+        self.errors = 0
+        self.loaded_at = None
+
+    # -----------------------------
+    # PUBLIC API
+    # -----------------------------
+    def get(self, label, default=None):
+        self._maybe_reload()
+        return self._entries.get(normalize_label(label), default)
+
+    def load(self, labels=None):
+        """(Re)load the file now. Returns the number of entries."""
+        with self._lock:
+            if labels is not None:
+                self._labels = [str(label) for label in labels]
+            self._reload(force=True)
+            self._report_coverage()
+            return len(self._entries)
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "entries": len(self._entries),
+            "sha256": self._sha256[:12] if self._sha256 else None,
+            "loads": self.loads,
+            "checks": self.checks,
+            "errors": self.errors,
+            "loaded_at": self.loaded_at,
+            "missing_labels": self._missing_labels(),
+        }
+
+    # -----------------------------
+    # INTERNALS
+    # -----------------------------
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_seconds:
+            return
+        # Only one thread checks; the others keep using the current entries
+        if not self._lock.acquire(blocking=self._checked_at is None):
+            return
+        try:
+            if self._checked_at is None or now - self._checked_at >= self.check_seconds:
+                self._reload()
+        finally:
+            self._lock.release()
+
+    def _reload(self, force=False):
+        """Caller holds the lock."""
+        self._checked_at = time.monotonic()
+        self.checks += 1
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            if not self._missing:
+                print(f"⚠️ Warning: {os.path.basename(self.path)} not found. Proceeding without advisory info.")
+            self._entries, self._signature, self._sha256 = {}, None, None
+            self._missing = True
+            return
+
+        self._missing = False
+        signature = (st.st_mtime_ns, st.st_size)
+        if not force and signature == self._signature:
+            return
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            digest = hashlib.sha256(raw).hexdigest()
+            if not force and digest == self._sha256:
+                # Touched but not changed: nothing to re-parse
+                self._signature = signature
+                return
+            data = json.loads(raw.decode("utf-8"))
+            if not isinstance(data, dict):
+                raise ValueError("expected a JSON object of label -> treatment")
+        except (OSError, ValueError) as e:
+            self.errors += 1
+            self._signature = signature
+            print(f"❌ [{self.name}] could not load {self.path}: {e}. Keeping previous entries.")
+            return
+
+        self._entries = {normalize_label(label): info for label, info in data.items()}
+        self._signature = signature
+        self._sha256 = digest
+        self.loads += 1
+        self.loaded_at = time.time()
+        print(f"📖 [{self.name}] loaded {len(self._entries)} treatment entries")
+
+    def _missing_labels(self):
+        if self._labels is None:
+            return None
+        return [label for label in self._labels if normalize_label(label) not in self._entries]
+
+    def _report_coverage(self):
+        missing = self._missing_labels()
+        if missing:
+            print(f"⚠️ [{self.name}] no treatment info for: {', '.join(missing)}")
@@ -0,0 +1,327 @@
+"""
+twilio_dispatcher.py
+Rate-limited, non-blocking outbound message dispatcher for Twilio.
+- send(to, parts) queues the parts and returns immediately.
+- A global token bucket caps account-wide messages/second; a per-recipient
+  bucket spaces out parts going to the same farmer.
+- Parts for one recipient are delivered strictly in order (one in flight
+  per recipient); different recipients are served concurrently.
+- 429 responses are rescheduled with exponential backoff instead of
+  sleeping inside a worker thread.
+- send_and_wait() / deliver() block until Twilio accepted every part, for
+  callers that must not report success before the reply actually left
+  (e.g. durable jobs). on_sent(index) reports each accepted part, so a
+  retrying caller can skip parts that already went out.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from twilio.base.exceptions import TwilioRestException
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, at most `capacity` stored."""
+
+    def __init__(self, rate, capacity, now=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until one token is available (0 if available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+
+class _Message:
+    """One logical message (list of parts) queued for a recipient."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, to, parts, on_failure, on_sent=None):
+        self.id = next(self._ids)
+        self.to = to
+        self.parts = deque(parts)
+        self.total = len(parts)
+        self.on_failure = on_failure
+        self.on_sent = on_sent
+        self.attempts = 0
+        self.done = threading.Event()
+        self.delivered = False
+
+    @property
+    def sent(self):
+        return self.total - len(self.parts)
+
+
+class _Recipient:
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.messages = deque()
+        self.in_flight = False
+        self.not_before = 0.0   # retry-after for 429s
+
+
+class OutboundDispatcher:
+    """
+    client:       a twilio Client (or anything with .messages.create(from_, to, body))
+    global_rate:  account-wide messages per second (burst = global_burst)
+    recipient_rate / recipient_burst: per-recipient spacing
+    send_workers: threads performing the HTTP calls
+    """
+
+    MAX_IDLE_RECIPIENTS = 1000
+
+    def __init__(self, client, from_number, global_rate=10.0, global_burst=10,
+                 recipient_rate=1.0, recipient_burst=1, send_workers=4,
+                 max_retries=4, retry_base_seconds=2.0):
+        self.client = client
+        self.from_number = from_number
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.recipient_rate = float(recipient_rate)
+        self.recipient_burst = recipient_burst
+        self.max_retries = int(max_retries)
+        self.retry_base_seconds = float(retry_base_seconds)
+
+        self._recipients = {}
+        self._ready = deque()          # recipients that may be sendable now (round robin)
+        self._timers = []              # heap of (time, seq, recipient key) for retries
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=send_workers, thread_name_prefix="twilio-send")
+        self._thread = None
+
+        self.sent = 0
+        self.retries = 0
+        self.failed_messages = 0
+        self.throttled = 0
+        self._send_latency_ms = deque(maxlen=500)
+
+    # -----------------------------
+    # PUBLIC API
+    # -----------------------------
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="twilio-dispatcher", daemon=True)
+                self._thread.start()
+
+    def send(self, to, parts, on_failure=None):
+        """
+        Queue message parts for `to` and return immediately.
+        on_failure(to, reason) is called (on a dispatcher thread) if the
+        message is abandoned; remaining parts of that message are dropped.
+        Returns the queued message id.
+        """
+        return self._enqueue(to, parts, on_failure).id
+
+    def send_and_wait(self, to, parts, timeout=None, on_failure=None):
+        """
+        Queue message parts like send(), then block until Twilio accepted all
+        of them. Returns True if delivered, False if the message was abandoned
+        or not finished within timeout seconds (its remaining parts may still go out).
+        """
+        return self.deliver(to, parts, timeout, on_failure) == "delivered"
+
+    def deliver(self, to, parts, timeout=None, on_failure=None, on_sent=None):
+        """
+        send_and_wait() with the outcome spelled out:
+          "delivered" every part was accepted,
+          "queued"    not finished within timeout, the rest is still being sent,
+          "partial"   abandoned after some parts were accepted,
+          "failed"    abandoned before any part was accepted.
+        on_sent(index) is called (on a dispatcher thread) for every accepted part.
+        """
+        message = self._enqueue(to, parts, on_failure, on_sent)
+        if not message.done.wait(timeout):
+            return "queued"
+        if message.delivered:
+            return "delivered"
+        return "partial" if message.sent else "failed"
+
+    def _enqueue(self, to, parts, on_failure, on_sent=None):
+        self.start()
+        message = _Message(to, list(parts), on_failure, on_sent)
+        if not message.parts:
+            message.delivered = True
+            message.done.set()
+            return message
+        with self._cond:
+            if len(self._recipients) > self.MAX_IDLE_RECIPIENTS:
+                self._prune_idle(time.monotonic())
+            recipient = self._recipients.get(to)
+            if recipient is None:
+                recipient = _Recipient(TokenBucket(self.recipient_rate, self.recipient_burst))
+                self._recipients[to] = recipient
+            recipient.messages.append(message)
+            self._ready.append(to)
+            self._cond.notify_all()
+        return message
+
+    def _prune_idle(self, now):
+        """Forget recipients with nothing queued whose bucket has fully refilled."""
+        for key, recipient in list(self._recipients.items()):
+            if recipient.messages or recipient.in_flight or recipient.not_before > now:
+                continue
+            recipient.bucket.wait_time(now)
+            if recipient.bucket.tokens >= recipient.bucket.capacity:
+                del self._recipients[key]
+
+    def flush(self, timeout=None):
+        """Block until every queued part was sent or abandoned (for tests/benchmarks)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while any(r.messages or r.in_flight for r in self._recipients.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else 0.1)
+        return True
+
+    def stats(self):
+        with self._cond:
+            queued_parts = sum(len(m.parts) for r in self._recipients.values() for m in r.messages)
+            latencies = sorted(self._send_latency_ms)
+            return {
+                "queued_parts": queued_parts,
+                "active_recipients": sum(1 for r in self._recipients.values() if r.messages),
+                "in_flight": sum(1 for r in self._recipients.values() if r.in_flight),
+                "sent": self.sent,
+                "retries_429": self.retries,
+                "failed_messages": self.failed_messages,
+                "throttled_waits": self.throttled,
+                "global_rate": self.global_bucket.rate,
+                "recipient_rate": self.recipient_rate,
+                "avg_send_ms": round(sum(latencies) / len(latencies), 1) if latencies else None,
+            }
+
+    # -----------------------------
+    # SCHEDULER
+    # -----------------------------
+    def _loop(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+
+                # Recipients whose 429 backoff expired become ready again
+                while self._timers and self._timers[0][0] <= now:
+                    _, _, key = heapq.heappop(self._timers)
+                    self._ready.append(key)
+
+                wait = self._dispatch_ready(now)
+
+                if self._timers:
+                    timer_wait = self._timers[0][0] - now
+                    wait = timer_wait if wait is None else min(wait, timer_wait)
+                self._cond.wait(timeout=wait)
+
+    def _dispatch_ready(self, now):
+        """Start sends for ready recipients; returns seconds until a token frees up (or None)."""
+        wait = None
+        deferred = []
+        while self._ready:
+            key = self._ready.popleft()
+            recipient = self._recipients.get(key)
+            if recipient is None or recipient.in_flight or not recipient.messages:
+                continue
+            if recipient.not_before > now:
+                continue  # a retry timer will re-queue it
+
+            token_wait = max(self.global_bucket.wait_time(now), recipient.bucket.wait_time(now))
+            if token_wait > 0:
+                self.throttled += 1
+                deferred.append(key)
+                wait = token_wait if wait is None else min(wait, token_wait)
+                continue
+
+            self.global_bucket.take(now)
+            recipient.bucket.take(now)
+            recipient.in_flight = True
+            message = recipient.messages[0]
+            body = message.parts[0]
+            self._executor.submit(self._send_part, key, message, body)
+
+        # Keep dedup cheap: a recipient only needs one ready entry
+        self._ready.extend(dict.fromkeys(deferred))
+        return wait
+
+    def _send_part(self, key, message, body):
+        started = time.monotonic()
+        error = None
+        try:
+            self.client.messages.create(from_=self.from_number, to=key, body=body)
+        except TwilioRestException as e:
+            error = e
+        except Exception as e:
+            error = e
+        elapsed_ms = (time.monotonic() - started) * 1000
+
+        failure = None
+        sent_index = None
+        with self._cond:
+            recipient = self._recipients[key]
+            recipient.in_flight = False
+            self._send_latency_ms.append(elapsed_ms)
+
+            if error is None:
+                self.sent += 1
+                sent_index = message.sent
+                message.parts.popleft()
+                message.attempts = 0
+                print(f"[Twilio] Sent part {message.total - len(message.parts)}/{message.total} "
+                      f"to {key} ({len(body)} chars)")
+                if not message.parts:
+                    recipient.messages.popleft()
+                    message.delivered = True
+                self._ready.append(key)
+
+            elif getattr(error, "status", None) == 429 and message.attempts < self.max_retries:
+                # Reschedule instead of sleeping: other recipients keep flowing
+                delay = self.retry_base_seconds * (2 ** message.attempts)
+                message.attempts += 1
+                self.retries += 1
+                recipient.not_before = time.monotonic() + delay
+                heapq.heappush(self._timers, (recipient.not_before, next(self._seq), key))
+                print(f"[Twilio] 429 for {key} — retrying in {delay:.1f}s "
+                      f"(attempt {message.attempts}/{self.max_retries})")
+
+            else:
+                print(f"[Twilio][Error] Giving up on message to {key}: {error}")
+                recipient.messages.popleft()
+                self.failed_messages += 1
+                failure = message
+                self._ready.append(key)
+
+            self._cond.notify_all()
+
+        if sent_index is not None and message.on_sent is not None:
+            try:
+                message.on_sent(sent_index)
+            except Exception as e:
+                print(f"[Twilio] on_sent callback raised: {e}")
+        if message.delivered:
+            message.done.set()
+        if failure is not None:
+            if failure.on_failure is not None:
+                try:
+                    failure.on_failure(key, str(error))
+                except Exception as e:
+                    print(f"[Twilio] on_failure callback raised: {e}")
+            failure.done.set()
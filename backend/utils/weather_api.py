@@ -1,58 +1,186 @@
 # backend/utils/weather_api.py
-import requests
 import os
-from datetime import datetime
+import threading
+from datetime import datetime, timezone
+from backend.utils.cache import TTLCache
+from backend.utils.geocode_cache import GeocodeCache
+from backend.utils.http_client import http
+from backend.utils.logger import log_weather_data
+from backend.utils.weather_store import weather_store, city_slug
 
 
 API_KEY = os.getenv("OPENWEATHER_API_KEY")
 
+# Shared current-weather cache: one upstream call per city per TTL, concurrent
+# misses coalesced, stale data served while a background refresh runs.
+WEATHER_CACHE_TTL_SECONDS = float(os.getenv("WEATHER_CACHE_TTL_SECONDS", 600))
+WEATHER_CACHE_STALE_SECONDS = float(os.getenv("WEATHER_CACHE_STALE_SECONDS", 300))  # 0 disables
+weather_cache = TTLCache(
+    "weather",
+    ttl_seconds=WEATHER_CACHE_TTL_SECONDS,
+    stale_ttl_seconds=WEATHER_CACHE_STALE_SECONDS,
+)
 
-def get_weather(city="Bamenda", country="CM"):
-    """Fetch current weather data for a given city."""
-    base_url = "https://api.openweathermap.org/data/2.5/weather"
-    params = {
-        "q": f"{city},{country}",
-        "appid": API_KEY,
-        "units": "metric"
+
+# Every fresh /weather response (never a cache hit) is logged to the weather
+# store for forecasting, once per (city, observation time)
+WEATHER_LOG_OBSERVATIONS = os.getenv("WEATHER_LOG_OBSERVATIONS", "1").lower() in ("1", "true", "yes")
+_last_logged = {}     # city slug -> date of the last logged observation
+_last_logged_lock = threading.Lock()
+
+
+# Geocode cache: city coordinates persisted in SQLite, seeded with the
+# Cameroon localities we serve, so forecasts skip the /weather lookup
+GEOCODE_CACHE_DB = os.getenv("GEOCODE_CACHE_DB", "data/geocode_cache.sqlite3")
+GEOCODE_SEED_PATH = os.getenv(
+    "GEOCODE_SEED_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cameroon_localities.json"),
+)
+
+# One Call daily forecasts, cached per (lat, lon, UTC day)
+ONECALL_CACHE_TTL_SECONDS = float(os.getenv("ONECALL_CACHE_TTL_SECONDS", 3 * 3600))
+onecall_cache = TTLCache("onecall_daily", ttl_seconds=ONECALL_CACHE_TTL_SECONDS, max_entries=512)
+
+
+def _geocode_upstream(city, country):
+    """OpenWeather geocoding API: first match for a city, as (lat, lon), or None."""
+    response = http.get(
+        "https://api.openweathermap.org/geo/1.0/direct",
+        params={"q": f"{city},{country}", "limit": 1, "appid": API_KEY},
+        timeout=10
+    )
+    response.raise_for_status()
+    matches = response.json()
+    if not matches:
+        return None
+    return matches[0]["lat"], matches[0]["lon"]
+
+
+geocode_cache = GeocodeCache(GEOCODE_CACHE_DB, seed_path=GEOCODE_SEED_PATH, resolver=_geocode_upstream)
+
+
+def normalize_location(city, country="CM"):
+    """Cache key for a (city, country) pair: ' bamenda ', 'cm' -> ('bamenda', 'CM')."""
+    return (" ".join(str(city).split()).lower(), str(country).strip().upper())
+
+
+def weather_record(city, data):
+    """A /weather payload as a weather store row, dated by its observation time (dt)."""
+    observed = data.get("dt")
+    if observed is not None:
+        date = datetime.fromtimestamp(observed, timezone.utc)
+    else:
+        date = datetime.now(timezone.utc)
+    return {
+        "date": date.strftime("%Y-%m-%d %H:%M:%S"),
+        "city": city,
+        "temp": data["main"]["temp"],
+        "humidity": data["main"]["humidity"],
+        "pressure": data["main"]["pressure"],
+        "wind_speed": data["wind"]["speed"],
+        "condition": data["weather"][0]["main"]
     }
 
-    try:
-        response = requests.get(base_url, params=params, timeout=10)
+
+def log_observation(city, data):
+    """
+    Log a freshly fetched /weather payload unless its observation was already
+    logged: OpenWeather updates a station every ~10 minutes, so back-to-back
+    fetches often return the same dt. Returns True if a row was logged.
+    """
+    record = weather_record(city, data)
+    slug = city_slug(city)
+    with _last_logged_lock:
+        last = _last_logged.get(slug)
+        if last is None:
+            # First observation since start-up: compare with what is already stored
+            last = weather_store.last_date(city)
+        if last is not None and record["date"] <= str(last):
+            _last_logged[slug] = str(last)
+            return False
+        _last_logged[slug] = record["date"]
+    return log_weather_data(record)
+
+
+def get_current_weather_raw(city="Bamenda", country="CM", force_refresh=False):
+    """
+    Raw OpenWeather /weather payload for a city, served from the shared cache.
+    force_refresh=True always calls upstream; the cached entry is replaced
+    only if that succeeds.
+    Raises requests exceptions (e.g. HTTPError) if the upstream call fails.
+    """
+    key = normalize_location(city, country)
+
+    def fetch():
+        response = http.get(
+            "https://api.openweathermap.org/data/2.5/weather",
+            params={"q": f"{key[0]},{key[1]}", "appid": API_KEY, "units": "metric"},
+            timeout=10
+        )
         response.raise_for_status()
         data = response.json()
+        # Free coordinates: remember them for forecasts
+        geocode_cache.learn(key[0], key[1], data.get("coord"))
+        if WEATHER_LOG_OBSERVATIONS:
+            try:
+                log_observation(city, data)
+            except Exception as e:
+                print("Error logging weather observation:", e)
+        return data
 
-        weather = {
-            "date": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
-            "city": city,
-            "temp": data["main"]["temp"],
-            "humidity": data["main"]["humidity"],
-            "pressure": data["main"]["pressure"],
-            "wind_speed": data["wind"]["speed"],
-            "condition": data["weather"][0]["main"]
-        }
-        return weather
+    if force_refresh:
+        return weather_cache.force_refresh(key, fetch)
+    return weather_cache.get_or_fetch(key, fetch)
+
+
+def get_weather(city="Bamenda", country="CM", force_refresh=False):
+    """Fetch current weather data for a given city."""
+    try:
+        data = get_current_weather_raw(city, country, force_refresh=force_refresh)
+        return weather_record(city, data)
     except Exception as e:
         print("Error fetching weather:", e)
         return None
+
+
+class ForecastUnavailable(Exception):
+    """One Call answered with a non-200 status (not cached)."""
+
+    def __init__(self, status_code):
+        super().__init__(f"One Call returned {status_code}")
+        self.status_code = status_code
+
+
 BASE_URL = "https://api.openweathermap.org/data/2.5"
 def get_forecast(city="Bamenda", country_code="CM", days=7):
     """
     Fetch 7-day weather forecast.
     Note: You must use the One Call API 3.0 for daily forecasts.
+    Coordinates come from the geocode cache, so this is a single upstream
+    call, and none at all while the day's forecast for the place is cached.
     """
-    # First, get lat/lon
-    geo_url = f"{BASE_URL}/weather?q={city},{country_code}&appid={API_KEY}"
-    geo_data = requests.get(geo_url).json()
-    lat, lon = geo_data["coord"]["lat"], geo_data["coord"]["lon"]
+    coords = geocode_cache.resolve(city, country_code)
+    if coords is None:
+        return {"error": f"Unknown location: {city}, {country_code}"}
+    lat, lon = coords
 
-    # Call One Call API for daily forecast
-    forecast_url = f"https://api.openweathermap.org/data/3.0/onecall?lat={lat}&lon={lon}&exclude=hourly,minutely&appid={API_KEY}&units=metric"
-    res = requests.get(forecast_url)
+    def fetch():
+        res = http.get(
+            "https://api.openweathermap.org/data/3.0/onecall",
+            params={"lat": lat, "lon": lon, "exclude": "current,hourly,minutely,alerts",
+                    "appid": API_KEY, "units": "metric"},
+            timeout=10
+        )
+        if res.status_code != 200:
+            raise ForecastUnavailable(res.status_code)
+        return res.json()["daily"]
 
-    if res.status_code != 200:
-        return {"error": f"Failed to fetch forecast: {res.status_code}"}
+    key = (lat, lon, datetime.now(timezone.utc).strftime("%Y-%m-%d"))
+    try:
+        daily = onecall_cache.get_or_fetch(key, fetch)
+    except ForecastUnavailable as e:
+        return {"error": f"Failed to fetch forecast: {e.status_code}"}
 
-    data = res.json()["daily"][:days]
     forecast = [
         {
             "date": day["dt"],
@@ -61,6 +189,7 @@ def get_forecast(city="Bamenda", country_code="CM", days=7):
             "humidity": day["humidity"],
             "weather": day["weather"][0]["description"],
         }
-        for day in data
+        for day in daily[:days]
     ]
     return forecast
+
@@ -0,0 +1,204 @@
+"""
+weather_prefetcher.py
+Background refresh of current weather and forecasts for the cities most of
+our farmers are in, so user requests are served from a warm weather cache
+instead of waiting on OpenWeather. Each refresh is a fresh upstream fetch,
+which weather_api logs to the weather store (once per observation), so
+forecasting history grows evenly per city. A failed refresh leaves the
+cached entry in place as the stale fallback.
+- Cycles run every WEATHER_PREFETCH_INTERVAL_SECONDS, +/- jitter so several
+  workers or restarts don't hit the API in lockstep.
+- The interval is stretched if the cities would use more than their share
+  of the daily /weather quota, forecasts are prefetched only every few cycles
+  if One Call's (much smaller) daily quota requires it, and calls within a
+  cycle are spaced to stay under the per-minute limit.
+"""
+
+import os
+import random
+import threading
+import time
+
+from backend.utils import weather_api
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+WEATHER_PREFETCH_CITIES = [
+    c.strip() for c in os.getenv(
+        "WEATHER_PREFETCH_CITIES", "Bamenda,Bafoussam,Buea,Douala,Yaoundé,Limbe,Kumba"
+    ).split(",") if c.strip()
+]
+WEATHER_PREFETCH_COUNTRY = os.getenv("WEATHER_PREFETCH_COUNTRY", "CM")
+WEATHER_PREFETCH_INTERVAL_SECONDS = float(
+    os.getenv("WEATHER_PREFETCH_INTERVAL_SECONDS", weather_api.WEATHER_CACHE_TTL_SECONDS)
+)
+WEATHER_PREFETCH_JITTER = float(os.getenv("WEATHER_PREFETCH_JITTER", 0.1))     # +/- fraction of the interval
+WEATHER_PREFETCH_FORECAST = os.getenv("WEATHER_PREFETCH_FORECAST", "1").lower() in ("1", "true", "yes")
+
+# OpenWeather quotas (free tier: 60/min and ~1M/month for /weather, 1000/day
+# for One Call 3.0) and the share of them prefetching may use
+OPENWEATHER_CALLS_PER_MINUTE = float(os.getenv("OPENWEATHER_CALLS_PER_MINUTE", 60))
+OPENWEATHER_CALLS_PER_DAY = float(os.getenv("OPENWEATHER_CALLS_PER_DAY", 30000))
+ONECALL_CALLS_PER_DAY = float(os.getenv("ONECALL_CALLS_PER_DAY", 1000))
+WEATHER_PREFETCH_QUOTA_SHARE = float(os.getenv("WEATHER_PREFETCH_QUOTA_SHARE", 0.5))
+
+
+class WeatherPrefetcher:
+    """
+    start()        run refresh cycles in a background thread (idempotent)
+    run_cycle()    refresh every city once (blocking)
+    stop()         end the background thread after the current call
+    """
+
+    def __init__(self, cities=WEATHER_PREFETCH_CITIES, country=WEATHER_PREFETCH_COUNTRY,
+                 interval_seconds=WEATHER_PREFETCH_INTERVAL_SECONDS, jitter=WEATHER_PREFETCH_JITTER,
+                 prefetch_forecast=WEATHER_PREFETCH_FORECAST,
+                 calls_per_minute=OPENWEATHER_CALLS_PER_MINUTE, calls_per_day=OPENWEATHER_CALLS_PER_DAY,
+                 onecall_calls_per_day=ONECALL_CALLS_PER_DAY, quota_share=WEATHER_PREFETCH_QUOTA_SHARE,
+                 forecast_ttl_seconds=None, get_weather=None, get_forecast=None):
+        self.cities = list(cities)
+        self.country = country
+        self.configured_interval = float(interval_seconds)
+        self.jitter = max(0.0, min(float(jitter), 0.9))
+        self.prefetch_forecast = prefetch_forecast
+        self.spacing_seconds = 60.0 / calls_per_minute if calls_per_minute > 0 else 0.0
+        self.daily_budget = calls_per_day * quota_share
+        self.onecall_daily_budget = onecall_calls_per_day * quota_share
+        self.forecast_ttl_seconds = float(
+            forecast_ttl_seconds if forecast_ttl_seconds is not None else weather_api.ONECALL_CACHE_TTL_SECONDS
+        )
+        # Looked up at call time by default so tests and reloads see the current functions
+        self._get_weather = get_weather
+        self._get_forecast = get_forecast
+
+        self.interval_seconds = self._quota_interval()
+        self.forecast_every = self._forecast_every()
+
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        self.cycles = 0
+        self.refreshed = 0
+        self.forecasts = 0
+        self.errors = 0
+        self.last_cycle_at = None
+        self.last_cycle_seconds = None
+        self.next_cycle_in = None
+
+    # -----------------------------
+    # PUBLIC API
+    # -----------------------------
+    def start(self):
+        with self._start_lock:
+            if not self.cities:
+                return
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name="weather-prefetcher", daemon=True)
+                self._thread.start()
+                print(f"🌦 Weather prefetch: {len(self.cities)} cities every ~{self.interval_seconds:.0f}s")
+
+    def stop(self):
+        self._stop.set()
+
+    def run_cycle(self):
+        started = time.monotonic()
+        with_forecast = self.prefetch_forecast and self.cycles % self.forecast_every == 0
+        for i, city in enumerate(self.cities):
+            if self._stop.is_set():
+                break
+            if i:
+                self._stop.wait(self.spacing_seconds)
+            self._refresh(city, with_forecast)
+        self.cycles += 1
+        self.last_cycle_at = time.time()
+        self.last_cycle_seconds = round(time.monotonic() - started, 2)
+
+    def stats(self):
+        return {
+            "cities": self.cities,
+            "configured_interval_seconds": self.configured_interval,
+            "interval_seconds": round(self.interval_seconds, 1),
+            "jitter": self.jitter,
+            "forecast_every_cycles": self.forecast_every,
+            "estimated_calls_per_day": round(self._weather_calls_per_day(self.interval_seconds), 1),
+            "estimated_onecall_calls_per_day": round(self._onecall_calls_per_day(self.forecast_every), 1),
+            "daily_budget": self.daily_budget,
+            "onecall_daily_budget": self.onecall_daily_budget,
+            "cycles": self.cycles,
+            "refreshed": self.refreshed,
+            "forecasts": self.forecasts,
+            "errors": self.errors,
+            "last_cycle_at": self.last_cycle_at,
+            "last_cycle_seconds": self.last_cycle_seconds,
+            "next_cycle_in": self.next_cycle_in,
+        }
+
+    # -----------------------------
+    # INTERNALS
+    # -----------------------------
+    def _weather_calls_per_day(self, interval):
+        """/weather calls per day: one per city per cycle."""
+        return len(self.cities) * 86400.0 / interval
+
+    def _onecall_calls_per_day(self, every):
+        """One Call calls per day: once per city per forecast cycle, at most once per cache TTL."""
+        if not self.prefetch_forecast:
+            return 0.0
+        return len(self.cities) * 86400.0 / max(self.interval_seconds * every, self.forecast_ttl_seconds)
+
+    def _quota_interval(self):
+        interval = max(self.configured_interval, 1.0)
+        if self.daily_budget <= 0 or not self.cities:
+            return interval
+        while self._weather_calls_per_day(interval) > self.daily_budget:
+            interval *= 1.25
+        if interval > self.configured_interval:
+            print(f"⚠️ Weather prefetch interval raised to {interval:.0f}s to stay within "
+                  f"{self.daily_budget:.0f} calls/day")
+        return interval
+
+    def _forecast_every(self):
+        """Prefetch forecasts only every N cycles if One Call's quota requires it."""
+        every = 1
+        if self.onecall_daily_budget <= 0 or not self.cities:
+            return every
+        while self._onecall_calls_per_day(every) > self.onecall_daily_budget:
+            every += 1
+        return every
+
+    def _refresh(self, city, with_forecast=True):
+        get_weather = self._get_weather or weather_api.get_weather
+        get_forecast = self._get_forecast or weather_api.get_forecast
+        try:
+            # Bypass the cache; the old entry is only replaced if OpenWeather answers
+            weather = get_weather(city, self.country, force_refresh=True)
+            if weather is None:
+                self.errors += 1
+            else:
+                self.refreshed += 1
+            if with_forecast:
+                # Served from the One Call cache unless it expired
+                forecast = get_forecast(city, self.country)
+                if isinstance(forecast, dict) and "error" in forecast:
+                    self.errors += 1
+                else:
+                    self.forecasts += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"❌ Weather prefetch failed for {city}: {e}")
+
+    def _next_delay(self):
+        return self.interval_seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_cycle()
+            delay = self._next_delay()
+            self.next_cycle_in = round(delay, 1)
+            self._stop.wait(delay)
+
+
+weather_prefetcher = WeatherPrefetcher()
@@ -0,0 +1,303 @@
+"""
+weather_store.py
+Buffered, partitioned store for logged weather observations.
+Fresh observations from weather_api are appended to an in-memory buffer and
+written in batches (every flush_rows records or flush_seconds, whichever
+comes first) under a lock, so concurrent requests never interleave rows.
+Each city/month is its own partition:
+
+    data/weather/<city>/<YYYY-MM>.parquet    (or .csv without pyarrow)
+
+so training and forecasting read only the cities and months they need.
+export_csv() still produces the old single weather_data.csv layout.
+
+Run from the project root:
+    python -m backend.utils.weather_store --import data/weather_data.csv
+    python -m backend.utils.weather_store --export data/weather_data.csv --city Bamenda
+"""
+
+import argparse
+import atexit
+import glob
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (pandas' Parquet engine)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# -----------------------------
+# CONFIG
+# -----------------------------
+WEATHER_STORE_DIR = os.getenv("WEATHER_STORE_DIR", "data/weather")
+# "parquet" (needs pyarrow; falls back to csv) or "csv"
+WEATHER_STORE_FORMAT = os.getenv("WEATHER_STORE_FORMAT", "parquet")
+WEATHER_STORE_FLUSH_ROWS = int(os.getenv("WEATHER_STORE_FLUSH_ROWS", 50))
+WEATHER_STORE_FLUSH_SECONDS = float(os.getenv("WEATHER_STORE_FLUSH_SECONDS", 30))
+# Legacy single-file log, still available through export_csv()
+WEATHER_CSV_PATH = "data/weather_data.csv"
+
+COLUMNS = ["date", "city", "temp", "humidity", "pressure", "wind_speed", "condition"]
+
+
+def city_slug(city):
+    """Partition directory name for a city: ' Yaoundé ' -> 'yaoundé', 'Kumba Town' -> 'kumba_town'."""
+    return re.sub(r"[^\w]+", "_", " ".join(str(city or "unknown").split()).lower()).strip("_") or "unknown"
+
+
+def _month(date):
+    return str(date)[:7]
+
+
+class WeatherStore:
+    """
+    append(record)  buffer one observation (a get_weather() dict)
+    flush()         write the buffer out now (also runs on exit)
+    read(...)       DataFrame of the requested cities / date range only
+    """
+
+    def __init__(self, root=WEATHER_STORE_DIR, fmt=WEATHER_STORE_FORMAT,
+                 flush_rows=WEATHER_STORE_FLUSH_ROWS, flush_seconds=WEATHER_STORE_FLUSH_SECONDS):
+        if fmt not in ("parquet", "csv"):
+            raise ValueError(f"Unknown weather store format: {fmt}")
+        if fmt == "parquet" and not PARQUET_AVAILABLE:
+            print("⚠️ pyarrow not installed: weather store partitions are written as CSV.")
+            fmt = "csv"
+        self.root = root
+        self.fmt = fmt
+        self.flush_rows = max(1, int(flush_rows))
+        self.flush_seconds = float(flush_seconds)
+
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+        self.appended = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+        atexit.register(self.flush)
+
+    # -----------------------------
+    # WRITING
+    # -----------------------------
+    def start(self):
+        """Start the interval flusher (idempotent; called lazily on first append)."""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._flusher, name="weather-store-flusher", daemon=True)
+                self._thread.start()
+
+    def append(self, record):
+        """Buffer one weather record. Returns True once it is queued."""
+        if not record:
+            return False
+        self.start()
+        with self._buffer_lock:
+            self._buffer.append(dict(record))
+            self.appended += 1
+            full = len(self._buffer) >= self.flush_rows
+        if full:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Write every buffered record to its partition. Returns the number written."""
+        with self._write_lock:
+            with self._buffer_lock:
+                records, self._buffer = self._buffer, []
+            if not records:
+                return 0
+            started = time.perf_counter()
+            written = set()
+            try:
+                df = self._frame(records)
+                for (slug, month), part in df.groupby([df["city"].map(city_slug), df["date"].map(_month)]):
+                    self._write_partition(slug, month, part)
+                    written.add((slug, month))
+            except Exception as e:
+                # Keep the rows of partitions not written yet: they are retried on
+                # the next flush (re-buffering written ones would duplicate them)
+                kept = [r for r in records if (city_slug(r.get("city")), _month(r.get("date"))) not in written]
+                with self._buffer_lock:
+                    self._buffer[:0] = kept
+                self.flush_errors += 1
+                self.rows_written += len(records) - len(kept)
+                print(f"❌ Weather store flush failed ({len(kept)} rows kept in buffer): {e}")
+                return len(records) - len(kept)
+            self.flushes += 1
+            self.rows_written += len(records)
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            return len(records)
+
+    def _write_partition(self, slug, month, part):
+        """Caller holds the write lock."""
+        path = self._partition_path(slug, month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.fmt == "csv":
+            part.to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+            return
+        # Parquet files are immutable: rewrite the (small) month file and swap it in
+        if os.path.exists(path):
+            part = pd.concat([pd.read_parquet(path), part], ignore_index=True)
+        tmp_path = path + ".tmp"
+        part.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def _flusher(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            if self._buffer:
+                self.flush()
+
+    # -----------------------------
+    # READING
+    # -----------------------------
+    def partitions(self, cities=None, start=None, end=None):
+        """Partition files holding the given cities (all if None) between start and end dates."""
+        extension = "." + self.fmt
+        if cities is None:
+            city_dirs = sorted(glob.glob(os.path.join(self.root, "*")))
+        else:
+            city_dirs = [os.path.join(self.root, city_slug(city)) for city in cities]
+        start_month = pd.Timestamp(start).strftime("%Y-%m") if start is not None else None
+        end_month = pd.Timestamp(end).strftime("%Y-%m") if end is not None else None
+
+        paths = []
+        for city_dir in city_dirs:
+            for path in sorted(glob.glob(os.path.join(city_dir, "*" + extension))):
+                month = os.path.basename(path)[:-len(extension)]
+                if start_month is not None and month < start_month:
+                    continue
+                if end_month is not None and month > end_month:
+                    continue
+                paths.append(path)
+        return paths
+
+    def read(self, cities=None, start=None, end=None):
+        """
+        Logged records as a DataFrame sorted by date, loading only the
+        partitions for the requested cities and date range. Buffered records
+        are flushed first so reads see every append.
+        """
+        self.flush()
+        frames = [self._read_partition(path) for path in self.partitions(cities, start, end)]
+        if not frames:
+            return pd.DataFrame(columns=COLUMNS)
+        df = pd.concat(frames, ignore_index=True)
+        dates = pd.to_datetime(df["date"])
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= dates >= pd.Timestamp(start)
+        if end is not None:
+            mask &= dates <= pd.Timestamp(end)
+        return df[mask].sort_values("date", kind="stable").reset_index(drop=True)
+
+    def cities(self):
+        """Partition names (city slugs) that hold at least one flushed record."""
+        return sorted(
+            os.path.basename(path) for path in glob.glob(os.path.join(self.root, "*"))
+            if glob.glob(os.path.join(path, "*." + self.fmt))
+        )
+
+    def has_data(self, city=None):
+        """Whether anything (or anything for one city) has been logged, flushed or not."""
+        slug = None if city is None else city_slug(city)
+        with self._buffer_lock:
+            buffered = any(slug is None or city_slug(record.get("city")) == slug for record in self._buffer)
+        return buffered or bool(self.partitions(None if city is None else [city]))
+
+    def last_date(self, city):
+        """Latest logged date for a city (buffered or flushed), or None. Reads one partition at most."""
+        slug = city_slug(city)
+        with self._buffer_lock:
+            dates = [str(r.get("date")) for r in self._buffer if city_slug(r.get("city")) == slug]
+        paths = self.partitions([city])
+        if paths:
+            df = self._read_partition(paths[-1])
+            if len(df):
+                dates.append(str(df["date"].max()))
+        return max(dates) if dates else None
+
+    def _read_partition(self, path):
+        if self.fmt == "csv":
+            return pd.read_csv(path)
+        return pd.read_parquet(path)
+
+    # -----------------------------
+    # CSV COMPATIBILITY
+    # -----------------------------
+    def export_csv(self, path=WEATHER_CSV_PATH, cities=None, start=None, end=None):
+        """Write the selected records in the legacy weather_data.csv layout. Returns the row count."""
+        df = self.read(cities, start, end)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        df.to_csv(path, index=False)
+        return len(df)
+
+    def import_csv(self, path=WEATHER_CSV_PATH):
+        """Load a legacy weather_data.csv into the partitions. Returns the row count."""
+        df = pd.read_csv(path)
+        with self._buffer_lock:
+            self._buffer.extend(df.to_dict(orient="records"))
+        self.flush()
+        return len(df)
+
+    def stats(self):
+        with self._buffer_lock:
+            buffered = len(self._buffer)
+        return {
+            "root": self.root,
+            "format": self.fmt,
+            "buffered": buffered,
+            "flush_rows": self.flush_rows,
+            "flush_seconds": self.flush_seconds,
+            "appended": self.appended,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "flush_errors": self.flush_errors,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
+
+    # -----------------------------
+    # INTERNALS
+    # -----------------------------
+    def _partition_path(self, slug, month):
+        return os.path.join(self.root, slug, f"{month}.{self.fmt}")
+
+    @staticmethod
+    def _frame(records):
+        df = pd.DataFrame(records)
+        for column in COLUMNS:
+            if column not in df.columns:
+                df[column] = None
+        extra = [c for c in df.columns if c not in COLUMNS]
+        return df[COLUMNS + extra]
+
+
+weather_store = WeatherStore()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--import", dest="import_path", help="legacy CSV to load into the store")
+    parser.add_argument("--export", dest="export_path", help="write the store out as one CSV")
+    parser.add_argument("--city", action="append", help="limit --export to these cities")
+    args = parser.parse_args()
+
+    if args.import_path:
+        print(f"📥 Imported {weather_store.import_csv(args.import_path)} rows into {weather_store.root}")
+    if args.export_path:
+        print(f"📤 Exported {weather_store.export_csv(args.export_path, cities=args.city)} rows to {args.export_path}")
@@ -0,0 +1,83 @@
+"""
+bench_batch_diagnosis.py
+Images/sec of batch diagnosis (parallel decode + one forward pass per
+batch_size images) vs one predict_disease() call per image, as
+/api/diagnose/ is used today. The CNN is simulated: each forward pass costs
+a fixed overhead plus a per-image cost (sleep, so it releases the GIL the
+way TF does); JPEG decoding and preprocessing are real.
+
+Run from the project root:
+    python -m benchmarks.bench_batch_diagnosis --images 96 --batch-sizes 1,4,8,16,32
+"""
+
+import argparse
+import io
+import random
+import time
+
+import numpy as np
+from PIL import Image
+
+from backend.ml_models import disease_model
+from backend.ml_models.inference_queue import InferenceScheduler
+
+LABELS = {0: "Maize___Blight", 1: "Maize___Healthy", 2: "Plantain___Black_Sigatoka"}
+
+
+def simulated_engine(overhead_ms, per_image_ms):
+    def predict(batch):
+        time.sleep((overhead_ms + per_image_ms * batch.shape[0]) / 1000.0)
+        out = np.random.random((batch.shape[0], len(LABELS)))
+        return out / out.sum(axis=1, keepdims=True)
+    return predict
+
+
+def leaf_photos(count, rng):
+    photos = []
+    for _ in range(count):
+        pixels = np.uint8([[[rng.randrange(256) for _ in range(3)]] * 4] * 4)
+        img = Image.fromarray(pixels).resize((1024, 768), Image.BILINEAR)
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=85)
+        photos.append(buf.getvalue())
+    return photos
+
+
+def images_per_second(fn, photos):
+    t0 = time.perf_counter()
+    results = fn(photos)
+    elapsed = time.perf_counter() - t0
+    assert len(results) == len(photos) and not any("error" in r for r in results)
+    return len(photos) / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=96)
+    parser.add_argument("--batch-sizes", default="1,4,8,16,32")
+    parser.add_argument("--overhead-ms", type=float, default=40.0)
+    parser.add_argument("--per-image-ms", type=float, default=4.0)
+    parser.add_argument("--decode-workers", type=int, default=None)
+    args = parser.parse_args()
+
+    disease_model.model_manager.get = lambda: {"index_to_label": LABELS}
+    photos = leaf_photos(args.images, random.Random(5))
+    print(f"{args.images} photos of {len(photos[0]) // 1024} KB, "
+          f"model: {args.overhead_ms} ms/pass + {args.per_image_ms} ms/image")
+
+    engine = simulated_engine(args.overhead_ms, args.per_image_ms)
+    disease_model.scheduler = InferenceScheduler(engine, max_batch_size=1)
+    single = images_per_second(
+        lambda batch: [disease_model.predict_disease(p, use_cache=False) for p in batch], photos
+    )
+    print(f"{'one request per image':>24}: {single:7.1f} images/s")
+
+    for batch_size in [int(s) for s in args.batch_sizes.split(",")]:
+        disease_model.scheduler = InferenceScheduler(engine, max_batch_size=batch_size)
+        rate = images_per_second(
+            lambda batch: list(disease_model.predict_disease_batch(
+                batch, use_cache=False, batch_size=batch_size, decode_workers=args.decode_workers
+            )),
+            photos,
+        )
+        print(f"{f'batch_size={batch_size}':>24}: {rate:7.1f} images/s  ({rate / single:4.1f}x)")
@@ -0,0 +1,135 @@
+"""
+bench_forecast_engines.py
+Harmonic regression (NumPy, batch fit) vs Prophet on per-city temperature
+series: fit time, predict latency, memory and MAE on a hold-out tail.
+Uses the logged weather store when it has data (--min-rows per city), else
+synthetic hourly series (or force that with --synthetic). Prophet is
+skipped if it is not installed.
+
+Memory is the tracemalloc peak of the fit (Python-side allocations only;
+Stan's native memory is not counted) plus the pickled model size.
+
+Run from the project root:
+    python -m benchmarks.bench_forecast_engines --synthetic --cities 20 --days 60
+"""
+
+import argparse
+import pickle
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from backend.ml_models import harmonic_forecast
+from backend.utils.weather_store import weather_store
+
+
+def synthetic_cities(count, days, seed):
+    rng = np.random.default_rng(seed)
+    ds = pd.date_range("2025-01-01", periods=days * 24, freq="h")
+    hour = ds.hour.to_numpy()
+    day = np.arange(len(ds)) / 24
+    frames = {}
+    for i in range(count):
+        base = rng.uniform(18, 28)
+        amplitude = rng.uniform(3, 7)
+        y = (base + amplitude * np.sin(2 * np.pi * (hour - 9) / 24)
+             + 0.02 * day + rng.normal(0, 0.8, len(ds)))
+        frames[f"city_{i}"] = pd.DataFrame({"date": ds, "temp": y})
+    return frames
+
+
+def logged_cities(min_rows):
+    frames = {}
+    for city in weather_store.cities():
+        df = weather_store.read(cities=[city])
+        if len(df) >= min_rows:
+            frames[city] = pd.DataFrame({"date": pd.to_datetime(df["date"]), "temp": df["temp"].astype(float)})
+    return frames
+
+
+def split(frames, holdout):
+    train, test = {}, {}
+    for city, df in frames.items():
+        cut = int(len(df) * (1 - holdout))
+        train[city], test[city] = df.iloc[:cut], df.iloc[cut:]
+    return train, test
+
+
+def measure(fit, repeat=1):
+    """Best-of-repeat fit time, then one more fit under tracemalloc for the peak."""
+    seconds = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        models = fit()
+        seconds = min(seconds, time.perf_counter() - t0)
+    tracemalloc.start()
+    fit()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return models, seconds, peak
+
+
+def evaluate(name, models, fit_seconds, peak, test, days):
+    latencies = []
+    errors = []
+    for city, model in models.items():
+        future = model.make_future_dataframe(periods=days)
+        for _ in range(5):
+            t0 = time.perf_counter()
+            model.predict(future)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        holdout = pd.DataFrame({"ds": test[city]["date"].to_numpy()})
+        predicted = model.predict(holdout)["yhat"].to_numpy()
+        errors.append(np.abs(predicted - test[city]["temp"].to_numpy()).mean())
+    size_kb = statistics.mean(len(pickle.dumps(m)) for m in models.values()) / 1024
+    print(f"{name:>18}  {fit_seconds * 1000:>10.1f}  {fit_seconds * 1000 / len(models):>11.2f}  "
+          f"{statistics.median(latencies):>10.3f}  {peak / 1e6:>8.1f}  {size_kb:>9.1f}  {statistics.mean(errors):>6.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--cities", type=int, default=20)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--min-rows", type=int, default=48)
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--horizon", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    frames = {} if args.synthetic else logged_cities(args.min_rows)
+    source = "weather store"
+    if not frames:
+        frames = synthetic_cities(args.cities, args.days, args.seed)
+        source = "synthetic"
+    train, test = split(frames, args.holdout)
+    rows = sum(len(df) for df in train.values())
+    print(f"{len(frames)} cities ({source}), {rows} training rows, hold-out {args.holdout:.0%}\n")
+    print(f"{'engine':>18}  {'fit ms':>10}  {'ms / city':>11}  {'predict ms':>10}  {'peak MB':>8}  "
+          f"{'model KB':>9}  {'MAE':>6}")
+
+    models, seconds, peak = measure(lambda: dict(zip(train, harmonic_forecast.fit_batch(
+        [(df["date"], df["temp"]) for df in train.values()]))), repeat=5)
+    evaluate("harmonic (batch)", models, seconds, peak, test, args.horizon)
+
+    models, seconds, peak = measure(lambda: {
+        city: harmonic_forecast.fit(df["date"], df["temp"]) for city, df in train.items()
+    }, repeat=5)
+    evaluate("harmonic (loop)", models, seconds, peak, test, args.horizon)
+
+    t0 = time.perf_counter()
+    try:
+        from prophet import Prophet
+    except ImportError:
+        print(f"{'prophet':>18}  not installed, skipped")
+    else:
+        import_seconds = time.perf_counter() - t0
+        models, seconds, peak = measure(lambda: {
+            city: Prophet(daily_seasonality=True).fit(df.rename(columns={"date": "ds", "temp": "y"}))
+            for city, df in train.items()
+        })
+        evaluate("prophet", models, seconds, peak, test, args.horizon)
+        print(f"\nimport prophet: {import_seconds * 1000:.0f} ms")
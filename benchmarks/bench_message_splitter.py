@@ -0,0 +1,126 @@
+"""
+bench_message_splitter.py
+Boundary-aware splitter vs the old fixed-offset split with shrink-and-resend,
+against the local FakeTwilioClient measuring bodies by real encoded length
+(UCS-2 for emoji). Reports Twilio API calls, 400 rejections, parts a farmer
+receives twice, mid-word cuts and split time.
+
+Run from the project root:
+    python -m benchmarks.bench_message_splitter --messages 200
+"""
+
+import argparse
+import random
+import time
+
+from twilio.base.exceptions import TwilioRestException
+
+from backend.utils.fake_twilio import FakeTwilioClient
+from backend.utils.message_splitter import encoded_length, split_message
+
+SAMPLE_LINES = [
+    "🌿 *Crop Disease Detected:* Maize___Blight",
+    "🌦️ *Weather in Bamenda:* light rain, 22°C, humidity 88%",
+    "🤖 *AI Advisory:*",
+    "Remove and burn infected leaves as soon as lesions appear on the lower canopy.",
+    "Spray a copper-based fungicide early in the morning when there is no wind.",
+    "Avoid overhead irrigation; water at the base of the plant to keep leaves dry.",
+    "Rotate with beans or groundnuts next season to break the disease cycle. 🌱",
+    "High humidity favours spread — check the field every two days. 👨‍🌾",
+    "Buy certified seed from the cooperative in Bafoussam if available. 🇨🇲",
+]
+
+
+def sample_reply(rng, lines):
+    paragraphs = []
+    for _ in range(lines):
+        paragraphs.append(" ".join(rng.choice(SAMPLE_LINES[3:]) for _ in range(rng.randint(1, 4))))
+    return "\n\n".join(SAMPLE_LINES[:3] + paragraphs)
+
+
+def old_send(fake, to, message, max_len=1600, min_chunk=400, max_parts=5):
+    """Previous behaviour: cut every chunk_size chars, shrink 25% and resend all on a 400."""
+    chunk_size = max_len
+    while chunk_size >= min_chunk:
+        parts = [message[i:i + chunk_size] for i in range(0, len(message), chunk_size)]
+        if len(parts) > max_parts:
+            truncated = message[:chunk_size * max_parts - 3] + "..."
+            parts = [truncated[i:i + chunk_size] for i in range(0, len(truncated), chunk_size)]
+        if len(parts) > 1:
+            parts = [f"(Part {i + 1}/{len(parts)})\n{p}" for i, p in enumerate(parts)]
+        try:
+            for part in parts:
+                fake.messages.create(from_="whatsapp:+1", to=to, body=part)
+            return parts
+        except TwilioRestException:
+            chunk_size = int(chunk_size * 0.75)
+    return None
+
+
+def new_send(fake, to, message):
+    parts = split_message(message)
+    for part in parts:
+        fake.messages.create(from_="whatsapp:+1", to=to, body=part)
+    return parts
+
+
+def mid_word_cuts(message, parts):
+    """Count parts that start in the middle of a word of the original message."""
+    bodies = [p.split("\n", 1)[1] if p.startswith("(Part ") else p for p in parts]
+    cuts = 0
+    pos = 0
+    for body in bodies:
+        start = message.find(body.removesuffix("..."), pos)
+        if start > 0 and not message[start - 1].isspace() and not message[start].isspace():
+            cuts += 1
+        pos = max(start, pos)
+    return cuts
+
+
+def run(send, messages, args):
+    fake = FakeTwilioClient(latency=0.0, length_fn=encoded_length)
+    split_time = 0.0
+    cuts = parts_total = failed = 0
+    for n, message in enumerate(messages):
+        t0 = time.perf_counter()
+        parts = send(fake, f"whatsapp:+{n}", message)
+        split_time += time.perf_counter() - t0
+        if parts is None:
+            failed += 1
+            continue
+        parts_total += len(parts)
+        cuts += mid_word_cuts(message, parts)
+    calls = len(fake.sent) + fake.rejected_400
+    duplicates = len(fake.sent) - parts_total
+    return {
+        "calls": calls,
+        "rejected_400": fake.rejected_400,
+        "duplicate_parts": duplicates,
+        "parts": parts_total,
+        "failed": failed,
+        "mid_word_cuts": cuts,
+        "ms_per_message": split_time * 1000 / len(messages),
+        "wasted_latency_s": (calls - parts_total) * args.latency,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--min-lines", type=int, default=5)
+    parser.add_argument("--max-lines", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.3, help="assumed Twilio round trip (s)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    messages = [sample_reply(rng, rng.randint(args.min_lines, args.max_lines)) for _ in range(args.messages)]
+    avg_len = sum(encoded_length(m) for m in messages) / len(messages)
+    print(f"📨 {args.messages} replies, avg {avg_len:.0f} UCS-2 units")
+
+    for name, send in (("old shrink+resend", old_send), ("boundary splitter", new_send)):
+        r = run(send, messages, args)
+        print(f"{name:18s}: {r['calls']:5d} API calls, {r['rejected_400']:4d} 400s, "
+              f"{r['duplicate_parts']:4d} duplicate parts, {r['parts']:4d} parts, "
+              f"{r['failed']:3d} failed, {r['mid_word_cuts']:4d} mid-word cuts, "
+              f"{r['ms_per_message']:.3f} ms/msg, ~{r['wasted_latency_s']:.1f}s wasted round trips")
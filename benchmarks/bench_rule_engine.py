@@ -0,0 +1,109 @@
+"""
+bench_rule_engine.py
+Lookup cost of the indexed rule engine as the rule set grows, compared with
+an if/elif-style linear substring scan (how advisory_rules used to work).
+Synthetic rule files are written to a temp directory; nothing is changed in
+backend/data.
+
+Run from the project root:
+    python -m benchmarks.bench_rule_engine --sizes 10,100,1000,5000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from backend.utils.advisory_rules import RuleEngine
+
+CONDITIONS = ["Clear", "Clouds", "Rain", "Drizzle", "Thunderstorm", "Mist"]
+
+
+def synthetic_rules(size):
+    diseases = []
+    for i in range(size):
+        crop = ["Maize", "Plantain", "Cassava", "Cocoa"][i % 4]
+        diseases.append({
+            "crop": crop,
+            "label": f"{crop}___Disease_{i}",
+            "advice": [f"Treatment for disease {i}."],
+            "weather": [{"when": {"condition_in": ["Rain", "Drizzle"]}, "advice": [f"Wet weather note {i}."]}],
+        })
+    return {
+        "version": 1,
+        "diseases": diseases,
+        "weather": [
+            {"when": {"contains": ["rain", "drizzle", "thunderstorm"]}, "advice": ["Avoid spraying before rain."]},
+            {"when": {}, "advice": ["Monitor soil moisture."]},
+        ],
+    }
+
+
+def linear_scan(rules, crop, disease_name, weather_summary):
+    """Old approach: lowercase everything and test every rule in turn."""
+    advice = []
+    for rule in rules["diseases"]:
+        if crop.lower() == rule["crop"].lower() and rule["label"].lower() == disease_name.lower():
+            advice.extend(rule["advice"])
+            for weather_rule in rule["weather"]:
+                if weather_summary in weather_rule["when"]["condition_in"]:
+                    advice.extend(weather_rule["advice"])
+            break
+    if any(word in weather_summary.lower() for word in ("rain", "drizzle", "thunderstorm")):
+        advice.append("Avoid spraying before rain.")
+    else:
+        advice.append("Monitor soil moisture.")
+    return advice
+
+
+def queries(size, count, rng):
+    out = []
+    for _ in range(count):
+        i = rng.randrange(size)
+        crop = ["Maize", "Plantain", "Cassava", "Cocoa"][i % 4]
+        out.append((crop, f"{crop}___Disease_{i}", rng.choice(CONDITIONS)))
+    return out
+
+
+def per_lookup_us(fn, items):
+    t0 = time.perf_counter()
+    for item in items:
+        fn(*item)
+    return (time.perf_counter() - t0) * 1e6 / len(items)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10,100,1000,5000")
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'rules':>6}  {'indexed us':>10}  {'batch us':>9}  {'linear us':>10}  {'load ms':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in [int(s) for s in args.sizes.split(",")]:
+            rules = synthetic_rules(size)
+            path = os.path.join(tmp, f"rules_{size}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(rules, f)
+
+            t0 = time.perf_counter()
+            engine = RuleEngine(path, reload_seconds=60)
+            load_ms = (time.perf_counter() - t0) * 1000
+
+            items = queries(size, args.queries, rng)
+            indexed = per_lookup_us(engine.get_advice, items)
+
+            t0 = time.perf_counter()
+            engine.evaluate_batch(items)
+            batch = (time.perf_counter() - t0) * 1e6 / len(items)
+
+            # The linear scan is slow at large sizes: time fewer queries
+            linear = per_lookup_us(lambda *q: linear_scan(rules, *q), items[:max(200, args.queries // size)])
+
+            for item in items[:50]:
+                assert engine.get_advice(*item) == linear_scan(rules, *item)
+            print(f"{size:>6}  {indexed:>10.2f}  {batch:>9.2f}  {linear:>10.2f}  {load_ms:>8.1f}")
@@ -0,0 +1,91 @@
+"""
+bench_twilio_dispatcher.py
+Throughput of the outbound dispatcher vs the old blocking send loop,
+against the local FakeTwilioClient (no real messages are sent).
+
+Run from the project root:
+    python -m benchmarks.bench_twilio_dispatcher --recipients 50 --parts 3
+"""
+
+import argparse
+import threading
+import time
+
+from twilio.base.exceptions import TwilioRestException
+
+from backend.utils.fake_twilio import FakeTwilioClient
+from backend.utils.twilio_dispatcher import OutboundDispatcher
+
+
+def blocking_baseline(fake, recipients, parts, sleep_between):
+    """Old behaviour: one thread per reply, sleep between parts, sleep on 429."""
+    caller_times = []
+
+    def reply(to):
+        t0 = time.perf_counter()
+        for i in range(parts):
+            wait = 2.0
+            for _ in range(4):
+                try:
+                    fake.messages.create(from_="whatsapp:+1", to=to, body=f"part {i}")
+                    break
+                except TwilioRestException:
+                    time.sleep(wait)
+                    wait *= 2
+            time.sleep(sleep_between)
+        caller_times.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=reply, args=(f"whatsapp:+{n}",)) for n in range(recipients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0, max(caller_times)
+
+
+def dispatcher_run(fake, recipients, parts, args):
+    dispatcher = OutboundDispatcher(
+        fake, "whatsapp:+1",
+        global_rate=args.global_rate, global_burst=args.global_burst,
+        recipient_rate=args.recipient_rate, recipient_burst=1,
+        send_workers=args.workers, retry_base_seconds=0.5,
+    )
+    t0 = time.perf_counter()
+    caller = 0.0
+    for n in range(recipients):
+        c0 = time.perf_counter()
+        dispatcher.send(f"whatsapp:+{n}", [f"part {i}" for i in range(parts)])
+        caller = max(caller, time.perf_counter() - c0)
+    dispatcher.flush()
+    return time.perf_counter() - t0, caller, dispatcher.stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipients", type=int, default=50)
+    parser.add_argument("--parts", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake API latency (s)")
+    parser.add_argument("--account-limit", type=int, default=20, help="fake Twilio msgs/sec before 429")
+    parser.add_argument("--global-rate", type=float, default=18)
+    parser.add_argument("--global-burst", type=int, default=2)
+    parser.add_argument("--recipient-rate", type=float, default=1.25)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--baseline", action="store_true", help="also run the old blocking loop")
+    args = parser.parse_args()
+
+    total = args.recipients * args.parts
+    print(f"📨 {args.recipients} recipients x {args.parts} parts = {total} messages, "
+          f"fake latency {args.latency * 1000:.0f} ms, account limit {args.account_limit}/s")
+
+    fake = FakeTwilioClient(latency=args.latency, max_per_second=args.account_limit)
+    wall, caller, stats = dispatcher_run(fake, args.recipients, args.parts, args)
+    print(f"dispatcher: {wall:6.2f}s wall, {total / wall:6.1f} msg/s, "
+          f"max caller block {caller * 1000:.2f} ms, 429s {fake.rejected_429}, "
+          f"retries {stats['retries_429']}")
+
+    if args.baseline:
+        fake = FakeTwilioClient(latency=args.latency, max_per_second=args.account_limit)
+        wall, caller = blocking_baseline(fake, args.recipients, args.parts, sleep_between=0.8)
+        print(f"baseline:   {wall:6.2f}s wall, {total / wall:6.1f} msg/s, "
+              f"max caller block {caller * 1000:.0f} ms, 429s {fake.rejected_429}")
@@ -0,0 +1,206 @@
+# tests/test_advice_cache.py
+import json
+import threading
+import time
+
+import requests
+
+from backend.utils import ai_advisor
+from backend.utils.advice_cache import AdviceCache, prompt_fingerprint
+from backend.utils.llm_gateway import LLMGateway
+
+
+def test_fingerprint_ignores_whitespace_and_case_but_not_model():
+    a = prompt_fingerprint("Maize blight\n  in   Rain ", "llama3")
+    assert a == prompt_fingerprint("maize blight in rain", "llama3")
+    assert a != prompt_fingerprint("maize blight in rain", "mistral")
+
+
+def test_entries_persist_expire_and_follow_version(tmp_path):
+    db = str(tmp_path / "advice.sqlite3")
+    cache = AdviceCache(db, ttl_seconds=3600, version="1")
+    cache.put("k", "spray fungicide", "llama3")
+
+    assert AdviceCache(db, ttl_seconds=3600, version="1").get("k") == "spray fungicide"
+    assert AdviceCache(db, ttl_seconds=3600, version="2").get("k") is None
+    assert AdviceCache(db, ttl_seconds=3600, version="2").purge() == 1
+
+    cache.put("old", "stale", "llama3")
+    time.sleep(0.05)
+    assert AdviceCache(db, ttl_seconds=0.01, version="1").get("old") is None
+
+
+def test_concurrent_misses_share_one_generation(tmp_path):
+    cache = AdviceCache(str(tmp_path / "advice.sqlite3"))
+    calls = []
+
+    def generate():
+        calls.append(1)
+        time.sleep(0.1)
+        return "advice"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_generate("k", generate, "m")))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["advice"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_llm_errors_are_returned_but_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_advisor, "advice_cache", AdviceCache(str(tmp_path / "advice.sqlite3")))
+    replies = [requests.exceptions.ConnectionError("refused"), "Remove infected leaves."]
+
+    def fake_llm(prompt, deadline=None):
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    monkeypatch.setattr(ai_advisor, "_call_llm", fake_llm)
+
+    first = ai_advisor.generate_ai_advice("Maize", "Maize___Blight", "Rain")
+    assert first.startswith("⚠️ Error connecting to LLaMA")
+    assert ai_advisor.generate_ai_advice("Maize", "Maize___Blight", "rain ") == "Remove infected leaves."
+    # Served from cache: no LLM reply left to pop
+    assert ai_advisor.generate_ai_advice("Maize", "Maize___Blight", "Rain") == "Remove infected leaves."
+    assert ai_advisor.advice_cache.stats()["not_cached"] == 1
+
+
+def test_prewarm_fills_every_label_condition_pair(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_advisor, "advice_cache", AdviceCache(str(tmp_path / "advice.sqlite3")))
+    prompts = []
+    monkeypatch.setattr(ai_advisor, "_call_llm", lambda prompt, deadline=None: prompts.append(prompt) or "ok")
+
+    labels = ["Maize___Blight", "Maize___Healthy"]
+    summary = ai_advisor.prewarm_advice_cache(labels, ["Rain", "Clear"])
+    assert summary == {"cached": 0, "generated": 4, "failed": 0, "skipped": 0}
+    assert ai_advisor.prewarm_advice_cache(labels, ["Rain", "Clear"])["cached"] == 4
+    assert len(prompts) == 4
+
+
+def test_prewarm_yields_to_live_requests(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_advisor, "advice_cache", AdviceCache(str(tmp_path / "advice.sqlite3")))
+    monkeypatch.setattr(ai_advisor, "llm_gateway", LLMGateway(max_concurrent=2, max_queue=4))
+    deadlines = []
+    monkeypatch.setattr(ai_advisor, "_call_llm", lambda prompt, deadline=None: deadlines.append(deadline) or "ok")
+
+    # A live generation holds one of two slots: the pre-warm waits, then stops
+    live = ai_advisor.llm_gateway.admit()
+    summary = ai_advisor.prewarm_advice_cache(["Maize___Blight"], ["Rain", "Clear"], idle_wait_seconds=0.1)
+    assert summary == {"cached": 0, "generated": 0, "failed": 0, "skipped": 2}
+    assert ai_advisor.llm_gateway.stats()["shed"]["busy"] == 1
+
+    # Once the live request is done the pre-warm runs, each call with a deadline
+    threading.Timer(0.05, live.release).start()
+    started = time.monotonic()
+    summary = ai_advisor.prewarm_advice_cache(["Maize___Blight"], ["Rain", "Clear"], idle_wait_seconds=5,
+                                              deadline_seconds=30)
+    assert summary == {"cached": 0, "generated": 2, "failed": 0, "skipped": 0}
+    assert all(started + 25 < deadline < time.monotonic() + 30 for deadline in deadlines)
+
+
+def test_coalesced_advice_is_labelled(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_advisor, "advice_cache", AdviceCache(str(tmp_path / "advice.sqlite3")))
+    release = threading.Event()
+    monkeypatch.setattr(ai_advisor, "_call_llm", lambda prompt, deadline=None: release.wait(5) and "Spray.")
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(ai_advisor.advise("Maize", "Maize___Blight", "Rain")))
+               for _ in range(3)]
+    for t in threads:
+        t.start()
+        time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert sorted(r["advisor"] for r in results) == ["coalesced", "coalesced", "llm"]
+    assert ai_advisor.advise("Maize", "Maize___Blight", "Rain")["advisor"] == "cache"
+
+
+def test_live_request_does_not_wait_on_a_prewarm_or_slow_generation(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_advisor, "advice_cache", AdviceCache(str(tmp_path / "advice.sqlite3")))
+    monkeypatch.setattr(ai_advisor, "llm_gateway", LLMGateway(max_concurrent=1, max_queue=4, expected_seconds=0.1))
+    release = threading.Event()
+    monkeypatch.setattr(ai_advisor, "_call_llm", lambda prompt, deadline=None: release.wait(5) and "Spray.")
+
+    # A pre-warm still waiting for an idle LLM has not claimed the prompt
+    busy = ai_advisor.llm_gateway.admit()
+    prewarm = threading.Thread(target=ai_advisor.prewarm_advice_cache, args=(["Maize___Blight"], ["Rain"]),
+                               kwargs={"idle_wait_seconds": 5})
+    prewarm.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    result = ai_advisor.advise("Maize", "Maize___Blight", "Rain", deadline_seconds=0.3)
+    assert result["advisor"] == "rules" and time.monotonic() - started < 0.5
+    busy.release()
+
+    # Waiting on a generation that is running is bounded by the caller's deadline
+    time.sleep(0.05)
+    started = time.monotonic()
+    result = ai_advisor.advise("Maize", "Maize___Blight", "Rain", deadline_seconds=0.3)
+    assert result == dict(result, advisor="rules", reason="timeout")
+    assert 0.25 < time.monotonic() - started < 0.6
+    release.set()
+    prewarm.join()
+    assert ai_advisor.advice_cache.stats()["coalesced_timeouts"] == 1
+    assert ai_advisor.llm_gateway.stats()["completed"] == 2
+
+
+def test_streamed_advice_is_cached_only_when_complete(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_advisor, "advice_cache", AdviceCache(str(tmp_path / "advice.sqlite3")))
+    monkeypatch.setattr(ai_advisor, "_stream_llm", lambda prompt, deadline=None: iter(["  Remove ", "leaves."]))
+
+    stream = ai_advisor.stream_ai_advice("Maize", "Maize___Blight", "Rain")
+    assert next(stream) == "Remove "
+    stream.close()  # client went away mid-answer
+    assert ai_advisor.advice_cache.stats()["entries"] == 0
+
+    assert list(ai_advisor.stream_ai_advice("Maize", "Maize___Blight", "Rain")) == ["Remove ", "leaves."]
+    assert list(ai_advisor.stream_ai_advice("Maize", "Maize___Blight", "Rain")) == ["Remove leaves."]
+
+
+class _StalledResponse:
+    """Ollama sends one token, then nothing until the read timeout fires."""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.closed = False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self):
+        yield json.dumps({"response": "Remove "}).encode("utf-8")
+        time.sleep(self.timeout)
+        raise requests.exceptions.ConnectionError("Read timed out.")
+
+    def close(self):
+        self.closed = True
+
+
+def test_stalled_stream_is_cut_at_the_slot_deadline(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_advisor, "advice_cache", AdviceCache(str(tmp_path / "advice.sqlite3")))
+    monkeypatch.setattr(ai_advisor, "llm_gateway", LLMGateway(max_concurrent=1, expected_seconds=0.1))
+    responses = []
+
+    def post(url, json=None, stream=False, timeout=None):
+        responses.append(_StalledResponse(timeout))
+        return responses[-1]
+
+    monkeypatch.setattr(ai_advisor.http, "post", post)
+    started = time.monotonic()
+    fragments = list(ai_advisor.stream_ai_advice("Maize", "Maize___Blight", "Rain", deadline_seconds=0.5))
+
+    # The deadline, not OLLAMA_TIMEOUT, is the read timeout
+    assert responses[0].timeout <= 1.0 and time.monotonic() - started < 2
+    assert fragments == ["Remove ", "⏱️ Read timed out."]
+    assert responses[0].closed
+    stats = ai_advisor.llm_gateway.stats()
+    assert stats["active"] == 0 and stats["failed"] == 1
+    assert ai_advisor.advice_cache.stats()["entries"] == 0
@@ -0,0 +1,85 @@
+# tests/test_advice_stream.py
+import io
+import json
+import time
+
+from flask import Flask
+
+from backend.ml_models.disease_model import model_manager
+from backend.routes import advisory
+from backend.utils import advisory_pipeline
+
+
+def _parse(chunks):
+    events = []
+    for block in "".join(chunks).split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _fake_stages(monkeypatch, llm_delay=0.0):
+    def disease_stage(image, use_cache=True):
+        time.sleep(0.1)
+        return {"predicted_label": "Maize___Blight", "confidence": 0.9}
+
+    def stream_ai_advice(crop, disease, weather_summary, use_cache=True, info=None):
+        info["advisor"] = "llm"
+        for word in ["Spray ", "copper ", f"before the {weather_summary.lower()}."]:
+            time.sleep(llm_delay)
+            yield word
+
+    monkeypatch.setattr(advisory_pipeline, "disease_stage", disease_stage)
+    monkeypatch.setattr(advisory_pipeline, "weather_stage", lambda city, country="CM": {"weather": [{"main": "Rain"}]})
+    monkeypatch.setattr(advisory_pipeline, "stream_ai_advice", stream_ai_advice)
+
+
+def test_pipeline_streams_inputs_then_tokens(monkeypatch):
+    _fake_stages(monkeypatch)
+    events = list(advisory_pipeline.stream_advisory_pipeline(b"img", "Bamenda"))
+
+    assert [name for name, _ in events] == ["weather", "disease", "advisor", "token", "token", "token", "done"]
+    assert events[1][1]["crop"] == "Maize"
+    done = events[-1][1]
+    assert done["advice"] == "Spray copper before the rain."
+    assert done["advisor"] == events[2][1]["advisor"] == "llm"
+    assert done["timings"]["advice"]["status"] == "ok"
+    assert done["timings"]["advice"]["first_token_ms"] is not None
+
+
+def test_stream_route_sends_first_events_before_advice_finishes(monkeypatch):
+    _fake_stages(monkeypatch, llm_delay=0.2)
+    monkeypatch.setattr(model_manager, "is_ready", lambda: True)
+    app = Flask(__name__)
+    app.register_blueprint(advisory.advisory_bp)
+
+    started = time.perf_counter()
+    resp = app.test_client().post(
+        "/api/advice/stream",
+        data={"city": "Bamenda", "image": (io.BytesIO(b"img"), "leaf.jpg")},
+        buffered=False,
+    )
+    assert resp.mimetype == "text/event-stream"
+
+    chunks = []
+    first_event_at = None
+    for chunk in resp.response:
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if first_event_at is None and chunk.startswith("event:"):
+            first_event_at = time.perf_counter() - started
+        chunks.append(chunk)
+    total = time.perf_counter() - started
+
+    events = _parse(chunks)
+    assert events[-1][0] == "done"
+    # Weather/disease arrive long before the (slow) LLM is done
+    assert first_event_at < 0.15 and total > 0.55
+
+
+def test_stream_route_requires_image_and_city(monkeypatch):
+    monkeypatch.setattr(model_manager, "is_ready", lambda: True)
+    app = Flask(__name__)
+    app.register_blueprint(advisory.advisory_bp)
+    resp = app.test_client().post("/api/advice/stream", data={"city": "Bamenda"})
+    assert resp.status_code == 400
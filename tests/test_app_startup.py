@@ -0,0 +1,68 @@
+# tests/test_app_startup.py
+import multiprocessing
+import os
+import runpy
+import sqlite3
+import threading
+import time
+from queue import Empty
+
+from backend.utils.job_queue import JobQueue
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend", "app.py")
+SERVICE_THREADS = ("disease_model-loader", "whatsapp-worker", "advice-prewarm", "forecast-trainer",
+                   "weather-prefetcher")
+
+
+def _spawned_worker(results):
+    # What a spawn pool worker does: import the training entry point and
+    # re-run the parent's main script as __mp_main__
+    from backend.ml_models.forecast_trainer import train_city_job  # noqa: F401
+    app_globals = runpy.run_path(APP_PATH, run_name="__mp_main__")
+    results.put({
+        "threads": [t.name for t in threading.enumerate()],
+        "model_state": app_globals["model_manager"].state,
+        "job_workers": len(app_globals["whatsapp_jobs"]._threads),
+        "trainer_started": app_globals["forecast_trainer"]._thread is not None,
+        "prefetch_started": app_globals["weather_prefetcher"]._thread is not None,
+    })
+
+
+def test_spawned_worker_importing_app_starts_no_services_and_opens_no_caches(tmp_path, monkeypatch):
+    job_db = str(tmp_path / "jobs.sqlite3")
+    for name, value in {
+        "WHATSAPP_JOB_DB": job_db,
+        "ADVICE_CACHE_DB": str(tmp_path / "advice.sqlite3"),
+        "GEOCODE_CACHE_DB": str(tmp_path / "geocode.sqlite3"),
+        "WEATHER_STORE_DIR": str(tmp_path / "weather"),
+        "FORECAST_MODEL_DIR": str(tmp_path / "models"),
+    }.items():
+        monkeypatch.setenv(name, value)
+
+    # A job the running server is in the middle of
+    queue = JobQueue(job_db, handler=lambda payload: None)
+    job_id, _, _ = queue.submit({"sender": "whatsapp:+237600000000"})
+    queue._db.execute("UPDATE jobs SET status = 'running', attempts = 1 WHERE id = ?", (job_id,))
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    child = ctx.Process(target=_spawned_worker, args=(results,))
+    child.start()
+    report = None
+    deadline = time.time() + 120
+    while report is None and time.time() < deadline:
+        try:
+            report = results.get(timeout=0.5)
+        except Empty:
+            assert child.is_alive() or not results.empty(), f"worker died with exit code {child.exitcode}"
+    child.join(timeout=30)
+
+    assert report is not None and child.exitcode == 0
+    assert not [name for name in report["threads"] if name.startswith(SERVICE_THREADS)]
+    assert report["model_state"] == "idle"
+    assert report["job_workers"] == 0
+    assert not report["trainer_started"] and not report["prefetch_started"]
+    status = sqlite3.connect(job_db).execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+    assert status == "running"
+    # Caches are opened on first use, not on import
+    assert not (tmp_path / "advice.sqlite3").exists() and not (tmp_path / "geocode.sqlite3").exists()
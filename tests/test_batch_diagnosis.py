@@ -0,0 +1,140 @@
+# tests/test_batch_diagnosis.py
+import io
+import json
+import zipfile
+
+import numpy as np
+from flask import Flask
+from PIL import Image
+
+from backend.ml_models import disease_model
+from backend.ml_models.inference_queue import InferenceScheduler
+from backend.ml_models.prediction_cache import PredictionCache
+from backend.routes import diagnosis
+
+LABELS = {0: "Maize___Blight", 1: "Maize___Healthy", 2: "Plantain___Black_Sigatoka"}
+
+
+def _jpeg(value):
+    """Solid-colour leaf photo; the fake model predicts class = red channel // 100."""
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), (value, 90, 30)).save(buf, format="JPEG", quality=95)
+    return buf.getvalue()
+
+
+def _fake_model(calls):
+    def predict(batch):
+        calls.append(batch.shape[0])
+        classes = np.clip(np.rint(batch[:, 0, 0, 0] * 255 / 100), 0, 2).astype(int)
+        out = np.full((batch.shape[0], 3), 0.05)
+        out[np.arange(batch.shape[0]), classes] = 0.9
+        return out
+    return predict
+
+
+def _setup(monkeypatch, calls):
+    monkeypatch.setattr(disease_model.model_manager, "get", lambda: {"index_to_label": LABELS})
+    monkeypatch.setattr(disease_model.model_manager, "is_ready", lambda: True)
+    monkeypatch.setattr(disease_model, "scheduler", InferenceScheduler(_fake_model(calls), max_batch_size=4))
+    monkeypatch.setattr(disease_model, "prediction_cache", PredictionCache(max_entries=64, ttl_seconds=60))
+
+
+def test_batch_predictions_keep_order_and_use_batch_size(monkeypatch):
+    calls = []
+    _setup(monkeypatch, calls)
+    images = [_jpeg((i % 3) * 100) for i in range(7)] + [b"not an image"]
+
+    results = list(disease_model.predict_disease_batch(images, use_cache=False, batch_size=3))
+
+    assert [r.get("predicted_label") for r in results[:7]] == [LABELS[i % 3] for i in range(7)]
+    assert "error" in results[7]
+    assert calls == [3, 3, 1]
+
+
+def test_batch_decodes_only_a_window_ahead_of_the_consumer(monkeypatch):
+    _setup(monkeypatch, [])
+    pulled = []
+
+    def sources():
+        for i in range(60):
+            pulled.append(i)
+            yield _jpeg(0)
+
+    ahead = []
+    for done, _ in enumerate(disease_model.predict_disease_batch(sources(), use_cache=False, batch_size=3)):
+        ahead.append(len(pulled) - done)
+
+    assert len(ahead) == 60
+    # 2 * batch_size decoding + the batch being collected + the batch in the model
+    assert max(ahead) <= 4 * 3
+
+
+def test_batch_route_streams_ndjson_with_field_summary(monkeypatch):
+    calls = []
+    _setup(monkeypatch, calls)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        for i in range(4):
+            zf.writestr(f"visit/leaf_{i}.jpg", _jpeg(0))
+        zf.writestr("visit/notes.txt", "ignored")
+    archive.seek(0)
+    app = Flask(__name__)
+    app.register_blueprint(diagnosis.diagnosis_bp)
+
+    resp = app.test_client().post(
+        "/api/diagnose/batch",
+        data={
+            "field": "Bamenda-North",
+            "batch_size": "5",
+            "images": [(io.BytesIO(_jpeg(100)), "a.jpg"), (io.BytesIO(_jpeg(200)), "b.png")],
+            "archive": (archive, "visit.zip"),
+        },
+    )
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+
+    per_image, summary = lines[:-1], lines[-1]["summary"]
+    assert [line["filename"] for line in per_image] == ["a.jpg", "b.png"] + [f"visit/leaf_{i}.jpg" for i in range(4)]
+    assert all(line["status"] == "success" for line in per_image)
+    assert calls == [5, 1]
+    assert summary["field"] == "Bamenda-North"
+    assert summary["images"] == 6 and summary["errors"] == 0
+    assert summary["diseases"]["Maize___Blight"]["count"] == 4
+    assert summary["dominant_disease"] == "Maize___Blight"
+    assert summary["healthy_share"] == round(1 / 6, 3)
+
+
+def test_batch_route_rejects_bad_uploads(monkeypatch):
+    _setup(monkeypatch, [])
+    app = Flask(__name__)
+    app.register_blueprint(diagnosis.diagnosis_bp)
+    client = app.test_client()
+
+    assert client.post("/api/diagnose/batch", data={}).status_code == 400
+    resp = client.post("/api/diagnose/batch", data={"images": (io.BytesIO(b"x"), "notes.txt")})
+    assert resp.status_code == 400
+    resp = client.post("/api/diagnose/batch", data={"archive": (io.BytesIO(b"not a zip"), "visit.zip")})
+    assert resp.status_code == 400
+
+
+def test_collect_batch_images_defers_reading_image_bytes():
+    from werkzeug.datastructures import FileStorage
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        for i in range(3):
+            zf.writestr(f"leaf_{i}.jpg", _jpeg(i * 100))
+    archive.seek(0)
+    photo = io.BytesIO(_jpeg(200))
+    files = [FileStorage(photo, "a.jpg"), FileStorage(archive, "visit.zip")]
+
+    images = diagnosis.collect_batch_images(files)
+    try:
+        assert photo.tell() == 0
+        assert all(isinstance(source, diagnosis.ZipMember) for _, source in images[1:])
+        # Bytes come out only when the decoder reads a source
+        assert [source.read() for _, source in images] == [_jpeg(200)] + [_jpeg(i * 100) for i in range(3)]
+    finally:
+        diagnosis.close_batch_images(images)
+    assert images[1][1].archive.fp is None
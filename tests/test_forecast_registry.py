@@ -0,0 +1,88 @@
+# tests/test_forecast_registry.py
+import os
+import pickle
+
+import pytest
+
+from backend.ml_models.forecast_registry import ForecastModelRegistry
+
+
+def _save(path, model, mtime_ns=None):
+    with open(path, "wb") as f:
+        pickle.dump(model, f)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_model_is_loaded_once_until_the_file_changes(tmp_path):
+    path = str(tmp_path / "weather_model.pkl")
+    _save(path, {"trained": 1}, mtime_ns=1_000_000_000)
+    registry = ForecastModelRegistry(check_seconds=0)
+
+    model, version = registry.get(path)
+    for _ in range(5):
+        assert registry.get(path) == (model, version)
+    assert registry.stats()["loads"] == 1
+
+    _save(path, {"trained": 2}, mtime_ns=2_000_000_000)
+    new_model, new_version = registry.get(path)
+    assert new_model == {"trained": 2}
+    assert new_version != version
+    assert registry.stats()["loads"] == 2
+
+
+def test_check_interval_skips_stat_calls(tmp_path, monkeypatch):
+    path = str(tmp_path / "weather_model.pkl")
+    _save(path, {"trained": 1})
+    registry = ForecastModelRegistry(check_seconds=60)
+    registry.get(path)
+
+    monkeypatch.setattr(os, "stat", lambda p: pytest.fail("stat called inside the check interval"))
+    assert registry.get(path)[0] == {"trained": 1}
+
+
+def test_missing_and_broken_models(tmp_path):
+    path = str(tmp_path / "weather_model.pkl")
+    registry = ForecastModelRegistry(check_seconds=0)
+    with pytest.raises(FileNotFoundError):
+        registry.get(path)
+
+    _save(path, {"trained": 1}, mtime_ns=1_000_000_000)
+    good = registry.get(path)
+    with open(path, "wb") as f:
+        f.write(b"not a pickle")
+    # A broken retrain keeps the previous model in service
+    assert registry.get(path) == good
+    assert registry.stats()["errors"] == 1
+
+    os.remove(path)
+    with pytest.raises(FileNotFoundError):
+        registry.get(path)
+
+
+def test_forecasts_are_cached_per_model_version(tmp_path, monkeypatch):
+    from backend.ml_models import weather_predictor
+
+    calls = []
+
+    class FakeModel:
+        def make_future_dataframe(self, periods):
+            import pandas as pd
+            return pd.DataFrame({"ds": pd.date_range("2025-01-01", periods=10 + periods)})
+
+        def predict(self, future):
+            calls.append(len(future))
+            return future.assign(yhat=20.0, yhat_lower=18.0, yhat_upper=22.0)
+
+    registry = ForecastModelRegistry(loader=lambda path: FakeModel(), check_seconds=0)
+    monkeypatch.setattr(weather_predictor, "model_registry", registry)
+    path = str(tmp_path / "model.pkl")
+    _save(path, {}, mtime_ns=1_000_000_000)
+
+    first = weather_predictor.forecast_records(7, model_path=path)
+    assert weather_predictor.forecast_records(7, model_path=path) is first
+    assert len(first) == 7 and calls == [17]
+
+    _save(path, {"retrained": True}, mtime_ns=2_000_000_000)
+    weather_predictor.forecast_records(7, model_path=path)
+    assert calls == [17, 17]
@@ -0,0 +1,134 @@
+# tests/test_forecast_trainer.py
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.ml_models.forecast_trainer import ForecastTrainer, read_meta, write_meta
+from backend.utils.weather_store import WeatherStore
+
+
+def _log(store, city, start_hour, count):
+    for h in range(start_hour, start_hour + count):
+        store.append({"date": f"2025-03-{1 + h // 24:02d} {h % 24:02d}:00:00", "city": city, "temp": 20 + h % 5,
+                      "humidity": 80, "pressure": 1012, "wind_speed": 2.0, "condition": "Clouds"})
+
+
+def _trainer(tmp_path, store, calls, train_seconds=0.0, **kwargs):
+    def fake_train(city, df, path):
+        calls.append((city, len(df), threading.current_thread().name))
+        time.sleep(train_seconds)
+        with open(path, "wb") as f:
+            f.write(b"model")
+        meta = {"city": city, "rows": len(df), "trained_through": str(df["date"].max()),
+                "warm_start": False, "train_seconds": train_seconds}
+        write_meta(path, meta)
+        return meta
+
+    return ForecastTrainer(
+        store=store,
+        path_for=lambda city: str(tmp_path / "models" / f"{city}.pkl"),
+        cities=[],
+        min_rows=5,
+        train_fn=fake_train,
+        executor_factory=lambda: ThreadPoolExecutor(max_workers=4),
+        **kwargs,
+    )
+
+
+def test_one_model_per_city_retrained_only_on_new_rows(tmp_path):
+    os.makedirs(tmp_path / "models")
+    store = WeatherStore(str(tmp_path / "store"), fmt="csv", flush_rows=1000, flush_seconds=60)
+    _log(store, "Bamenda", 0, 10)
+    _log(store, "Douala", 0, 8)
+    _log(store, "Buea", 0, 2)        # below min_rows
+    calls = []
+    trainer = _trainer(tmp_path, store, calls)
+
+    results = trainer.run_once()
+    assert sorted(results) == ["bamenda", "douala"]
+    assert sorted((c, n) for c, n, _ in calls) == [("bamenda", 10), ("douala", 8)]
+    assert read_meta(str(tmp_path / "models" / "bamenda.pkl"))["rows"] == 10
+
+    # Nothing new: no training at all
+    assert trainer.run_once() == {}
+    assert len(calls) == 2
+
+    # New rows for one city only
+    _log(store, "Douala", 8, 3)
+    assert list(trainer.run_once()) == ["douala"]
+    assert calls[-1][:2] == ("douala", 11)
+
+
+def test_cities_train_in_parallel(tmp_path):
+    os.makedirs(tmp_path / "models")
+    store = WeatherStore(str(tmp_path / "store"), fmt="csv", flush_rows=1000, flush_seconds=60)
+    for city in ["Bamenda", "Douala", "Limbe", "Kumba"]:
+        _log(store, city, 0, 6)
+    calls = []
+    trainer = _trainer(tmp_path, store, calls, train_seconds=0.2)
+
+    started = time.perf_counter()
+    assert len(trainer.run_once()) == 4
+    assert time.perf_counter() - started < 0.6
+    assert len({thread for _, _, thread in calls}) > 1
+
+
+def test_request_wakes_background_trainer(tmp_path):
+    os.makedirs(tmp_path / "models")
+    store = WeatherStore(str(tmp_path / "store"), fmt="csv", flush_rows=1000, flush_seconds=60)
+    calls = []
+    trainer = _trainer(tmp_path, store, calls, interval_seconds=60)
+    trainer.start()
+    time.sleep(0.1)
+
+    _log(store, "Bafoussam", 0, 6)
+    trainer.request("Bafoussam")
+    deadline = time.time() + 2
+    while trainer.stats()["trained"] == 0 and time.time() < deadline:
+        time.sleep(0.02)
+    assert trainer.stats()["trained"] == 1
+    assert calls[0][0] == "bafoussam"
+
+
+def test_failed_training_is_reported_and_retried(tmp_path):
+    os.makedirs(tmp_path / "models")
+    store = WeatherStore(str(tmp_path / "store"), fmt="csv", flush_rows=1000, flush_seconds=60)
+    _log(store, "Bamenda", 0, 6)
+    attempts = []
+
+    def flaky(city, df, path):
+        attempts.append(city)
+        raise RuntimeError("stan failed")
+
+    trainer = ForecastTrainer(store=store, path_for=lambda city: str(tmp_path / "models" / f"{city}.pkl"),
+                              cities=["Bamenda"], min_rows=5, train_fn=flaky,
+                              executor_factory=lambda: ThreadPoolExecutor(max_workers=1))
+    assert trainer.run_once() == {"bamenda": {"error": "stan failed"}}
+    trainer.run_once()
+    assert attempts == ["bamenda", "bamenda"]
+    assert trainer.stats()["errors"] == 2
+
+
+def test_harmonic_engine_trains_all_due_cities_in_one_batch(tmp_path):
+    from backend.ml_models.forecast_trainer import train_cities_batch
+
+    os.makedirs(tmp_path / "models")
+    store = WeatherStore(str(tmp_path / "store"), fmt="csv", flush_rows=1000, flush_seconds=60)
+    for city in ["Bamenda", "Douala", "Yaoundé"]:
+        _log(store, city, 0, 30)
+    batches = []
+
+    def batch_fn(jobs):
+        batches.append(sorted(jobs))
+        return train_cities_batch(jobs)
+
+    trainer = _trainer(tmp_path, store, [], batch_train_fn=batch_fn)
+    results = trainer.run_once()
+
+    assert batches == [["bamenda", "douala", "yaoundé"]]
+    assert all(meta["batch_size"] == 3 for meta in results.values())
+    with open(tmp_path / "models" / "douala.pkl", "rb") as f:
+        assert pickle.load(f).engine == "harmonic"
+    assert trainer.run_once() == {}
@@ -0,0 +1,81 @@
+# tests/test_geocode_cache.py
+from backend.utils import weather_api
+from backend.utils.cache import TTLCache
+from backend.utils.geocode_cache import GeocodeCache, geocode_key
+
+
+class _Response:
+    def __init__(self, payload, status_code=200):
+        self._payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self._payload
+
+
+def _daily(n):
+    return [{"dt": 1700000000 + i * 86400, "temp": {"day": 27 + i, "night": 19}, "humidity": 80,
+             "weather": [{"description": "light rain"}]} for i in range(n)]
+
+
+def test_keys_ignore_case_whitespace_and_accents():
+    assert geocode_key(" Yaoundé ", "cm") == geocode_key("YAOUNDE", "CM") == ("yaounde", "CM")
+
+
+def test_seeded_localities_persist_and_unknown_cities_resolve_once(tmp_path):
+    db = str(tmp_path / "geocode.sqlite3")
+    calls = []
+
+    def resolver(city, country):
+        calls.append(city)
+        return (6.2, 10.67) if city == "kumbo town" else None
+
+    cache = GeocodeCache(db, seed_path=weather_api.GEOCODE_SEED_PATH, resolver=resolver)
+    assert cache.resolve("Bamenda") == (5.9597, 10.1459)
+    assert cache.resolve("yaounde") == (3.848, 11.5021)
+    assert cache.resolve("Kumbo Town") == (6.2, 10.67)
+    assert cache.resolve("Kumbo Town") == (6.2, 10.67)
+    assert cache.resolve("Atlantis") is None
+    assert calls == ["kumbo town", "atlantis"]
+    cache.learn("Mbengwi", "CM", {"lat": 6.0167, "lon": 10.0})
+
+    # A new process sees everything without upstream calls; seeds are not re-inserted
+    reopened = GeocodeCache(db, seed_path=weather_api.GEOCODE_SEED_PATH, resolver=resolver)
+    assert reopened.seeded == 0
+    assert reopened.lookup("kumbo town") == (6.2, 10.67)
+    assert reopened.lookup("Mbengwi") == (6.0167, 10.0)
+    assert len(calls) == 2
+
+
+def test_forecast_is_one_upstream_call_then_cached_per_day(tmp_path, monkeypatch):
+    urls = []
+
+    def fake_get(url, params=None, timeout=None):
+        urls.append(url)
+        return _Response({"daily": _daily(8)})
+
+    monkeypatch.setattr(weather_api.http, "get", fake_get)
+    monkeypatch.setattr(weather_api, "geocode_cache",
+                        GeocodeCache(str(tmp_path / "g.sqlite3"), seed_path=weather_api.GEOCODE_SEED_PATH))
+    monkeypatch.setattr(weather_api, "onecall_cache", TTLCache("onecall_daily", ttl_seconds=60))
+
+    forecast = weather_api.get_forecast("Bafoussam", "CM", days=7)
+    assert len(forecast) == 7 and forecast[0]["temp_day"] == 27
+    assert urls == ["https://api.openweathermap.org/data/3.0/onecall"]
+
+    # Another horizon for the same place and day reuses the cached daily list
+    assert len(weather_api.get_forecast("bafoussam", "cm", days=3)) == 3
+    assert len(urls) == 1
+
+
+def test_forecast_errors_are_not_cached(tmp_path, monkeypatch):
+    statuses = iter([401, 200])
+    monkeypatch.setattr(weather_api.http, "get",
+                        lambda url, params=None, timeout=None: _Response({"daily": _daily(7)}, next(statuses)))
+    monkeypatch.setattr(weather_api, "geocode_cache",
+                        GeocodeCache(str(tmp_path / "g.sqlite3"), seed_path=weather_api.GEOCODE_SEED_PATH))
+    monkeypatch.setattr(weather_api, "onecall_cache", TTLCache("onecall_daily", ttl_seconds=60))
+
+    assert weather_api.get_forecast("Buea") == {"error": "Failed to fetch forecast: 401"}
+    assert len(weather_api.get_forecast("Buea")) == 7
+    assert weather_api.get_forecast("Atlantis") == {"error": "Unknown location: Atlantis, CM"}
@@ -0,0 +1,53 @@
+# tests/test_harmonic_forecast.py
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from backend.ml_models import harmonic_forecast, weather_predictor
+
+
+def _series(city_offset, hours, seed=0):
+    rng = np.random.default_rng(seed)
+    ds = pd.date_range("2025-01-01", periods=hours, freq="h")
+    hour = ds.hour.to_numpy()
+    y = 22 + city_offset + 4 * np.sin(2 * np.pi * (hour - 9) / 24) + rng.normal(0, 0.3, hours)
+    return ds, y
+
+
+def test_recovers_daily_cycle_and_forecasts_ahead():
+    ds, y = _series(0, 24 * 30)
+    model = harmonic_forecast.fit(ds, y)
+
+    future = pd.DataFrame({"ds": pd.date_range(ds[-1] + pd.Timedelta(hours=1), periods=48, freq="h")})
+    truth = 22 + 4 * np.sin(2 * np.pi * (future["ds"].dt.hour.to_numpy() - 9) / 24)
+    forecast = model.predict(future)
+
+    assert np.abs(forecast["yhat"].to_numpy() - truth).mean() < 0.5
+    assert (forecast["yhat_lower"] < forecast["yhat"]).all() and (forecast["yhat"] < forecast["yhat_upper"]).all()
+    assert 0.2 < model.sigma < 0.5
+
+
+def test_batch_fit_matches_individual_fits():
+    series = [_series(0, 24 * 20, seed=1), _series(3, 24 * 9, seed=2), _series(-2, 24 * 14, seed=3)]
+    batch = harmonic_forecast.fit_batch(series)
+    for (ds, y), model in zip(series, batch):
+        single = harmonic_forecast.fit(ds, y)
+        np.testing.assert_allclose(model.coef, single.coef, rtol=1e-6, atol=1e-8)
+        assert model.last_ds == single.last_ds
+
+
+def test_prophet_style_interface_works_with_forecast_cache(tmp_path):
+    ds, y = _series(1, 24 * 10)
+    frames = {"bamenda": pd.DataFrame({"date": ds.strftime("%Y-%m-%d %H:%M:%S"), "temp": y})}
+    model = weather_predictor.fit_weather_models(frames, engine="harmonic")["bamenda"]
+    path = str(tmp_path / "bamenda.pkl")
+    weather_predictor.save_weather_model(model, path)
+
+    # Round-trips through pickle and the registry like a Prophet model
+    assert pickle.loads(pickle.dumps(model)).coef.tolist() == model.coef.tolist()
+    records = weather_predictor.forecast_records(5, model_path=path)
+    assert [r["ds"].date() for r in records] == [
+        (ds[-1] + pd.Timedelta(days=d)).date() for d in range(1, 6)
+    ]
+    assert weather_predictor.forecast_records(5, model_path=path) is records
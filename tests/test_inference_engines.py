@@ -0,0 +1,61 @@
+# tests/test_inference_engines.py
+import sys
+import types
+
+import numpy as np
+
+from backend.ml_models.inference_engines import TFLiteEngine
+
+
+class _FakeInterpreter:
+    """Stands in for the TFLite interpreter; 'predicts' each row's first pixel."""
+
+    instances = []
+
+    def __init__(self, model_path=None, num_threads=None):
+        self.shape = [1, 4, 4, 3]
+        self.allocations = 0
+        self.invoked_shapes = []
+        self._input = None
+        _FakeInterpreter.instances.append(self)
+
+    def get_input_details(self):
+        return [{"index": 0, "shape": np.array(self.shape), "dtype": np.float32, "quantization": (0.0, 0)}]
+
+    def get_output_details(self):
+        return [{"index": 1, "dtype": np.float32, "quantization": (0.0, 0)}]
+
+    def resize_tensor_input(self, index, shape):
+        self.shape = list(shape)
+
+    def allocate_tensors(self):
+        self.allocations += 1
+
+    def set_tensor(self, index, value):
+        assert list(value.shape) == self.shape
+        self._input = value
+
+    def invoke(self):
+        self.invoked_shapes.append(self._input.shape[0])
+
+    def get_tensor(self, index):
+        return self._input[:, 0, 0, :2]
+
+
+def test_tflite_pads_and_splits_batches_without_reallocating(monkeypatch):
+    runtime = types.ModuleType("tflite_runtime")
+    runtime.interpreter = types.SimpleNamespace(Interpreter=_FakeInterpreter)
+    monkeypatch.setitem(sys.modules, "tflite_runtime", runtime)
+    monkeypatch.setitem(sys.modules, "tflite_runtime.interpreter", runtime.interpreter)
+
+    engine = TFLiteEngine("model.tflite", max_batch_size=4)
+    interpreter = _FakeInterpreter.instances[-1]
+
+    for rows in (1, 3, 4, 9):
+        batch = np.arange(rows, dtype=np.float32)[:, None, None, None] * np.ones((rows, 4, 4, 3), np.float32)
+        preds = engine.predict(batch)
+        assert preds.shape == (rows, 2)
+        assert preds[:, 0].tolist() == list(range(rows))
+
+    assert interpreter.allocations == 1
+    assert set(interpreter.invoked_shapes) == {4}
@@ -0,0 +1,85 @@
+# tests/test_inference_queue.py
+import threading
+import time
+
+import numpy as np
+
+from backend.ml_models.inference_queue import InferenceScheduler
+
+
+def _fake_model(calls):
+    def predict(batch):
+        calls.append(batch.shape[0])
+        time.sleep(0.02)
+        # Each row "predicts" the class equal to its pixel value
+        values = batch.reshape(batch.shape[0], -1)[:, 0].astype(int)
+        out = np.zeros((batch.shape[0], 4))
+        out[np.arange(batch.shape[0]), values] = 1.0
+        return out
+    return predict
+
+
+def test_concurrent_requests_are_batched_and_routed_back():
+    calls = []
+    scheduler = InferenceScheduler(_fake_model(calls), max_batch_size=4, max_wait_ms=50)
+    results = {}
+
+    def worker(i):
+        img = np.full((1, 2, 2, 3), i % 4, dtype=np.float32)
+        results[i] = int(np.argmax(scheduler.predict(img, timeout=5)))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {i: i % 4 for i in range(8)}
+    assert max(calls) <= 4
+    assert len(calls) < 8
+
+    stats = scheduler.stats()
+    assert stats["requests"] == 8
+    assert stats["batches"] == len(calls)
+    assert stats["queue_depth"] == 0
+
+
+def test_model_errors_reach_every_caller():
+    def broken(batch):
+        raise RuntimeError("boom")
+
+    scheduler = InferenceScheduler(broken, max_batch_size=2, max_wait_ms=1)
+    future = scheduler.submit(np.zeros((2, 2, 3)))
+    try:
+        future.result(timeout=5)
+    except RuntimeError as e:
+        assert "boom" in str(e)
+    else:
+        raise AssertionError("expected RuntimeError")
+    assert scheduler.stats()["errors"] == 1
+
+
+def test_submit_batch_runs_block_in_one_pass_and_keeps_order():
+    calls = []
+    scheduler = InferenceScheduler(_fake_model(calls), max_batch_size=4, max_wait_ms=1)
+    block = [np.full((2, 2, 3), i % 4, dtype=np.float32) for i in range(10)]
+
+    preds = scheduler.run_batch(block, timeout=5)
+
+    assert preds.shape == (10, 4)
+    assert list(np.argmax(preds, axis=1)) == [i % 4 for i in range(10)]
+    # Larger than max_batch_size, but never split
+    assert calls == [10]
+    assert scheduler.stats()["requests"] == 10
+
+
+def test_single_requests_do_not_join_a_full_block():
+    calls = []
+    scheduler = InferenceScheduler(_fake_model(calls), max_batch_size=4, max_wait_ms=50)
+    block_future = scheduler.submit_batch(np.zeros((3, 2, 2, 3), dtype=np.float32))
+    singles = [scheduler.submit(np.full((2, 2, 3), 1, dtype=np.float32)) for _ in range(2)]
+
+    assert block_future.result(timeout=5).shape == (3, 4)
+    assert [int(np.argmax(f.result(timeout=5))) for f in singles] == [1, 1]
+    assert max(calls) <= 4
+    assert sum(calls) == 5
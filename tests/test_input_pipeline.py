@@ -0,0 +1,64 @@
+# tests/test_input_pipeline.py
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+tf = pytest.importorskip("tensorflow")
+
+from tensorflow.keras.preprocessing.image import ImageDataGenerator  # noqa: E402
+
+from backend.ml_models.data_preparation.input_pipeline import (  # noqa: E402
+    build_dataset, list_image_files, make_datasets,
+)
+
+
+def _dataset(root):
+    # Uneven classes, a nested folder and a non-image file, like the raw data
+    layout = {"Maize___Blight": 7, "Maize___Healthy": 5, "Plantain___Black_Sigatoka": 11}
+    for i, (name, count) in enumerate(layout.items()):
+        for j in range(count):
+            folder = os.path.join(root, name, "field_b" if j % 3 == 0 else "")
+            os.makedirs(folder, exist_ok=True)
+            color = np.full((30, 40, 3), (i * 80, j * 20, 100), dtype=np.uint8)
+            Image.fromarray(color).save(os.path.join(folder, f"img_{j:02d}.{'png' if j % 2 else 'jpg'}"))
+    with open(os.path.join(root, "Maize___Healthy", "notes.txt"), "w") as f:
+        f.write("not an image")
+    return str(root)
+
+
+@pytest.mark.parametrize("subset", ["training", "validation"])
+def test_same_files_and_class_indices_as_flow_from_directory(tmp_path, subset):
+    data_dir = _dataset(tmp_path)
+    gen = ImageDataGenerator(validation_split=0.2).flow_from_directory(
+        data_dir, target_size=(8, 8), subset=subset, shuffle=False,
+    )
+    paths, labels, class_indices = list_image_files(data_dir, subset, validation_split=0.2)
+
+    assert class_indices == gen.class_indices
+    assert [os.path.relpath(p, data_dir) for p in paths] == [os.path.normpath(f) for f in gen.filenames]
+    assert labels == list(gen.classes)
+
+
+def test_batches_are_scaled_images_with_one_hot_labels(tmp_path):
+    data_dir = _dataset(tmp_path)
+    paths, labels, class_indices = list_image_files(data_dir)
+    ds = build_dataset(paths, labels, len(class_indices), img_size=(16, 16), batch_size=4)
+
+    images, onehot = next(iter(ds))
+    assert images.shape == (4, 16, 16, 3) and images.dtype == tf.float32
+    assert 0.0 <= float(tf.reduce_min(images)) and float(tf.reduce_max(images)) <= 1.0
+    assert onehot.numpy().argmax(axis=1).tolist() == labels[:4]
+
+
+def test_training_split_with_disk_cache_covers_every_image(tmp_path):
+    data_dir = _dataset(tmp_path / "images")
+    train_ds, val_ds, class_indices = make_datasets(
+        data_dir, img_size=(16, 16), batch_size=5, cache=str(tmp_path / "cache"),
+    )
+    for _ in range(2):
+        seen = sum(int(labels.shape[0]) for _, labels in train_ds)
+        assert seen == len(list_image_files(data_dir, "training")[0])
+    assert sum(int(labels.shape[0]) for _, labels in val_ds) == len(list_image_files(data_dir, "validation")[0])
+    assert os.listdir(tmp_path / "cache")
@@ -0,0 +1,158 @@
+# tests/test_job_queue.py
+import sqlite3
+import threading
+import time
+
+from backend.utils.job_queue import JobQueue, JobQueueFull
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_worker_pool_bounds_concurrency(tmp_path):
+    lock = threading.Lock()
+    active, peak, done = [0], [0], []
+
+    def handler(payload):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+            done.append(payload["n"])
+
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), handler, workers=3)
+    queue.start()
+    for n in range(15):
+        queue.submit({"n": n})
+
+    assert _wait_for(lambda: len(done) == 15)
+    assert peak[0] <= 3
+    stats = queue.stats()
+    assert stats["completed"] == 15 and stats["pending"] == 0
+    assert stats["run_seconds"]["avg"] is not None
+    queue.stop()
+
+
+def test_backpressure_and_limit(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), lambda p: None, max_in_flight=2, max_queued=3)
+    # Not started: jobs only accumulate
+    assert queue.submit({"n": 1})[1:] == (1, False)
+    assert queue.submit({"n": 2})[1:] == (2, False)
+    assert queue.submit({"n": 3})[1:] == (3, True)
+    try:
+        queue.submit({"n": 4})
+    except JobQueueFull:
+        pass
+    else:
+        raise AssertionError("expected JobQueueFull")
+    assert queue.stats()["rejected"] == 1
+
+
+def test_jobs_survive_restart(tmp_path):
+    db = str(tmp_path / "jobs.sqlite3")
+    first = JobQueue(db, lambda p: None)
+    first.submit({"n": 1})
+    first.submit({"n": 2})
+    # Simulate a job that was mid-flight when the process died
+    first._db.execute("UPDATE jobs SET status = 'running', attempts = 1 WHERE id = 1")
+
+    seen = []
+    second = JobQueue(db, lambda p: seen.append(p["n"]), workers=1)
+    second.start()
+    assert _wait_for(lambda: len(seen) == 2)
+    assert sorted(seen) == [1, 2]
+    assert second.resumed == 1
+    second.stop()
+
+
+def test_checkpoints_survive_retries_and_restarts(tmp_path):
+    db = str(tmp_path / "jobs.sqlite3")
+    runs = []
+
+    def handler(payload):
+        queue = first if not runs else second
+        job_id = queue.current_job_id()
+        runs.append(sorted(queue.checkpoints(job_id)))
+        queue.checkpoint(job_id, "progress")
+        queue.checkpoint(job_id, "progress")
+        if len(runs) == 1:
+            raise RuntimeError("crash after the progress note")
+
+    first = JobQueue(db, handler, workers=1, retry_base_seconds=60)
+    first.submit({"n": 1})
+    first.start()
+    assert _wait_for(lambda: first.stats()["pending"] == 1 and runs)
+    first.stop()
+    assert first.current_job_id() is None
+
+    # A restarted process sees what the interrupted attempt already did
+    first._db.execute("UPDATE jobs SET run_after = 0")
+    second = JobQueue(db, handler, workers=1)
+    second.start()
+    assert _wait_for(lambda: second.stats()["completed"] == 1)
+    second.stop()
+    assert runs == [[], ["progress"]]
+
+
+def test_failing_job_is_retried_then_completes(tmp_path):
+    attempts = []
+
+    def flaky(payload):
+        attempts.append(payload["n"])
+        if len(attempts) < 3:
+            raise RuntimeError("pipeline down")
+
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), flaky, workers=1, retry_base_seconds=0.01)
+    queue.start()
+    queue.submit({"n": 1})
+
+    assert _wait_for(lambda: queue.stats()["completed"] == 1)
+    assert attempts == [1, 1, 1]
+    stats = queue.stats()
+    assert stats["retried"] == 2 and stats["failed"] == 0 and stats["pending"] == 0
+    queue.stop()
+
+
+def test_job_failing_every_attempt_is_failed_and_reported_once(tmp_path):
+    failures = []
+
+    def broken(payload):
+        raise RuntimeError("pipeline down")
+
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), broken, workers=2, max_attempts=3,
+                     retry_base_seconds=0.01, on_failure=lambda payload, error: failures.append((payload, error)))
+    queue.start()
+    queue.submit({"sender": "whatsapp:+237600000000"})
+
+    assert _wait_for(lambda: queue.stats()["failed_stored"] == 1)
+    assert _wait_for(lambda: len(failures) == 1)
+    assert failures == [({"sender": "whatsapp:+237600000000"}, "pipeline down")]
+    assert queue.stats()["retried"] == 2
+    queue.stop()
+
+
+def test_database_from_before_retries_is_upgraded(tmp_path):
+    db = str(tmp_path / "jobs.sqlite3")
+    old = sqlite3.connect(db)
+    old.execute(
+        "CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, "
+        "status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, "
+        "started_at REAL, finished_at REAL, error TEXT)"
+    )
+    old.execute("INSERT INTO jobs (payload, created_at) VALUES ('{\"n\": 7}', 0)")
+    old.commit()
+    old.close()
+
+    seen = []
+    queue = JobQueue(db, lambda p: seen.append(p["n"]), workers=1)
+    queue.start()
+    assert _wait_for(lambda: seen == [7])
+    queue.stop()
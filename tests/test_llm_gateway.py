@@ -0,0 +1,109 @@
+# tests/test_llm_gateway.py
+import threading
+import time
+
+import pytest
+
+from backend.utils import ai_advisor
+from backend.utils.advice_cache import AdviceCache
+from backend.utils.llm_gateway import LLMGateway, LLMOverloaded
+
+
+def _hold(gateway, seconds, results):
+    try:
+        with gateway.admit(deadline_seconds=10):
+            time.sleep(seconds)
+        results.append("ran")
+    except LLMOverloaded as e:
+        results.append(e.reason)
+
+
+def test_limits_concurrency_and_sheds_when_queue_is_full():
+    gateway = LLMGateway(max_concurrent=1, max_queue=1, expected_seconds=0.1)
+    results = []
+    threads = [threading.Thread(target=_hold, args=(gateway, 0.2, results)) for _ in range(3)]
+    for t in threads:
+        t.start()
+        time.sleep(0.02)
+    assert gateway.stats()["active"] == 1
+    for t in threads:
+        t.join()
+
+    assert sorted(results) == ["queue_full", "ran", "ran"]
+    stats = gateway.stats()
+    assert stats["completed"] == 2 and stats["shed"]["queue_full"] == 1
+    assert stats["peak_waiting"] == 1
+
+
+def test_sheds_immediately_when_deadline_cannot_be_met():
+    gateway = LLMGateway(max_concurrent=1, max_queue=10, expected_seconds=5)
+    slot = gateway.admit(deadline_seconds=60)
+    started = time.monotonic()
+    with pytest.raises(LLMOverloaded) as excinfo:
+        gateway.admit(deadline_seconds=8)  # 5 s wait + 5 s generation > 8 s
+    assert excinfo.value.reason == "deadline"
+    assert time.monotonic() - started < 0.05
+    slot.release()
+    assert gateway.stats()["utilization"] == 0
+
+
+def test_waiting_caller_gives_up_before_its_deadline():
+    gateway = LLMGateway(max_concurrent=1, max_queue=10, expected_seconds=0.1)
+    slot = gateway.admit()
+    started = time.monotonic()
+    with pytest.raises(LLMOverloaded) as excinfo:
+        gateway.admit(deadline_seconds=0.3)
+    assert excinfo.value.reason == "timeout"
+    assert 0.15 < time.monotonic() - started < 0.3
+    slot.release()
+
+
+def test_idle_admit_lets_live_callers_go_first():
+    gateway = LLMGateway(max_concurrent=1, max_queue=4, expected_seconds=0.1)
+    order = []
+    live = gateway.admit()
+
+    def background():
+        with gateway.admit_when_idle(wait_seconds=5, deadline_seconds=1) as slot:
+            order.append(("background", slot.remaining() <= 1))
+
+    def queued():
+        with gateway.admit(deadline_seconds=10):
+            order.append("live")
+
+    threads = [threading.Thread(target=background), threading.Thread(target=queued)]
+    for t in threads:
+        t.start()
+        time.sleep(0.05)
+    assert gateway.stats()["waiting"] == 1  # the background caller takes no queue position
+    live.release()
+    for t in threads:
+        t.join()
+    assert order == ["live", ("background", True)]
+
+
+def test_advise_falls_back_to_rules_when_llm_is_saturated(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_advisor, "advice_cache", AdviceCache(str(tmp_path / "advice.sqlite3")))
+    monkeypatch.setattr(ai_advisor, "llm_gateway", LLMGateway(max_concurrent=1, max_queue=0))
+    monkeypatch.setattr(ai_advisor, "_call_llm", lambda prompt, deadline=None: "Spray fungicide.")
+
+    assert ai_advisor.advise("Maize", "Maize___Blight", "Rain") == {
+        "advice": ["Spray fungicide."], "advisor": "llm"}
+    assert ai_advisor.advise("Maize", "Maize___Blight", "Rain")["advisor"] == "cache"
+
+    slot = ai_advisor.llm_gateway.admit()
+    result = ai_advisor.advise("Maize", "Maize___Rust", "Rain")
+    slot.release()
+    assert result["advisor"] == "rules" and result["reason"] == "queue_full"
+    assert "Use resistant maize varieties if available." in result["advice"]
+
+
+def test_streamed_advice_sheds_to_rules(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_advisor, "advice_cache", AdviceCache(str(tmp_path / "advice.sqlite3")))
+    monkeypatch.setattr(ai_advisor, "llm_gateway", LLMGateway(max_concurrent=1, max_queue=0))
+    slot = ai_advisor.llm_gateway.admit()
+    info = {}
+    fragments = list(ai_advisor.stream_ai_advice("Plantain", "Plantain___Black_Sigatoka", "Clear", info=info))
+    slot.release()
+    assert info == {"advisor": "rules", "reason": "queue_full"}
+    assert fragments[0].startswith("Prune affected leaves")
@@ -0,0 +1,108 @@
+# tests/test_message_splitter.py
+import random
+import re
+
+from backend.utils.message_splitter import encoded_length, part_label, safe_cut, split_message
+
+WORDS = ["maize", "blight", "spray", "fungicide", "€5", "[dose]", "humid", "🌽", "🌧️",
+         "👨‍🌾", "🇨🇲", "leaf", "rot", "naïve", "é", "water", "early", "morning"]
+
+
+def _random_text(rng, n_words):
+    out = []
+    for _ in range(n_words):
+        out.append(rng.choice(WORDS))
+        r = rng.random()
+        out.append("\n\n" if r < 0.03 else "\n" if r < 0.06 else ". " if r < 0.15 else " ")
+    return "".join(out)
+
+
+def _strip_label(part, total):
+    for i in range(1, total + 1):
+        if part.startswith(part_label(i, total)):
+            return part[len(part_label(i, total)):]
+    return part
+
+
+def _words(text):
+    return re.split(r"\s+", text.strip())
+
+
+def test_short_message_is_untouched():
+    assert split_message("  hello farmer  ") == ["hello farmer"]
+
+
+def test_random_texts_fit_and_keep_every_word():
+    rng = random.Random(1234)
+    for _ in range(200):
+        text = _random_text(rng, rng.randint(50, 900))
+        parts = split_message(text, max_len=400, max_parts=20)
+        assert len(parts) <= 20
+        assert all(encoded_length(p) <= 400 for p in parts)
+        body = [_strip_label(p, len(parts)) for p in parts] if len(parts) > 1 else parts
+        assert _words(" ".join(body)) == _words(text)
+
+
+def _reference_part_count(words, max_len, max_parts):
+    """Word-level greedy packing with exact lengths; optimal for fixed budgets."""
+    for total in range(1, max_parts + 1):
+        budgets = [max_len - (len(part_label(i, total)) if total > 1 else 0) for i in range(1, total + 1)]
+        k = 0
+        for budget in budgets:
+            current = []
+            while k < len(words) and encoded_length(" ".join(current + [words[k]])) <= budget:
+                current.append(words[k])
+                k += 1
+        if k == len(words):
+            return total
+    return None
+
+
+def test_uses_fewest_parts():
+    rng = random.Random(99)
+    plain = [w for w in WORDS if not any(c in "€[]" for c in w)]
+    for _ in range(100):
+        words = [rng.choice(plain) for _ in range(rng.randint(50, 400))]
+        parts = split_message(" ".join(words), max_len=300, max_parts=30)
+        assert len(parts) == _reference_part_count(words, 300, 30)
+
+
+def test_emoji_counts_as_ucs2_and_is_never_split():
+    text = "👨‍👩‍👧 " * 400
+    parts = split_message(text, max_len=160, max_parts=50)
+    for p in parts:
+        assert encoded_length(p) <= 160
+        body = _strip_label(p, len(parts))
+        assert body.replace("👨‍👩‍👧", "").strip() == ""
+
+
+def test_long_token_is_hard_cut_on_grapheme_boundary():
+    text = "🇨🇲" * 300
+    parts = split_message(text, max_len=100, max_parts=20)
+    assert "".join(_strip_label(p, len(parts)) for p in parts) == text
+    for p in parts:
+        assert encoded_length(p) <= 100
+        assert len(_strip_label(p, len(parts))) % 2 == 0
+
+
+def test_truncates_with_ellipsis_past_max_parts():
+    text = "word " * 5000
+    parts = split_message(text, max_len=1600, max_parts=5)
+    assert len(parts) == 5
+    assert parts[-1].endswith("...")
+    assert all(encoded_length(p) <= 1600 for p in parts)
+
+
+def test_prefers_paragraph_boundaries():
+    para = "Sentence number one is here. " * 20
+    text = "\n\n".join([para.strip()] * 4)
+    parts = split_message(text, max_len=1600, max_parts=5)
+    assert len(parts) == 2
+    assert all(_strip_label(p, 2).endswith(".") for p in parts)
+
+
+def test_safe_cut_keeps_zwj_sequences_together():
+    text = "ab👨‍🌾cd"
+    zwj = text.index("‍")
+    assert safe_cut(text, zwj) == 2
+    assert safe_cut(text, zwj + 1) == 2
@@ -0,0 +1,104 @@
+# tests/test_model_manager.py
+import threading
+
+from flask import Flask
+
+from backend.ml_models.model_manager import ModelManager, ModelNotReadyError
+from backend.routes import health
+
+
+def test_loads_in_background_and_reports_timings():
+    release = threading.Event()
+    warmed = []
+
+    def loader():
+        release.wait(5)
+        return {"model": "fake"}
+
+    manager = ModelManager("fake", loader, warmup=lambda res: warmed.append(res["model"]))
+    manager.start()
+    assert manager.state == "loading"
+    try:
+        manager.get()
+    except ModelNotReadyError:
+        pass
+    else:
+        raise AssertionError("expected ModelNotReadyError")
+
+    release.set()
+    assert manager.wait_until_ready(timeout=5)
+    assert manager.get() == {"model": "fake"}
+    assert warmed == ["fake"]
+    status = manager.status()
+    assert status["ready"] and status["load_seconds"] is not None
+    assert status["warmup_seconds"] is not None
+
+
+def test_failed_load_is_reported():
+    def loader():
+        raise FileNotFoundError("missing.h5")
+
+    manager = ModelManager("broken", loader)
+    assert not manager.wait_until_ready(timeout=5)
+    assert manager.state == "failed"
+    assert "missing.h5" in manager.status()["error"]
+
+
+def test_routes_answer_503_until_ready(monkeypatch):
+    manager = ModelManager("fake", lambda: {})
+    monkeypatch.setattr(health, "model_manager", manager)
+
+    app = Flask(__name__)
+    app.register_blueprint(health.health_bp)
+
+    @app.route("/predict")
+    @health.require_model_ready
+    def predict():
+        return "ok"
+
+    client = app.test_client()
+    res = client.get("/predict")
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == str(health.RETRY_AFTER_SECONDS)
+    assert client.get("/healthz/ready").status_code == 503
+
+    manager.wait_until_ready(timeout=5)
+    assert client.get("/predict").data == b"ok"
+    assert client.get("/healthz/ready").get_json()["ready"] is True
+
+
+def test_preloads_run_with_the_model_and_failures_are_isolated():
+    loaded = []
+    manager = ModelManager("fake", lambda: {"labels": ["Maize___Blight"]})
+    manager.add_preload("labels", lambda res: loaded.append(res["labels"]))
+    manager.add_preload("broken", lambda res: 1 / 0)
+    assert manager.wait_until_ready(timeout=5)
+
+    assert loaded == [["Maize___Blight"]]
+    status = manager.status()["preloads"]
+    assert status["labels"]["error"] is None and "division" in status["broken"]["error"]
+
+    # Registered after loading: runs right away
+    manager.add_preload("late", lambda res: loaded.append("late"))
+    assert loaded[-1] == "late"
+
+
+def test_routes_report_a_failed_load_without_retry_after(monkeypatch):
+    def loader():
+        raise FileNotFoundError("missing.h5")
+
+    manager = ModelManager("broken", loader)
+    monkeypatch.setattr(health, "model_manager", manager)
+    assert not manager.wait_until_ready(timeout=5)
+
+    app = Flask(__name__)
+
+    @app.route("/predict")
+    @health.require_model_ready
+    def predict():
+        return "ok"
+
+    res = app.test_client().get("/predict")
+    assert res.status_code == 503
+    assert "Retry-After" not in res.headers
+    assert "failed to load" in res.get_json()["message"] and "missing.h5" in res.get_json()["message"]
@@ -0,0 +1,62 @@
+# tests/test_prediction_cache.py
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+from backend.ml_models.prediction_cache import PredictionCache, content_hash, dhash, hamming_distance
+
+
+def _leaf(seed=0):
+    rng = np.random.default_rng(seed)
+    base = np.linspace(0, 255, 224, dtype=np.float32)
+    pixels = np.stack([np.add.outer(base, base) / 2] * 3, axis=-1)
+    pixels += rng.normal(0, 20, pixels.shape)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def _jpeg(img, quality):
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def test_recompressed_image_is_near_duplicate():
+    img = _leaf()
+    original = Image.open(io.BytesIO(_jpeg(img, 95)))
+    recompressed = Image.open(io.BytesIO(_jpeg(img, 40)))
+    assert content_hash(_jpeg(img, 95)) != content_hash(_jpeg(img, 40))
+    assert hamming_distance(dhash(original), dhash(recompressed)) <= 4
+    assert hamming_distance(dhash(original), dhash(_leaf(seed=1).transpose(Image.FLIP_LEFT_RIGHT))) > 4
+
+
+def test_exact_and_perceptual_tiers():
+    cache = PredictionCache(max_entries=4, ttl_seconds=60, max_distance=4)
+    result = {"predicted_label": "Maize___Blight"}
+    cache.put("abc", 0b1010, result)
+
+    assert cache.get_exact("abc") is result
+    assert cache.get_exact("other") is None
+    assert cache.get_perceptual(0b1011) is result   # 1 bit away
+    assert cache.get_perceptual(0xFFFF) is None
+
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["perceptual_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_lru_and_ttl_eviction():
+    cache = PredictionCache(max_entries=2, ttl_seconds=60, max_distance=-1)
+    cache.put("a", None, 1)
+    cache.put("b", None, 2)
+    cache.get_exact("a")          # "b" becomes least recently used
+    cache.put("c", None, 3)
+    assert cache.get_exact("b") is None
+    assert cache.get_exact("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+    short = PredictionCache(ttl_seconds=0.01)
+    short.put("a", None, 1)
+    time.sleep(0.02)
+    assert short.get_exact("a") is None
+    assert short.stats()["expirations"] == 1
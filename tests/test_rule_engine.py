@@ -0,0 +1,78 @@
+# tests/test_rule_engine.py
+import json
+import os
+
+from backend.utils.advisory_rules import RuleEngine, get_disease_advice, rule_key
+
+
+def _write(path, data, mtime):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+RULES = {
+    "version": 1,
+    "diseases": [
+        {"crop": "Maize", "label": "Maize___Blight", "keywords": ["blight"], "advice": ["copper"],
+         "weather": [{"when": {"condition_in": ["Rain"]}, "advice": ["scout often"]}]},
+    ],
+    "weather": [
+        {"when": {"contains": ["rain"]}, "advice": ["no spraying before rain"]},
+        {"when": {}, "advice": ["monitor"]},
+    ],
+}
+
+
+def test_keys_match_cnn_labels():
+    assert rule_key("Maize", "Maize___Blight") == rule_key("maize ", "blight") == ("maize", "blight")
+    assert rule_key("Plantain", "Black Sigatoka") == ("plantain", "black_sigatoka")
+
+
+def test_shipped_rules_cover_the_old_advice():
+    advice = get_disease_advice("Maize", "Maize___Common_Rust", "Clear")
+    assert advice == ["Use resistant maize varieties if available.",
+                      "Apply Mancozeb or Propiconazole at early infection.",
+                      "Monitor soil moisture and weather regularly."]
+    assert "Prune affected leaves and destroy them." in get_disease_advice("plantain", "black_sigatoka", "Rain")
+    assert get_disease_advice("Cassava", "Cassava___Mosaic", "Clouds") == ["Monitor soil moisture and weather regularly."]
+
+
+def test_weather_predicates_and_keyword_fallback(tmp_path):
+    path = tmp_path / "rules.json"
+    _write(path, RULES, 1000)
+    engine = RuleEngine(str(path), reload_seconds=0)
+
+    assert engine.get_advice("Maize", "Maize___Blight", "Rain") == ["copper", "scout often", "no spraying before rain"]
+    assert engine.get_advice("Maize", "Maize___Blight", "Clear") == ["copper", "monitor"]
+    # Label not listed exactly: resolved through the "blight" keyword
+    assert engine.get_advice("Maize", "Maize___Northern_Leaf_Blight", "light rain") == ["copper", "no spraying before rain"]
+
+
+def test_hot_reload_and_invalid_file_keeps_previous_rules(tmp_path):
+    path = tmp_path / "rules.json"
+    _write(path, RULES, 1000)
+    engine = RuleEngine(str(path), reload_seconds=0)
+
+    updated = dict(RULES, diseases=[dict(RULES["diseases"][0], advice=["new fungicide"])])
+    _write(path, updated, 2000)
+    assert engine.get_advice("Maize", "Maize___Blight", "Clear")[0] == "new fungicide"
+
+    path.write_text("{ not json", encoding="utf-8")
+    os.utime(path, (3000, 3000))
+    assert engine.get_advice("Maize", "Maize___Blight", "Clear")[0] == "new fungicide"
+    assert engine.stats()["reload_errors"] == 1
+
+
+def test_batch_evaluation_matches_single_lookups(tmp_path):
+    path = tmp_path / "rules.json"
+    _write(path, RULES, 1000)
+    engine = RuleEngine(str(path), reload_seconds=60)
+    batch = [("Maize", "Maize___Blight", "Rain"),
+             {"crop": "Maize", "predicted_label": "Maize___Blight", "weather_summary": "Clear"},
+             ("Maize", "Maize___Blight", "Rain")]
+    results = engine.evaluate_batch(batch)
+    assert results == [engine.get_advice("Maize", "Maize___Blight", "Rain"),
+                       engine.get_advice("Maize", "Maize___Blight", "Clear"),
+                       engine.get_advice("Maize", "Maize___Blight", "Rain")]
+    results[0].append("mutated")
+    assert results[2][-1] != "mutated"
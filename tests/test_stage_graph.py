@@ -0,0 +1,61 @@
+# tests/test_stage_graph.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.utils.stage_graph import StageGraph, server_timing_header
+
+executor = ThreadPoolExecutor(max_workers=4)
+
+
+def test_independent_stages_run_concurrently():
+    def slow(value):
+        def fn(results):
+            time.sleep(0.2)
+            return value
+        return fn
+
+    graph = StageGraph(executor)
+    graph.add("disease", slow("blight"))
+    graph.add("weather", slow("rain"))
+    graph.add("advice", lambda r: f"{r['disease']}+{r['weather']}", deps=("disease", "weather"))
+    results, timings = graph.run()
+
+    assert results["advice"] == "blight+rain"
+    # Both 200 ms stages overlap: the critical path is ~200 ms, not 400 ms
+    assert timings["total_ms"] < 350
+    assert timings["advice"]["start_ms"] >= 190
+    assert all(timings[name]["status"] == "ok" for name in ("disease", "weather", "advice"))
+
+
+def test_timeout_and_error_fall_back_to_partial_results():
+    graph = StageGraph(executor)
+    graph.add("weather", lambda r: time.sleep(1) or "late", timeout=0.05, fallback={"error": "timeout"})
+    graph.add("disease", lambda r: 1 / 0, fallback=lambda e: {"error": type(e).__name__})
+    graph.add("advice", lambda r: (r["weather"], r["disease"]), deps=("weather", "disease"))
+    results, timings = graph.run()
+
+    assert results["advice"] == ({"error": "timeout"}, {"error": "ZeroDivisionError"})
+    assert timings["weather"]["status"] == "timeout"
+    assert timings["disease"]["status"] == "error"
+    assert timings["total_ms"] < 500
+    assert "weather;dur=" in server_timing_header(timings)
+
+
+def test_stage_timeout_starts_when_the_stage_runs_and_inline_stages_keep_workers_free():
+    pool = ThreadPoolExecutor(max_workers=1)
+    blocker = pool.submit(time.sleep, 0.2)  # another request's work ahead in the queue
+    graph = StageGraph(pool)
+    graph.add("weather", lambda r: time.sleep(0.05) or "rain", timeout=0.15)
+    advice_threads = []
+    graph.add("advice", lambda r: advice_threads.append(threading.current_thread()) or time.sleep(0.1)
+              or f"advice for {r['weather']}", deps=("weather",), timeout=0.05, inline=True)
+    results, timings = graph.run()
+    blocker.result()
+
+    # Queued ~200 ms behind the blocker, but ran in 50 ms: not a timeout
+    assert results["weather"] == "rain" and timings["weather"]["status"] == "ok"
+    assert timings["weather"]["start_ms"] >= 190 and timings["weather"]["duration_ms"] < 150
+    assert results["advice"] == "advice for rain" and timings["advice"]["status"] == "timeout"
+    # The inline stage ran on this thread, not on a pool worker
+    assert advice_threads == [threading.current_thread()]
@@ -0,0 +1,73 @@
+# tests/test_treatment_index.py
+import json
+import os
+
+from backend.utils.treatment_index import TreatmentIndex, normalize_label
+
+
+def _write(path, data, mtime):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_lookups_are_normalized_to_label_encoder_keys(tmp_path):
+    path = tmp_path / "treatments.json"
+    _write(path, {"maize_blight": "copper spray", "Plantain Black-Sigatoka": "deleaf"}, 1000)
+    index = TreatmentIndex(str(path))
+
+    assert normalize_label("Maize___Blight") == "maize_blight"
+    assert index.get("Maize___Blight") == "copper spray"
+    assert index.get("Plantain___Black_Sigatoka") == "deleaf"
+    assert index.get("Maize___Rust", "none") == "none"
+    assert index.load(labels=["Maize___Blight", "Maize___Rust"]) == 2
+    assert index.stats()["missing_labels"] == ["Maize___Rust"]
+
+
+def test_reloads_only_when_content_changes(tmp_path):
+    path = tmp_path / "treatments.json"
+    _write(path, {"Maize___Blight": "v1"}, 1000)
+    index = TreatmentIndex(str(path), check_seconds=0)
+    assert index.get("Maize___Blight") == "v1"
+    loads = index.loads
+
+    _write(path, {"Maize___Blight": "v1"}, 2000)  # touched, same bytes
+    assert index.get("Maize___Blight") == "v1"
+    assert index.loads == loads
+
+    _write(path, {"Maize___Blight": "v2"}, 3000)
+    assert index.get("Maize___Blight") == "v2"
+    assert index.loads == loads + 1
+
+    path.write_text("{ broken", encoding="utf-8")
+    os.utime(path, (4000, 4000))
+    assert index.get("Maize___Blight") == "v2"
+    assert index.stats()["errors"] == 1
+
+
+def test_change_checks_are_throttled(tmp_path):
+    path = tmp_path / "treatments.json"
+    _write(path, {"Maize___Blight": "v1"}, 1000)
+    index = TreatmentIndex(str(path), check_seconds=60)
+    for _ in range(100):
+        index.get("Maize___Blight")
+    _write(path, {"Maize___Blight": "v2"}, 2000)
+    assert index.get("Maize___Blight") == "v1"
+    assert index.checks == 1
+
+
+def test_missing_file_gives_defaults(tmp_path):
+    index = TreatmentIndex(str(tmp_path / "missing.json"))
+    assert index.get("Maize___Blight", "n/a") == "n/a"
+
+
+def test_missing_file_is_not_counted_as_a_load(tmp_path, capsys):
+    path = tmp_path / "treatments.json"
+    index = TreatmentIndex(str(path), check_seconds=0)
+    for _ in range(5):
+        assert index.get("Maize___Blight") is None
+    assert index.loads == 0 and index.checks == 5
+    assert capsys.readouterr().out.count("not found") == 1
+
+    _write(path, {"Maize___Blight": "v1"}, 1000)
+    assert index.get("Maize___Blight") == "v1"
+    assert index.loads == 1
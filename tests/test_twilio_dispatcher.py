@@ -0,0 +1,80 @@
+# tests/test_twilio_dispatcher.py
+import time
+
+from backend.utils.fake_twilio import FakeTwilioClient
+from backend.utils.twilio_dispatcher import OutboundDispatcher, TokenBucket
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=2, capacity=2, now=0.0)
+    bucket.take(0.0)
+    bucket.take(0.0)
+    assert bucket.wait_time(0.0) == 0.5
+    assert bucket.wait_time(0.5) == 0.0
+    assert bucket.wait_time(100.0) == 0.0 and bucket.tokens == 2
+
+
+def test_send_returns_immediately_and_keeps_part_order():
+    fake = FakeTwilioClient(latency=0.01)
+    dispatcher = OutboundDispatcher(fake, "whatsapp:+1", global_rate=100, global_burst=100,
+                                    recipient_rate=50, recipient_burst=1)
+    started = time.monotonic()
+    for n in range(5):
+        dispatcher.send(f"whatsapp:+{n}", [f"{n}-a", f"{n}-b", f"{n}-c"])
+    assert time.monotonic() - started < 0.05
+
+    assert dispatcher.flush(timeout=5)
+    for n in range(5):
+        assert fake.bodies_for(f"whatsapp:+{n}") == [f"{n}-a", f"{n}-b", f"{n}-c"]
+    assert dispatcher.stats()["sent"] == 15
+
+
+def test_429_is_retried_without_blocking_other_recipients():
+    fake = FakeTwilioClient(latency=0.0, max_per_second=3)
+    dispatcher = OutboundDispatcher(fake, "whatsapp:+1", global_rate=100, global_burst=100,
+                                    recipient_rate=100, recipient_burst=5, retry_base_seconds=0.3)
+    dispatcher.send("whatsapp:+a", ["a1", "a2", "a3", "a4"])
+    dispatcher.send("whatsapp:+b", ["b1", "b2"])
+
+    assert dispatcher.flush(timeout=10)
+    assert fake.bodies_for("whatsapp:+a") == ["a1", "a2", "a3", "a4"]
+    assert fake.bodies_for("whatsapp:+b") == ["b1", "b2"]
+    assert fake.rejected_429 > 0
+    assert dispatcher.stats()["retries_429"] == fake.rejected_429
+
+
+def test_permanent_errors_call_on_failure():
+    fake = FakeTwilioClient(latency=0.0, max_body_length=5)
+    dispatcher = OutboundDispatcher(fake, "whatsapp:+1", recipient_rate=100)
+    failures = []
+    dispatcher.send("whatsapp:+a", ["ok", "way too long", "never sent"],
+                    on_failure=lambda to, reason: failures.append(to))
+    assert dispatcher.flush(timeout=5)
+    # on_failure runs on the send thread right after the queue drains
+    deadline = time.monotonic() + 1
+    while not failures and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert fake.bodies_for("whatsapp:+a") == ["ok"]
+    assert failures == ["whatsapp:+a"]
+
+
+def test_send_and_wait_reports_delivery():
+    fake = FakeTwilioClient(latency=0.01, max_body_length=5)
+    dispatcher = OutboundDispatcher(fake, "whatsapp:+1", recipient_rate=100, recipient_burst=5)
+
+    assert dispatcher.send_and_wait("whatsapp:+a", ["one", "two"], timeout=5) is True
+    assert fake.bodies_for("whatsapp:+a") == ["one", "two"]
+    assert dispatcher.send_and_wait("whatsapp:+b", ["ok", "way too long"], timeout=5) is False
+    assert dispatcher.send_and_wait("whatsapp:+c", [], timeout=5) is True
+
+
+def test_deliver_reports_accepted_parts_and_outcome():
+    fake = FakeTwilioClient(latency=0.01, max_body_length=5)
+    dispatcher = OutboundDispatcher(fake, "whatsapp:+1", recipient_rate=100, recipient_burst=5)
+    sent = []
+
+    assert dispatcher.deliver("whatsapp:+a", ["one", "two"], timeout=5, on_sent=sent.append) == "delivered"
+    assert sent == [0, 1]
+    assert dispatcher.deliver("whatsapp:+b", ["ok", "way too long", "x"], timeout=5) == "partial"
+    assert dispatcher.deliver("whatsapp:+c", ["way too long"], timeout=5) == "failed"
+    assert dispatcher.deliver("whatsapp:+d", ["slow"], timeout=0) == "queued"
@@ -0,0 +1,141 @@
+# tests/test_weather_cache.py
+import threading
+import time
+
+from backend.utils import weather_api
+from backend.utils.cache import TTLCache
+from backend.utils.weather_api import normalize_location
+from backend.utils.weather_store import WeatherStore
+
+
+def test_concurrent_misses_make_one_upstream_call():
+    cache = TTLCache("weather", ttl_seconds=60)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"main": {"temp": 21}}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_fetch(("bamenda", "CM"), fetch)))
+        for _ in range(20)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(results) == 20 and all(r["main"]["temp"] == 21 for r in results)
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["coalesced"] == 19
+
+    cache.get_or_fetch(("bamenda", "CM"), fetch)
+    assert cache.stats()["hits"] == 1 and len(calls) == 1
+
+
+def test_stale_value_served_while_revalidating():
+    cache = TTLCache("weather", ttl_seconds=0.05, stale_ttl_seconds=10)
+    values = iter(["old", "new"])
+    cache.get_or_fetch("k", lambda: next(values))
+    time.sleep(0.06)
+
+    assert cache.get_or_fetch("k", lambda: next(values)) == "old"
+    time.sleep(0.05)
+    assert cache.peek("k") == "new"
+    assert cache.stats()["stale_hits"] == 1 and cache.stats()["refreshes"] == 1
+
+
+def test_failures_are_not_cached():
+    cache = TTLCache("weather", ttl_seconds=60)
+
+    def broken():
+        raise ConnectionError("down")
+
+    for _ in range(2):
+        try:
+            cache.get_or_fetch("k", broken)
+        except ConnectionError:
+            pass
+    assert cache.stats()["errors"] == 2 and cache.peek("k") is None
+
+
+def test_force_refresh_keeps_the_entry_when_fetch_fails():
+    cache = TTLCache("weather", ttl_seconds=60)
+    cache.put("k", "old")
+
+    def broken():
+        raise ConnectionError("down")
+
+    try:
+        cache.force_refresh("k", broken)
+    except ConnectionError:
+        pass
+    assert cache.peek("k") == "old"
+    assert cache.force_refresh("k", lambda: "new") == "new" and cache.peek("k") == "new"
+    assert cache.stats()["refreshes"] == 2
+
+
+def test_location_normalization():
+    assert normalize_location("  Bamenda ", "cm") == normalize_location("bamenda", "CM")
+    assert normalize_location("Kumbo  Town") == ("kumbo town", "CM")
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+def _payload(dt, temp=22.5):
+    return {"dt": dt, "coord": {"lat": 5.96, "lon": 10.15}, "main": {"temp": temp, "humidity": 85, "pressure": 1013},
+            "wind": {"speed": 1.5}, "weather": [{"main": "Clouds"}]}
+
+
+def _patch_upstream(tmp_path, monkeypatch, payloads, logged):
+    upstream = iter(payloads)
+    store = WeatherStore(str(tmp_path / "weather"), fmt="csv", flush_rows=100, flush_seconds=60)
+    monkeypatch.setattr(weather_api.http, "get", lambda url, params=None, timeout=None: _Response(next(upstream)))
+    monkeypatch.setattr(weather_api, "weather_cache", TTLCache("weather", ttl_seconds=60))
+    monkeypatch.setattr(weather_api.geocode_cache, "learn", lambda *args: None)
+    monkeypatch.setattr(weather_api, "weather_store", store)
+    monkeypatch.setattr(weather_api, "_last_logged", {})
+    monkeypatch.setattr(weather_api, "log_weather_data", lambda record: logged.append(record) or True)
+    return store
+
+
+def test_weather_is_dated_by_observation_time_and_logged_once_per_fetch(tmp_path, monkeypatch):
+    logged = []
+    _patch_upstream(tmp_path, monkeypatch, [_payload(1740823200)], logged)
+
+    first = weather_api.get_weather("Bamenda")
+    second = weather_api.get_weather("Bamenda")     # cache hit: not a new observation
+
+    assert first["date"] == second["date"] == "2025-03-01 10:00:00"
+    assert [record["date"] for record in logged] == ["2025-03-01 10:00:00"]
+
+
+def test_repeated_observation_is_not_logged_again(tmp_path, monkeypatch):
+    logged = []
+    store = _patch_upstream(tmp_path, monkeypatch, [_payload(1740823200), _payload(1740823200),
+                                                    _payload(1740823800)], logged)
+    # Already stored before a restart
+    store.append({"date": "2025-03-01 09:50:00", "city": "Bamenda", "temp": 21.0})
+
+    for _ in range(3):
+        weather_api.weather_cache.invalidate()
+        weather_api.get_weather("Bamenda")
+
+    assert [record["date"] for record in logged] == ["2025-03-01 10:00:00", "2025-03-01 10:10:00"]
+
+    monkeypatch.setattr(weather_api, "_last_logged", {})
+    assert weather_api.log_observation("Bamenda", _payload(1740822600)) is False    # 09:50, stored
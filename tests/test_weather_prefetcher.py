@@ -0,0 +1,128 @@
+# tests/test_weather_prefetcher.py
+import time
+
+import pytest
+
+from backend.utils import weather_api
+from backend.utils.cache import TTLCache
+from backend.utils.weather_prefetcher import WeatherPrefetcher
+
+
+def _prefetcher(calls, fail=(), **kwargs):
+    def fake_weather(city, country, force_refresh=False):
+        calls.append(("weather", city, country, force_refresh))
+        if city in fail:
+            return None
+        return {"city": city, "temp": 24.0}
+
+    def fake_forecast(city, country):
+        calls.append(("forecast", city, country, False))
+        return [{"date": "2025-03-01", "temp": 24.0}]
+
+    kwargs.setdefault("calls_per_minute", 0)
+    return WeatherPrefetcher(get_weather=fake_weather, get_forecast=fake_forecast, **kwargs)
+
+
+def test_cycle_force_refreshes_every_city():
+    calls = []
+    prefetcher = _prefetcher(calls, cities=["Bamenda", "Buea"], country="CM")
+    prefetcher.run_cycle()
+
+    assert ("weather", "Bamenda", "CM", True) in calls and ("weather", "Buea", "CM", True) in calls
+    assert ("forecast", "Bamenda", "CM", False) in calls and ("forecast", "Buea", "CM", False) in calls
+    stats = prefetcher.stats()
+    assert stats["cycles"] == 1 and stats["refreshed"] == 2 and stats["forecasts"] == 2
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+@pytest.mark.parametrize("upstream_up", [True, False])
+def test_cached_weather_is_replaced_only_when_upstream_answers(monkeypatch, upstream_up):
+    key = weather_api.normalize_location("Bamenda", "CM")
+    cache = TTLCache("weather", ttl_seconds=600, stale_ttl_seconds=300)
+    old = {"dt": 1740822600, "main": {"temp": 20.0, "humidity": 80, "pressure": 1012},
+           "wind": {"speed": 1.0}, "weather": [{"main": "Rain"}]}
+    new = dict(old, dt=1740823200)
+    cache.put(key, old)
+
+    def fake_get(url, params=None, timeout=None):
+        if not upstream_up:
+            raise ConnectionError("OpenWeather down")
+        return _Response(new)
+
+    monkeypatch.setattr(weather_api, "weather_cache", cache)
+    monkeypatch.setattr(weather_api, "WEATHER_LOG_OBSERVATIONS", False)
+    monkeypatch.setattr(weather_api.http, "get", fake_get)
+    monkeypatch.setattr(weather_api.geocode_cache, "learn", lambda *args: None)
+    prefetcher = WeatherPrefetcher(cities=["Bamenda"], prefetch_forecast=False, calls_per_minute=0)
+    prefetcher.run_cycle()
+
+    assert cache.peek(key) == (new if upstream_up else old)
+    assert prefetcher.stats()["errors"] == (0 if upstream_up else 1)
+
+
+def test_failures_are_counted_and_do_not_stop_the_cycle():
+    calls = []
+    prefetcher = _prefetcher(calls, cities=["Nowhere", "Buea"], fail={"Nowhere"}, prefetch_forecast=False)
+    prefetcher.run_cycle()
+
+    assert [city for kind, city, _, _ in calls] == ["Nowhere", "Buea"]
+    assert not any(kind == "forecast" for kind, _, _, _ in calls)
+    stats = prefetcher.stats()
+    assert stats["errors"] == 1 and stats["refreshed"] == 1
+
+
+def test_interval_is_stretched_to_fit_the_daily_quota():
+    # 10 cities every 60s = 14400 calls/day against a budget of 1000
+    prefetcher = _prefetcher([], cities=[f"c{i}" for i in range(10)], interval_seconds=60,
+                             calls_per_day=2000, quota_share=0.5, prefetch_forecast=False)
+    stats = prefetcher.stats()
+    assert stats["interval_seconds"] > 60
+    assert stats["estimated_calls_per_day"] <= 1000
+
+
+def test_forecasts_are_thinned_to_fit_the_onecall_quota():
+    calls = []
+    prefetcher = _prefetcher(calls, cities=[f"c{i}" for i in range(10)], interval_seconds=600,
+                             calls_per_day=0, onecall_calls_per_day=100, quota_share=1.0,
+                             forecast_ttl_seconds=600)
+    assert prefetcher.forecast_every > 1
+    assert prefetcher.stats()["estimated_onecall_calls_per_day"] <= 100
+
+    for _ in range(prefetcher.forecast_every):
+        prefetcher.run_cycle()
+    assert sum(kind == "forecast" for kind, _, _, _ in calls) == 10
+
+
+def test_next_delay_stays_within_jitter():
+    prefetcher = _prefetcher([], cities=["Buea"], interval_seconds=100, jitter=0.2, calls_per_day=0)
+    delays = [prefetcher._next_delay() for _ in range(200)]
+    assert all(80 <= d <= 120 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_background_thread_runs_cycles_until_stopped():
+    calls = []
+    prefetcher = _prefetcher(calls, cities=["Buea"], interval_seconds=0.05, jitter=0.0,
+                             calls_per_day=0)
+    prefetcher.start()
+    prefetcher.start()
+    deadline = time.time() + 5
+    while prefetcher.stats()["cycles"] < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    prefetcher.stop()
+    prefetcher._thread.join(timeout=2)
+
+    assert prefetcher.stats()["cycles"] >= 2
+    assert not prefetcher._thread.is_alive()
@@ -0,0 +1,146 @@
+# tests/test_weather_store.py
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from backend.utils import logger
+from backend.utils.weather_store import WeatherStore
+
+
+def _record(city, date, temp=24.0):
+    return {"date": date, "city": city, "temp": temp, "humidity": 80, "pressure": 1012,
+            "wind_speed": 2.1, "condition": "Rain"}
+
+
+def test_records_are_buffered_until_flush_rows(tmp_path):
+    store = WeatherStore(str(tmp_path), fmt="csv", flush_rows=3, flush_seconds=60)
+    store.append(_record("Bamenda", "2025-03-01 10:00:00"))
+    store.append(_record("Bamenda", "2025-03-01 11:00:00"))
+    assert store.partitions() == []
+    assert store.stats()["buffered"] == 2
+
+    store.append(_record("Bamenda", "2025-03-01 12:00:00"))
+    assert store.stats()["buffered"] == 0
+    assert store.stats()["flushes"] == 1
+    assert len(pd.read_csv(store.partitions()[0])) == 3
+
+
+def test_interval_flush(tmp_path):
+    store = WeatherStore(str(tmp_path), fmt="csv", flush_rows=100, flush_seconds=0.05)
+    store.append(_record("Buea", "2025-03-01 10:00:00"))
+    deadline = time.time() + 2
+    while store.stats()["rows_written"] == 0 and time.time() < deadline:
+        time.sleep(0.02)
+    assert store.stats()["rows_written"] == 1
+    assert len(store.partitions()) == 1
+
+
+def test_exit_flush_is_registered_once_across_flusher_restarts(tmp_path, monkeypatch):
+    from backend.utils import weather_store as module
+
+    registered = []
+    monkeypatch.setattr(module.atexit, "register", registered.append)
+    store = WeatherStore(str(tmp_path), fmt="csv", flush_rows=100, flush_seconds=60)
+    assert registered == [store.flush]
+
+    store.start()
+    store._thread = threading.Thread(target=lambda: None)   # flusher died
+    store.append(_record("Buea", "2025-03-01 10:00:00"))
+    assert store._thread.is_alive()
+    assert registered == [store.flush]
+    assert store.has_data() and store.has_data("Buea") and not store.has_data("Kumba")
+
+
+def test_concurrent_appends_write_every_row_once(tmp_path):
+    store = WeatherStore(str(tmp_path), fmt="csv", flush_rows=7, flush_seconds=60)
+
+    def worker(n):
+        for i in range(50):
+            store.append(_record(["Bamenda", "Douala"][n % 2], f"2025-03-{1 + i % 28:02d} 10:00:00", temp=n))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    df = store.read()
+    assert len(df) == 400
+    assert df["temp"].value_counts().to_dict() == {n: 50 for n in range(8)}
+
+
+def test_failed_flush_retries_only_unwritten_partitions(tmp_path, monkeypatch):
+    store = WeatherStore(str(tmp_path), fmt="csv", flush_rows=100, flush_seconds=60)
+    for city in ("Bamenda", "Buea", "Douala"):
+        store.append(_record(city, "2025-03-01 10:00:00"))
+        store.append(_record(city, "2025-03-01 11:00:00"))
+
+    write_partition = store._write_partition
+    writes = []
+
+    def flaky_write(slug, month, part):
+        writes.append(slug)
+        if len(writes) == 2:
+            raise OSError("disk full")
+        write_partition(slug, month, part)
+
+    monkeypatch.setattr(store, "_write_partition", flaky_write)
+    assert store.flush() == 2
+    assert store.stats()["buffered"] == 4 and store.stats()["flush_errors"] == 1
+
+    assert store.flush() == 4
+    df = store.read()
+    assert len(df) == 6
+    assert df.groupby("city").size().to_dict() == {"Bamenda": 2, "Buea": 2, "Douala": 2}
+
+
+def test_reads_only_requested_partitions(tmp_path, monkeypatch):
+    store = WeatherStore(str(tmp_path), fmt="csv", flush_rows=100, flush_seconds=60)
+    for city in ["Bamenda", "Douala", "Yaoundé"]:
+        for month in ["2025-01", "2025-02", "2025-03"]:
+            store.append(_record(city, f"{month}-15 09:00:00"))
+    store.flush()
+    assert len(store.partitions()) == 9
+
+    opened = []
+    real_read = store._read_partition
+    monkeypatch.setattr(store, "_read_partition", lambda path: opened.append(path) or real_read(path))
+
+    df = store.read(cities=["douala"], start="2025-02-01", end="2025-03-31")
+    assert sorted(df["date"]) == ["2025-02-15 09:00:00", "2025-03-15 09:00:00"]
+    assert [os.path.relpath(p, tmp_path) for p in opened] == [
+        os.path.join("douala", "2025-02.csv"), os.path.join("douala", "2025-03.csv")
+    ]
+
+
+def test_csv_export_and_import_round_trip(tmp_path):
+    store = WeatherStore(str(tmp_path / "store"), fmt="csv", flush_rows=100, flush_seconds=60)
+    store.append(_record("Limbe", "2025-04-02 08:00:00"))
+    store.append(_record("Kumba", "2025-04-01 08:00:00"))
+    export = tmp_path / "weather_data.csv"
+    assert store.export_csv(str(export)) == 2
+    assert list(pd.read_csv(export)["city"]) == ["Kumba", "Limbe"]
+
+    other = WeatherStore(str(tmp_path / "other"), fmt="csv", flush_rows=100, flush_seconds=60)
+    assert other.import_csv(str(export)) == 2
+    assert len(other.read(cities=["Limbe"])) == 1
+
+
+def test_parquet_partitions(tmp_path):
+    pytest.importorskip("pyarrow")
+    store = WeatherStore(str(tmp_path), fmt="parquet", flush_rows=2, flush_seconds=60)
+    for hour in range(4):
+        store.append(_record("Bafoussam", f"2025-05-01 {hour:02d}:00:00"))
+    assert store.partitions() == [os.path.join(str(tmp_path), "bafoussam", "2025-05.parquet")]
+    assert len(store.read()) == 4
+
+
+def test_log_weather_data_goes_through_the_store(tmp_path, monkeypatch):
+    store = WeatherStore(str(tmp_path), fmt="csv", flush_rows=100, flush_seconds=60)
+    monkeypatch.setattr(logger, "weather_store", store)
+    assert logger.log_weather_data(_record("Bamenda", "2025-03-01 10:00:00")) is True
+    assert logger.log_weather_data(None) is False
+    assert store.stats()["buffered"] == 1
@@ -0,0 +1,114 @@
+# tests/test_whatsapp_jobs.py
+import importlib
+import time
+
+import pytest
+
+from backend.utils.job_queue import JobQueue
+
+SENDER = "whatsapp:+237600000000"
+
+
+class _Image:
+    status_code = 200
+    content = b"\xff" * 4096
+
+
+class _FakeDispatcher:
+    """Records accepted parts; deliver() answers from a list of scripted outcomes."""
+
+    def __init__(self):
+        self.queued = []      # bodies handed to send()
+        self.accepted = []    # bodies accepted by deliver()
+        self.script = []      # per deliver() call: None = accept all, n = accept n then fail,
+                              # an exception = accept one part, then raise it
+
+    def send(self, to, parts, on_failure=None):
+        self.queued += parts
+
+    def deliver(self, to, parts, timeout=None, on_failure=None, on_sent=None):
+        step = self.script.pop(0) if self.script else None
+        accept = len(parts) if step is None else 1 if isinstance(step, Exception) else step
+        for i in range(min(accept, len(parts))):
+            self.accepted.append(parts[i])
+            if on_sent is not None:
+                on_sent(i)
+        if isinstance(step, Exception):
+            raise step
+        if accept >= len(parts):
+            return "delivered"
+        return "partial" if accept else "failed"
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    monkeypatch.setenv("WHATSAPP_JOB_DB", str(tmp_path / "jobs.sqlite3"))
+    module = importlib.import_module("backend.app")
+    monkeypatch.setattr(module.http, "get", lambda *args, **kwargs: _Image())
+    monkeypatch.setattr(module.model_manager, "wait_until_ready", lambda timeout=None: True)
+    monkeypatch.setattr(module, "dispatcher", _FakeDispatcher())
+    return module
+
+
+def _result(advice="Remove infected leaves"):
+    return {"crop": "Maize", "disease": {"predicted_label": "Maize___Blight"}, "advisor": "llm",
+            "advice": [advice], "timings": {"total_ms": 12}}
+
+
+def _run_as_job(app_module, monkeypatch, tmp_path):
+    """Run one WhatsApp job through a real queue with fast retries; returns the queue once it is idle."""
+    failures = []
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"), app_module._run_whatsapp_job, workers=1,
+                     retry_base_seconds=0.01, on_failure=lambda payload, error: failures.append(error))
+    monkeypatch.setattr(app_module, "whatsapp_jobs", queue)
+    queue.submit({"sender": SENDER, "message_body": "Bamenda", "image_url": "https://media/1"})
+    queue.start()
+    deadline = time.time() + 5
+    while time.time() < deadline and (queue.stats()["pending"] or queue.stats()["running"]):
+        time.sleep(0.01)
+    queue.stop(timeout=1)
+    return queue, failures
+
+
+def test_pipeline_errors_propagate_to_the_job_queue(app_module, monkeypatch):
+    def broken(image_bytes, city):
+        raise RuntimeError("advisory pipeline down")
+
+    monkeypatch.setattr(app_module, "run_advisory_pipeline", broken)
+    with pytest.raises(RuntimeError, match="pipeline down"):
+        app_module.process_in_background(SENDER, "Bamenda", "https://media/1")
+
+
+def test_job_fails_only_when_nothing_was_accepted(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "run_advisory_pipeline", lambda image_bytes, city: _result())
+    dispatcher = app_module.dispatcher
+
+    dispatcher.script = [0, 0]   # reply and fallback both refused
+    with pytest.raises(app_module.ReplyNotDelivered):
+        app_module.process_in_background(SENDER, "Bamenda", "https://media/1")
+
+    dispatcher.script = [0, None]   # fallback accepted
+    app_module.process_in_background(SENDER, "Bamenda", "https://media/1")
+    assert "(reply with 'more' to get details)" in dispatcher.accepted[-1]
+
+
+def test_retry_does_not_resend_progress_note_or_accepted_parts(app_module, monkeypatch, tmp_path):
+    calls = []
+
+    def pipeline(image_bytes, city):
+        calls.append(city)
+        if len(calls) == 1:
+            raise RuntimeError("weather stage crashed")
+        return _result(" ".join(["Spray copper fungicide on every leaf."] * 100))
+
+    monkeypatch.setattr(app_module, "run_advisory_pipeline", pipeline)
+    dispatcher = app_module.dispatcher
+    dispatcher.script = [RuntimeError("worker interrupted")]   # first reply part accepted, then a crash
+
+    queue, failures = _run_as_job(app_module, monkeypatch, tmp_path)
+
+    assert len(calls) == 3 and not failures
+    assert queue.stats()["completed"] == 1
+    assert len(dispatcher.queued) == 1 and dispatcher.queued[0].startswith("🔄")
+    # Every reply part went out exactly once, the first in the interrupted attempt
+    assert [part.split("\n")[0] for part in dispatcher.accepted] == ["(Part 1/3)", "(Part 2/3)", "(Part 3/3)"]